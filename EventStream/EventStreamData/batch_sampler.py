@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import numpy as np, torch
+
+from typing import Iterator, List, Optional
+
+from .event_stream_pytorch_dataset import EventStreamPytorchDataset
+
+class LengthBucketedBatchSampler(torch.utils.data.Sampler):
+    """
+    A batch sampler for an `EventStreamPytorchDataset` which groups items of similar sequence length and
+    per-event data element density into the same batches, so that less of each (padded) batch is padding.
+
+    Each epoch, the items are (optionally) shuffled and split into pools of `pool_size` items. Each pool is
+    sorted by sequence length then data element density and cut into batches, and (if shuffling) the order of
+    the resulting batches is shuffled. Larger pools produce more homogeneous batches; smaller pools produce
+    more random ones. Batches are cut either to a fixed number of items, `batch_size`, or, in token-budget
+    mode, greedily such that the estimated padded footprint of each batch does not exceed
+    `max_batch_data_elements`, or both. The footprint is the size of the batch's `dynamic_indices` tensor
+    (`batch_size X seq_len X n_data`) plus, if `n_attention_heads > 0`, that of its attention scores
+    (`batch_size X n_attention_heads X seq_len X seq_len`), which dominates for long sequences. In
+    token-budget mode, items which exceed the budget on their own are placed in singleton batches.
+
+    As batches in token-budget mode depend on the shuffled order, the batches for the next epoch are computed
+    (and cached) on the first call to either `__len__` or `__iter__`, so `__len__` is exact for that epoch.
+
+    Args:
+        `dataset` (`EventStreamPytorchDataset`):
+            The dataset to sample from. Item sizes are taken from `dataset.item_sizes()`.
+        `batch_size` (`Optional[int]`, *optional*, defaults to `None`):
+            The maximum number of items per batch.
+        `max_batch_data_elements` (`Optional[int]`, *optional*, defaults to `None`):
+            If specified, the maximum estimated padded footprint (see above) per batch. At least one of
+            `batch_size` and `max_batch_data_elements` must be specified.
+        `n_attention_heads` (`int`, *optional*, defaults to `0`):
+            If positive, the token budget additionally accounts for the attention scores of a model with this
+            many attention heads.
+        `shuffle` (`bool`, *optional*, defaults to `True`):
+            Whether to shuffle items across pools and batches each epoch.
+        `pool_size` (`Optional[int]`, *optional*, defaults to `None`):
+            The number of items sorted together. Defaults to `100 * batch_size` if `batch_size` is specified
+            and to `4096` otherwise. In fixed batch size mode, this is rounded up to a multiple of
+            `batch_size`, so all batches but the last are full.
+        `generator` (`Optional[torch.Generator]`, *optional*, defaults to `None`):
+            The generator used to seed each epoch's shuffling. If `None`, torch's global generator is used,
+            so seeding torch (e.g., via lightning's `seed_everything`) controls the shuffling.
+    """
+
+    def __init__(
+        self,
+        dataset: EventStreamPytorchDataset,
+        batch_size: Optional[int] = None,
+        max_batch_data_elements: Optional[int] = None,
+        n_attention_heads: int = 0,
+        shuffle: bool = True,
+        pool_size: Optional[int] = None,
+        generator: Optional[torch.Generator] = None,
+    ):
+        assert (batch_size is not None) or (max_batch_data_elements is not None), (
+            "Must specify at least one of `batch_size` and `max_batch_data_elements`!"
+        )
+        assert (batch_size is None) or (batch_size >= 1), f"batch_size must be positive; got {batch_size}!"
+        assert (max_batch_data_elements is None) or (max_batch_data_elements >= 1), (
+            f"max_batch_data_elements must be positive; got {max_batch_data_elements}!"
+        )
+
+        self.seq_lens, self.n_data = dataset.item_sizes()
+        self.batch_size = batch_size
+        self.max_batch_data_elements = max_batch_data_elements
+        self.n_attention_heads = n_attention_heads
+        self.shuffle = shuffle
+        self.generator = generator
+
+        if pool_size is None: pool_size = 4096 if batch_size is None else 100 * batch_size
+        if max_batch_data_elements is None: pool_size = int(np.ceil(pool_size / batch_size)) * batch_size
+        self.pool_size = pool_size
+
+        self._batches = None
+
+    def batch_footprint(self, batch_size: int, seq_len: int, n_data: int) -> int:
+        """Returns the estimated padded footprint of a batch of the given dimensions; see the class docs."""
+        return batch_size * seq_len * (n_data + self.n_attention_heads * seq_len)
+
+    def _split_pool(self, pool: np.ndarray) -> List[List[int]]:
+        """Cuts a sorted pool of item indices into batches."""
+        if self.max_batch_data_elements is None:
+            return [pool[i:i+self.batch_size].tolist() for i in range(0, len(pool), self.batch_size)]
+
+        batches, batch, batch_seq_len, batch_n_data = [], [], 0, 0
+        for i in pool.tolist():
+            seq_len = max(batch_seq_len, self.seq_lens[i])
+            n_data = max(batch_n_data, self.n_data[i])
+            is_full = (self.batch_size is not None) and (len(batch) >= self.batch_size)
+            footprint = self.batch_footprint(len(batch) + 1, seq_len, n_data)
+            is_over_budget = footprint > self.max_batch_data_elements
+            if batch and (is_full or is_over_budget):
+                batches.append(batch)
+                batch, seq_len, n_data = [], self.seq_lens[i], self.n_data[i]
+
+            batch.append(i)
+            batch_seq_len, batch_n_data = seq_len, n_data
+
+        if batch: batches.append(batch)
+        return batches
+
+    def _build_batches(self) -> List[List[int]]:
+        """Builds the batches for a single epoch."""
+        if self.shuffle:
+            seed = int(torch.empty((), dtype=torch.int64).random_(generator=self.generator).item())
+            rng = np.random.default_rng(seed)
+            order = rng.permutation(len(self.seq_lens))
+        else:
+            order = np.arange(len(self.seq_lens))
+
+        batches = []
+        for pool_start in range(0, len(order), self.pool_size):
+            pool = order[pool_start:pool_start+self.pool_size]
+            # `np.lexsort` sorts by its last key first, and is stable.
+            pool = pool[np.lexsort((self.n_data[pool], self.seq_lens[pool]))]
+            batches.extend(self._split_pool(pool))
+
+        if self.shuffle: batches = [batches[i] for i in rng.permutation(len(batches))]
+        return batches
+
+    def __len__(self) -> int:
+        if self._batches is None: self._batches = self._build_batches()
+        return len(self._batches)
+
+    def __iter__(self) -> Iterator[List[int]]:
+        batches = self._batches if self._batches is not None else self._build_batches()
+        self._batches = None
+        yield from batches
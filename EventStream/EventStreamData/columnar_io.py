@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import json, numpy as np, pandas as pd, shutil
+
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Union
+
+# Numpy dtype kinds which can be written as raw `.npy` files and memory-mapped back in on load. These are
+# boolean, (un)signed integer, floating point, complex, timedelta, and (timezone naive) datetime types.
+MMAPABLE_DTYPE_KINDS = set('biufcmM')
+
+SCHEMA_FILENAME = 'schema.json'
+
+def _save_array(vals: Union[pd.Series, pd.Index], fp_stem: Path) -> str:
+    """
+    Saves the values of `vals` to disk at `fp_stem` (with an appropriate suffix) and returns the format
+    used. Numpy-native, fixed-width values are saved as `.npy` files so they can be memory-mapped, as are the
+    integer codes of categorical values (whose categories are pickled alongside); all other values (e.g.,
+    object or timezone-aware columns) are pickled by pandas.
+    """
+    if isinstance(vals.dtype, np.dtype) and vals.dtype.kind in MMAPABLE_DTYPE_KINDS:
+        np.save(fp_stem.with_suffix('.npy'), vals.to_numpy(), allow_pickle=False)
+        return 'npy'
+    elif isinstance(vals.dtype, pd.CategoricalDtype) and not vals.dtype.ordered:
+        np.save(fp_stem.with_suffix('.npy'), vals.array.codes, allow_pickle=False)
+        pd.to_pickle(vals.dtype.categories, fp_stem.with_suffix('.categories.pkl'))
+        return 'categorical'
+    else:
+        pd.to_pickle(vals.array, fp_stem.with_suffix('.pkl'))
+        return 'pkl'
+
+def _load_array(fp_stem: Path, fmt: str, mmap: bool) -> Any:
+    """Loads an array saved by `_save_array`, memory-mapping it (copy-on-write) if possible and requested."""
+    match fmt:
+        case 'npy': return np.load(fp_stem.with_suffix('.npy'), mmap_mode=('c' if mmap else None))
+        case 'pkl': return pd.read_pickle(fp_stem.with_suffix('.pkl'))
+        case 'categorical':
+            codes = np.load(fp_stem.with_suffix('.npy'), mmap_mode=('c' if mmap else None))
+            categories = pd.read_pickle(fp_stem.with_suffix('.categories.pkl'))
+            return pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories))
+        case _: raise ValueError(f"Unrecognized array format {fmt}!")
+
+def save_df(df: pd.DataFrame, save_dir: Path, do_overwrite: bool = False):
+    """
+    Saves `df` to `save_dir` in a simple columnar format: one file per column (and per index level), plus a
+    json schema file. Columns with numpy-native, fixed-width types are stored as raw `.npy` files, which can
+    be memory-mapped back in by `load_df` in near-constant time.
+
+    Args:
+        `df` (`pd.DataFrame`):
+            The dataframe to save. Column and index names must be json serializable (e.g., strings or
+            integers).
+        `save_dir` (`Path`): The directory in which to save `df`. It will be created if it does not exist.
+        `do_overwrite` (`bool`, *optional*, defaults to `False`):
+            If `save_dir` already exists, whether to overwrite it (if `True`) or raise a `FileExistsError`
+            (if `False`).
+    """
+    if save_dir.exists():
+        if not do_overwrite: raise FileExistsError(f"{save_dir} already exists!")
+        shutil.rmtree(save_dir)
+    save_dir.mkdir(parents=True)
+
+    schema = {
+        'columns': [], 'column_formats': [], 'column_dtypes': [],
+        'index_names': [], 'index_formats': [], 'index_dtypes': [],
+    }
+    for i, col in enumerate(df.columns):
+        schema['columns'].append(col)
+        schema['column_formats'].append(_save_array(df.iloc[:, i], save_dir / f"col_{i}"))
+        schema['column_dtypes'].append(str(df.dtypes.iloc[i]))
+
+    for i, name in enumerate(df.index.names):
+        level = df.index.get_level_values(i)
+        schema['index_names'].append(name)
+        schema['index_formats'].append(_save_array(level, save_dir / f"idx_{i}"))
+        schema['index_dtypes'].append(str(level.dtype))
+
+    with open(save_dir / SCHEMA_FILENAME, mode='w') as f: json.dump(schema, f)
+
+def _empty_array(fp_stem: Path, fmt: str, dtype: Optional[str]) -> Any:
+    """
+    Returns an empty array of the type saved by `_save_array` at `fp_stem`, without loading any data. Only the
+    headers (or, for categorical arrays, the categories) of non-pickled arrays are read. Pickled arrays take
+    their dtype from `dtype`, falling back to `object` if it is missing or unrecognized.
+    """
+    match fmt:
+        case 'npy' | 'categorical':
+            return _load_array(fp_stem, fmt, mmap=True)[:0]
+        case 'pkl':
+            try: return pd.array([], dtype=pd.api.types.pandas_dtype(dtype or 'object'))
+            except TypeError: return np.array([], dtype=object)
+        case _: raise ValueError(f"Unrecognized array format {fmt}!")
+
+def load_df_columns(save_dir: Path) -> List[Any]:
+    """Returns the columns of the dataframe saved in `save_dir` without loading any data."""
+    with open(save_dir / SCHEMA_FILENAME, mode='r') as f: return json.load(f)['columns']
+
+def load_df(save_dir: Path, columns: Optional[Sequence[Any]] = None, mmap: bool = True) -> pd.DataFrame:
+    """
+    Loads a dataframe saved via `save_df`.
+
+    Args:
+        `save_dir` (`Path`): The directory in which the dataframe was saved.
+        `columns` (`Optional[Sequence[Any]]`, *optional*, defaults to `None`):
+            If specified, only these columns (in this order) will be loaded. Otherwise, all columns will be.
+        `mmap` (`bool`, *optional*, defaults to `True`):
+            Whether or not numpy-native columns should be memory-mapped (in copy-on-write mode, so the
+            returned dataframe can still be modified in memory without affecting the files on disk) rather
+            than read into memory.
+
+    Returns: The loaded `pd.DataFrame`. Memory-mapped columns are not copied on construction.
+    """
+    with open(save_dir / SCHEMA_FILENAME, mode='r') as f: schema = json.load(f)
+
+    col_idxs = {c: i for i, c in enumerate(schema['columns'])}
+    if columns is None: columns = schema['columns']
+    else:
+        missing = [c for c in columns if c not in col_idxs]
+        if missing: raise KeyError(f"Columns {missing} not found in {save_dir}!")
+
+    index_levels = [
+        _load_array(save_dir / f"idx_{i}", fmt, mmap) for i, fmt in enumerate(schema['index_formats'])
+    ]
+    if len(index_levels) == 1: index = pd.Index(index_levels[0], name=schema['index_names'][0])
+    else: index = pd.MultiIndex.from_arrays(index_levels, names=schema['index_names'])
+
+    # Columns are keyed by position on construction so duplicate or non-string column names survive
+    # unchanged; `copy=False` keeps memory-mapped columns as separate, un-consolidated blocks.
+    data = {
+        j: _load_array(save_dir / f"col_{col_idxs[c]}", schema['column_formats'][col_idxs[c]], mmap)
+        for j, c in enumerate(columns)
+    }
+    df = pd.DataFrame(data, index=index, columns=list(range(len(columns))), copy=False)
+    df.columns = pd.Index(list(columns))
+    return df
+
+def load_empty_df(save_dir: Path) -> pd.DataFrame:
+    """
+    Returns an empty dataframe with the columns, index names, and dtypes of the dataframe saved via `save_df`
+    in `save_dir`, built from its schema without loading (or unpickling) any column data.
+    """
+    with open(save_dir / SCHEMA_FILENAME, mode='r') as f: schema = json.load(f)
+
+    column_dtypes = schema.get('column_dtypes', [None] * len(schema['columns']))
+    index_dtypes = schema.get('index_dtypes', [None] * len(schema['index_names']))
+
+    index_levels = [
+        _empty_array(save_dir / f"idx_{i}", fmt, dtype)
+        for i, (fmt, dtype) in enumerate(zip(schema['index_formats'], index_dtypes))
+    ]
+    if len(index_levels) == 1: index = pd.Index(index_levels[0], name=schema['index_names'][0])
+    else: index = pd.MultiIndex.from_arrays(index_levels, names=schema['index_names'])
+
+    data = {
+        j: _empty_array(save_dir / f"col_{j}", fmt, dtype)
+        for j, (fmt, dtype) in enumerate(zip(schema['column_formats'], column_dtypes))
+    }
+    df = pd.DataFrame(data, index=index, columns=list(range(len(schema['columns']))), copy=False)
+    df.columns = pd.Index(list(schema['columns']))
+    return df
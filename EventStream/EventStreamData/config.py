@@ -338,8 +338,23 @@ class EventStreamDatasetConfig:
             Configuation options for normalization. If not `None`, must contain the key `'cls'`, which points
             to the class used normalization. All other keys and values are keyword arguments to be passed to
             the specified class. The API of these objects is expected to mirror scikit-learn normalization
-            system APIs.
+            system APIs. `'streaming_quantile_normalizer'` fits quantiles via a mergeable sketch, without
+            holding a dense copy of the training values.
             If `None`, numerical values are not normalized.
+
+        `num_numerical_fit_workers` (`int`, defaults to `1`):
+            The number of worker processes used to fit per-key outlier detection and normalization models for
+            key-value numerical columns. If `1`, models are fit serially in the main process. Fit models are
+            identical in either case.
+        `num_numerical_transform_workers` (`int`, defaults to `1`):
+            The number of worker processes used to transform key-value numerical columns, one row chunk at a
+            time. If `1`, chunks are transformed serially in the main process.
+        `numerical_transform_chunk_size` (`int`, defaults to `1000000`):
+            The number of rows of a key-value numerical column transformed together in one chunk.
+        `do_encode_categorical_metadata` (`bool`, defaults to `False`):
+            If `True`, after metadata is transformed, each measurement column with a vocabulary is stored as a
+            pandas categorical column whose integer codes are the vocabulary indices of its values (with
+            `UNK = 0`), rather than as python objects. See `EventStreamDataset.encode_categorical_metadata`.
     """
 
     measurement_configs: Dict[str, MeasurementConfig] = dataclasses.field(default_factory = lambda: {})
@@ -353,6 +368,12 @@ class EventStreamDatasetConfig:
     outlier_detector_config: Optional[Dict[str, Any]] = None
     normalizer_config: Optional[Dict[str, Any]] = None
 
+    num_numerical_fit_workers: int = 1
+    num_numerical_transform_workers: int = 1
+    numerical_transform_chunk_size: int = 1000000
+
+    do_encode_categorical_metadata: bool = False
+
     def __post_init__(self):
         """Validates that parameters take on valid values."""
         for name, cfg in self.measurement_configs.items():
@@ -379,6 +400,12 @@ class EventStreamDatasetConfig:
             val = getattr(self, var)
             if val is not None: assert type(val) is dict and 'cls' in val
 
+        for var in (
+            'num_numerical_fit_workers', 'num_numerical_transform_workers', 'numerical_transform_chunk_size'
+        ):
+            val = getattr(self, var)
+            assert type(val) is int and val >= 1, f"{var} must be a positive integer; got {val}!"
+
         for k, v in self.measurement_configs.items(): 
             try: v._validate()
             except Exception as e:
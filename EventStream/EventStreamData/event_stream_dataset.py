@@ -1,20 +1,38 @@
-import copy, numpy as np, pandas as pd, warnings
+import copy, dataclasses, itertools, json, numpy as np, pandas as pd, shutil, warnings
 
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from mixins import SeedableMixin, SaveableMixin, TimeableMixin
+from pathlib import Path
+from scipy import stats
 from sklearn.preprocessing import QuantileTransformer
-from typing import Any, Dict, Hashable, List, Optional, Tuple, Sequence, Set, Union
+from typing import (
+    Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple, Sequence, Set, Union
+)
 
+from .columnar_io import load_df, load_empty_df, save_df
 from .expandable_df_dict import ExpandableDfDict
+from .packed_numerical_models import PackedNumericalModels
 from .config import EventStreamDatasetConfig, MeasurementConfig
+from .time_dependent_functor import TimeDependentFunctor, to_epoch_ns
 from .types import DataModality, TemporalityType, NumericDataModalitySubtype
 from .vocabulary import Vocabulary
 
 from ..utils import lt_count_or_proportion, flatten_dict, to_sklearn_np
+from ..StreamingQuantileNormalizer.streaming_quantile_normalizer import StreamingQuantileNormalizer
 from ..VarianceImpactOutlierDetector.variance_impact_outlier_detector import (
     VarianceImpactOutlierDetector
 )
 
+@contextmanager
+def _temporary_np_seed(seed: int):
+    """Seeds numpy's global random state within the context, then restores the prior state."""
+    state = np.random.get_state()
+    np.random.seed(seed)
+    try: yield
+    finally: np.random.set_state(state)
+
 class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
     """
     A unified dataset object for storing event-stream data. Data is stored via three dataframes:
@@ -43,6 +61,11 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
     # defined in `SaveableMixin`.
     _PICKLER = 'dill'
 
+    # Caches derived from the data, which are rebuilt on demand and so are not pickled by `_save`.
+    _DEL_BEFORE_SAVING_ATTRS = [
+        '_time_dependent_cache', '_split_membership_cache', '_metadata_event_type_index_cache'
+    ]
+
     # Dictates what models can be fit on numerical metadata columns, for both outlier detection and
     # normalization.
     METADATA_MODELS = {
@@ -51,8 +74,15 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
 
         # Normalizers
         'quantile_transformer': QuantileTransformer,
+        'streaming_quantile_normalizer': StreamingQuantileNormalizer,
     }
 
+    # The bound columns used by `drop_or_censor` and its vectorized variants.
+    DROP_OR_CENSOR_COLS = (
+        'drop_lower_bound', 'drop_lower_bound_inclusive', 'drop_upper_bound', 'drop_upper_bound_inclusive',
+        'censor_lower_bound', 'censor_upper_bound',
+    )
+
     # This variable stores inferred upper and lower valid bounds for various units of measure. They are used
     # to drop outliers from observed numerical values.
     # TODO(mmd): Let this be set from a data file.
@@ -147,7 +177,57 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
         based on the bounds in `row`. See `EventStreamDataset.drop_or_censor` for description of `row` bound
         keys and meaning.
         """
-        return val.apply(EventStreamDataset.drop_or_censor, args=(row,))
+        bounds = {k: (row[k] if k in row else None) for k in EventStreamDataset.DROP_OR_CENSOR_COLS}
+        return pd.Series(
+            EventStreamDataset._drop_or_censor_arrays(val.values, **bounds), index=val.index, name=val.name
+        )
+
+    @staticmethod
+    def _drop_or_censor_arrays(
+        vals: np.ndarray,
+        drop_lower_bound: Union[np.ndarray, Optional[float]] = None,
+        drop_lower_bound_inclusive: Union[np.ndarray, Optional[bool]] = None,
+        drop_upper_bound: Union[np.ndarray, Optional[float]] = None,
+        drop_upper_bound_inclusive: Union[np.ndarray, Optional[bool]] = None,
+        censor_lower_bound: Union[np.ndarray, Optional[float]] = None,
+        censor_upper_bound: Union[np.ndarray, Optional[float]] = None,
+    ) -> np.ndarray:
+        """
+        A vectorized version of `EventStreamDataset.drop_or_censor`, with identical semantics. Each bound may
+        be either a scalar or an array aligned with `vals`; missing bounds are given by `None` or `np.NaN`.
+        As in `drop_or_censor`, the inclusivity flags are interpreted by their truthiness (see
+        `EventStreamDataset._truthy_flags`).
+
+        Returns: A float numpy array of the dropped (`np.NaN`) or censored values.
+        """
+        def as_float(x): return np.array(np.NaN if x is None else x, dtype=float)
+        as_flag = EventStreamDataset._truthy_flags
+
+        vals = np.asarray(vals, dtype=float)
+        dlb, dub = as_float(drop_lower_bound), as_float(drop_upper_bound)
+        clb, cub = as_float(censor_lower_bound), as_float(censor_upper_bound)
+
+        # Comparisons against missing (`np.NaN`) bounds are always `False`, so such bounds are never applied.
+        drop = (
+            (vals < dlb) | (as_flag(drop_lower_bound_inclusive) & (vals == dlb)) |
+            (vals > dub) | (as_flag(drop_upper_bound_inclusive) & (vals == dub))
+        )
+        out = np.where(vals < clb, clb, np.where(vals > cub, cub, vals))
+        return np.where(drop, np.NaN, out)
+
+    @staticmethod
+    def _truthy_flags(flags: Union[np.ndarray, Optional[bool]]) -> np.ndarray:
+        """
+        Returns the truthiness of each of `flags` (a scalar or an array) as a boolean numpy array, exactly as
+        `drop_or_censor` would evaluate it: `None` is `False`, but, as `bool(np.NaN)` is `True`, `np.NaN` is
+        `True`.
+        """
+        flags = np.asarray(flags)
+        if flags.dtype == bool: return flags
+        if flags.dtype.kind in 'iuf': return flags != 0
+
+        truthy = [(f is not None) and bool(f) for f in flags.ravel()]
+        return np.array(truthy, dtype=bool).reshape(flags.shape)
 
     @staticmethod
     def drop_or_censor(val: float, row: Union[pd.Series, Dict[str, Optional[float]]]) -> float:
@@ -234,36 +314,39 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
 
         assert len(measurement_metadata.index.names) == 1
 
-        orig_val_name = vals.name
-        orig_val_index = vals.index
-        orig_key_col_name = measurement_metadata.index.names[0]
-
-        # We just want the unit bounds, and we need to standardize the index name
-        cols = list(set(measurement_metadata.columns).intersection({
-            'drop_lower_bound', 'drop_lower_bound_inclusive', 'drop_upper_bound',
-            'drop_upper_bound_inclusive', 'censor_lower_bound', 'censor_upper_bound',
-        }))
+        # We just want the unit bounds.
+        cols = [c for c in EventStreamDataset.DROP_OR_CENSOR_COLS if c in measurement_metadata.columns]
         if not cols: return vals
+        for bound in ('drop_lower_bound', 'drop_upper_bound'):
+            if bound in cols and f"{bound}_inclusive" not in cols:
+                raise KeyError(f"{bound} is present in `measurement_metadata` but {bound}_inclusive is not!")
 
-        vals = pd.DataFrame({'vals': vals})
-        vals['int_index'] = np.arange(len(vals))
-
-        vals.set_index('int_index', append=True, inplace=True)
-        vals.index.names = ['key_col', 'int_index']
-
-        measurement_metadata.index.names = ['key_col']
-        processed_vals = vals.join(measurement_metadata[cols], on='key_col', how='left').apply(
-            lambda r: EventStreamDataset.drop_or_censor(r['vals'], r),
-            axis='columns'
+        bounds = EventStreamDataset._gather_drop_or_censor_bounds(
+            measurement_metadata, measurement_metadata.index.get_indexer(vals.index)
+        )
+        return pd.Series(
+            EventStreamDataset._drop_or_censor_arrays(vals.values, **bounds), index=vals.index, name=vals.name
         )
 
-        measurement_metadata.index.names = [orig_key_col_name]
-
-        processed_vals = processed_vals.loc[vals.index]
-        processed_vals.name = orig_val_name
-        processed_vals.index = orig_val_index
+    @staticmethod
+    def _gather_drop_or_censor_bounds(
+        measurement_metadata: pd.DataFrame, key_idx: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """
+        Gathers the drop and censor bounds present in `measurement_metadata` by row position, for use with
+        `EventStreamDataset._drop_or_censor_arrays`. Positions of `-1` (keys without a row) point at an extra
+        row of missing bounds.
+        """
+        key_idx = np.where(key_idx == -1, len(measurement_metadata), key_idx)
 
-        return processed_vals
+        bounds = {}
+        for col in EventStreamDataset.DROP_OR_CENSOR_COLS:
+            if col not in measurement_metadata.columns: continue
+            col_vals = measurement_metadata[col].values
+            if col.endswith('_inclusive'): col_vals = EventStreamDataset._truthy_flags(col_vals)
+            else: col_vals = np.asarray(col_vals, dtype=float)
+            bounds[col] = np.append(col_vals, (False if col.endswith('_inclusive') else np.NaN))[key_idx]
+        return bounds
 
     @classmethod
     def _fit_metadata_model(cls, vals: pd.Series, model_config: Dict[str, Any]):
@@ -294,6 +377,28 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
         """Returns a string representation of a float value converted to a categorical key."""
         return f"{key}__EQ_{val}"
 
+    @staticmethod
+    def _convert_key_value_pairs(keys: np.ndarray, vals: np.ndarray, conversion_fn: Callable) -> np.ndarray:
+        """
+        Returns an object array of `conversion_fn(key=key, val=val)` for each pair of `keys` and `vals`.
+        `conversion_fn` is only called once per unique key-value pair, and its outputs are gathered back out
+        to all pairs. Float values are deduplicated by their bit patterns, so that values which compare equal
+        but are formatted differently (e.g., `0.0` and `-0.0`) are converted separately.
+        """
+        match vals.dtype.kind:
+            case 'f': val_codes, _ = pd.factorize(vals.astype(np.float64).view(np.int64))
+            case 'i' | 'u' | 'b': val_codes, _ = pd.factorize(vals)
+            case _: return np.array([conversion_fn(key=k, val=v) for k, v in zip(keys, vals)], dtype=object)
+
+        key_codes, _ = pd.factorize(keys)
+        pair_codes, _ = pd.factorize(key_codes.astype(np.int64) * (val_codes.max() + 1) + val_codes)
+
+        # Codes are assigned in order of first appearance, so the first occurrences are in code order.
+        _, first_idx = np.unique(pair_codes, return_index=True)
+        converted = np.empty(len(first_idx), dtype=object)
+        converted[:] = [conversion_fn(key=keys[i], val=vals[i]) for i in first_idx]
+        return converted[pair_codes]
+
     @classmethod
     def transform_categorical_values_series(
         cls, measurement_metadata: pd.Series, vals: pd.Series
@@ -324,7 +429,12 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
                 conversion_fn = cls.float_key_value_to_categorical
             case _: return None
 
-        return vals.apply(lambda v: conversion_fn(key=vals.name, val=v))
+        if not len(vals): return vals.copy()
+
+        keys = np.full(len(vals), vals.name, dtype=object)
+        return pd.Series(
+            cls._convert_key_value_pairs(keys, vals.values, conversion_fn), index=vals.index, name=vals.name
+        )
 
     @classmethod
     def transform_categorical_key_values_df(
@@ -358,10 +468,12 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
             keys_to_expand = set(measurement_metadata[measurement_metadata['value_type'] == value_type].index)
             if not keys_to_expand: continue
 
-            keys_to_convert_idx = kv_df[key_col].isin(keys_to_expand)
-            kv_df.loc[keys_to_convert_idx, key_col] = kv_df[keys_to_convert_idx].apply(
-                lambda r: conversion_fn(key=r[key_col], val=r[val_col]),
-                axis='columns'
+            keys_to_convert_idx = kv_df[key_col].isin(keys_to_expand).values
+            if not keys_to_convert_idx.any(): continue
+
+            kv_df.loc[keys_to_convert_idx, key_col] = cls._convert_key_value_pairs(
+                kv_df[key_col].values[keys_to_convert_idx], kv_df[val_col].values[keys_to_convert_idx],
+                conversion_fn,
             )
             kv_df.loc[keys_to_convert_idx, val_col] = np.NaN
 
@@ -422,9 +534,8 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
     ) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
         Converts `df` into the format of an `events_df`, `meatadata_df` pair as expected by
-        `EventStreamDataset`.
-        TODO(mmd): this function is inefficient, computationally. Should do computation on a single copy of
-        the dataframe, then split into `events` vs. `metadata`.
+        `EventStreamDataset`. This is the single-source special case of
+        `EventStreamDataset.build_events_and_metadata`.
         TODO(mmd): Should rename `events_df -> events_df` and `metadata -> joint_metadata_df` following
         EventStreamDataset convention or otherwise standardize.
 
@@ -456,22 +567,174 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
                     * The index _overwritten_ with a `'metadata_id'` index which is a range index following
                       the order of the records in `df`.
         """
+        return EventStreamDataset.build_events_and_metadata([{
+            'df': df,
+            'event_type': event_type,
+            'subject_col': subject_col,
+            'time_col': time_col,
+            'metadata_cols': metadata_cols,
+        }])
+
+    @staticmethod
+    def _source_chunk_to_events_and_metadata(
+        df:                pd.DataFrame,
+        event_type:        str,
+        subject_col:       str,
+        time_col:          str,
+        metadata_cols:     Optional[List[str]] = None,
+        event_id_offset:   int = 0,
+        metadata_id_offset: int = 0,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Converts a single chunk of a single source dataframe into an `events`, `metadata` pair, with
+        `event_id`s and `metadata_id`s starting at the passed offsets. Only the referenced columns are copied.
+        """
         if metadata_cols is None: metadata_cols = []
 
+        event_ids = np.arange(event_id_offset, event_id_offset + len(df))
+
         events = df[[subject_col, time_col]].rename(
             columns={time_col: 'timestamp', subject_col: 'subject_id'}
-        ).copy()
+        )
+        events.index = pd.Index(event_ids, name='event_id')
         events['event_type'] = event_type
-        events['event_id'] = np.arange(len(df))
-        events.set_index('event_id', inplace=True)
 
-        metadata = df[[subject_col] + metadata_cols].copy().rename(columns={subject_col: 'subject_id'})
-        metadata['event_id'] = np.arange(len(df))
-        metadata['event_type'] = event_type
-        metadata['metadata_id'] = np.arange(len(metadata))
-        metadata.set_index('metadata_id', inplace=True)
+        metadata = df[metadata_cols].copy()
+        metadata.insert(0, 'event_id', event_ids)
+        metadata.insert(1, 'event_type', event_type)
+        metadata.insert(2, 'subject_id', events['subject_id'].values)
+        metadata.index = pd.Index(
+            np.arange(metadata_id_offset, metadata_id_offset + len(metadata)), name='metadata_id'
+        )
+
+        return events, metadata
+
+    @staticmethod
+    def build_events_and_metadata(
+        sources: Iterable[Dict[str, Any]]
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Converts many source dataframes (e.g., one per raw table) into a single `events_df`, `metadata_df`
+        pair as expected by `EventStreamDataset`, with globally unique `event_id`s and `metadata_id`s. Each
+        source is processed with vectorized column operations only (no per-row python), and only the
+        referenced columns of each source are retained, so sources can be streamed in chunks.
+
+        Note that while raw chunks need not be held in memory at once, the converted chunks are all retained
+        and concatenated at the end (as the output sizes are not known until every chunk has been read), so
+        peak memory is roughly twice the size of the outputs. To bound memory further, write the outputs of
+        separate calls as shards instead (see `ShardedEventStreamDataset.write_shards`).
+
+        Args:
+            `sources` (`Iterable[Dict[str, Any]]`):
+                The sources to convert. Each source is a dictionary with the following keys, which take the
+                same meaning as the arguments to `EventStreamDataset.to_events_and_metadata`:
+                    * `df` (`Union[pd.DataFrame, Iterable[pd.DataFrame]]`):
+                        The source dataframe, or an iterable (e.g., a generator or the output of
+                        `pd.read_csv(..., chunksize=...)`) of chunks of the source dataframe. Iterables are
+                        consumed exactly once.
+                    * `event_type` (`str`)
+                    * `subject_col` (`str`)
+                    * `time_col` (`str`)
+                    * `metadata_cols` (`List[str]`, *optional*)
+                `sources` itself may also be a generator, so sources need not be held in memory at once.
+
+        Returns:
+            * `events` (`pd.DataFrame`):
+                The concatenated events of all sources, with columns `'subject_id'`, `'timestamp'`, and
+                `'event_type'` and a range index `'event_id'` following the order of the sources and chunks.
+            * `metadata` (`pd.DataFrame`):
+                The concatenated metadata of all sources, with columns `'event_id'`, `'event_type'`, and
+                `'subject_id'` followed by the union of all sources' `metadata_cols` (in order of first
+                appearance) and a range index `'metadata_id'`. Columns not present in a given source will be
+                null for that source's rows.
+        """
+        events_chunks, metadata_chunks = [], []
+        n_events, n_metadata = 0, 0
+
+        for source in sources:
+            source = {**source}
+            df = source.pop('df')
+
+            for chunk in ([df] if isinstance(df, pd.DataFrame) else df):
+                events, metadata = EventStreamDataset._source_chunk_to_events_and_metadata(
+                    chunk, event_id_offset=n_events, metadata_id_offset=n_metadata, **source
+                )
+                n_events += len(events)
+                n_metadata += len(metadata)
+
+                events_chunks.append(events)
+                metadata_chunks.append(metadata)
+
+        if not events_chunks: raise ValueError("No source dataframes were provided!")
 
-        return events, metadata[['event_id', 'event_type', 'subject_id', *metadata_cols]]
+        if len(events_chunks) == 1: return events_chunks[0], metadata_chunks[0]
+        return pd.concat(events_chunks), pd.concat(metadata_chunks)
+
+    @staticmethod
+    def explode_metadata_list_columns(events_df: pd.DataFrame, metadata_cols: Sequence[str]) -> pd.DataFrame:
+        """
+        Explodes list-valued metadata columns in `events_df` into the format of a `joint_metadata_df` as
+        expected by `EventStreamDataset`, in a single vectorized pass (no per-event dataframes are built).
+
+        Args:
+            `events_df` (`pd.DataFrame`):
+                The events to be exploded. Must have a unique index named `'event_id'` and columns
+                `'event_type'` and `'subject_id'`. Each column in `metadata_cols` must contain, per event,
+                either a list-like of values (e.g., a `list`, `tuple`, or `np.ndarray`) or a null value,
+                which is interpreted as that column being unobserved for that event. All non-null list-likes
+                within a single event must have the same length.
+            `metadata_cols` (`Sequence[str]`): The list-valued columns of `events_df` to explode.
+
+        Returns:
+            A `pd.DataFrame` with a `'metadata_id'` range index and columns `'event_id'`, `'event_type'`,
+            `'subject_id'`, followed by `metadata_cols` in sorted order. Rows follow the order of `events_df`,
+            then the order of values within each event's lists. Values missing for a given event (because that
+            column was null for that event) are filled with `np.NaN`.
+        """
+        static_cols = ['event_id', 'event_type', 'subject_id']
+        metadata_cols = sorted(metadata_cols)
+
+        lens = {
+            col: events_df[col].map(len, na_action='ignore').fillna(0).astype(int).values
+            for col in metadata_cols
+        }
+        if metadata_cols: n_per_event = np.max(np.stack(list(lens.values())), axis=0)
+        else: n_per_event = np.zeros(len(events_df), dtype=int)
+
+        for col, col_lens in lens.items():
+            mismatched = (col_lens != 0) & (col_lens != n_per_event)
+            if mismatched.any():
+                raise ValueError(
+                    f"Column {col} has inconsistent lengths for events "
+                    f"{list(events_df.index[mismatched][:5])}!"
+                )
+
+        N = n_per_event.sum()
+        event_starts = np.concatenate(([0], n_per_event.cumsum()[:-1])) if len(n_per_event) else n_per_event
+
+        out = {
+            'event_id': np.repeat(events_df.index.values, n_per_event),
+            'event_type': np.repeat(events_df['event_type'].values, n_per_event),
+            'subject_id': np.repeat(events_df['subject_id'].values, n_per_event),
+        }
+        for col in metadata_cols:
+            present = lens[col] > 0
+            present_lens = lens[col][present]
+
+            # Each present event's values land in a contiguous block starting at that event's offset.
+            within_event_pos = np.arange(present_lens.sum()) - np.repeat(
+                present_lens.cumsum() - present_lens, present_lens
+            )
+            dest_idx = np.repeat(event_starts[present], present_lens) + within_event_pos
+
+            vals = np.empty(N, dtype=object)
+            vals[:] = np.NaN
+            vals[dest_idx] = list(itertools.chain.from_iterable(events_df[col].values[present]))
+            out[col] = pd.Series(vals).infer_objects()
+
+        metadata_df = pd.DataFrame(out, columns=[*static_cols, *metadata_cols])
+        metadata_df.index = pd.Index(np.arange(N), name='metadata_id')
+        return metadata_df
 
     def __init__(
         self,
@@ -480,6 +743,7 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
         metadata_df: Optional[pd.DataFrame] = None,
         subjects_df: Optional[pd.DataFrame] = None,
         do_copy: bool = True,
+        metadata_list_cols: Optional[Sequence[str]] = None,
     ):
         """
         Builds the `EventStreamDataset` object.
@@ -507,6 +771,11 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
             `config` (`EventStreamDatasetConfig`):
                 Configuration objects for this dataset. Largely details how metadata should be processed.
             `do_copy` (`bool`, *optional*, defaults to True): Whether or not `events_df` should be copied.
+            `metadata_list_cols` (`Optional[Sequence[str]]`, defaults to `None`):
+                If specified, these columns of `events_df` contain per-event lists of metadata values (rather
+                than a `metadata` column of `ExpandableDfDict`s) and will be exploded into
+                `joint_metadata_df` in a single vectorized pass via
+                `EventStreamDataset.explode_metadata_list_columns`. Cannot be used with `metadata_df`.
 
         Upon instantiation, `events_df` will have timestamps converted to pandas datetime objects and will be
         sorted by subject and timestamp. The index of `events_df` will be discarded; however, an integer index
@@ -527,7 +796,16 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
 
         events_df['timestamp'] = pd.to_datetime(events_df['timestamp'])
 
-        if metadata_df is not None:
+        if metadata_list_cols is not None:
+            assert metadata_df is None, "Can't pass both `metadata_df` and `metadata_list_cols`!"
+            assert 'metadata' not in events_df.columns
+
+            if events_df.index.names != ['event_id']:
+                events_df.index = pd.Index(np.arange(len(events_df)), name='event_id')
+
+            self.joint_metadata_df = self.explode_metadata_list_columns(events_df, metadata_list_cols)
+            events_df.drop(columns=list(metadata_list_cols), inplace=True)
+        elif metadata_df is not None:
             if 'event_id' in metadata_df.columns:
                 assert events_df.index.names == ['event_id'], f"Got {events_df.index.names}"
                 if 'event_type' not in metadata_df.columns:
@@ -538,13 +816,14 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
                 assert len(metadata_df) == len(events_df)
                 metadata_df['event_id'] = np.arange(len(events_df))
                 metadata_df['event_type'] = events_df['event_type']
+                metadata_df['subject_id'] = events_df['subject_id']
 
             non_event_cols = [c for c in metadata_df.columns if c not in ('event_id', 'event_type')]
             cols_order = ['event_id', 'event_type', *sorted(non_event_cols)]
             self.joint_metadata_df = metadata_df[cols_order].copy()
         elif 'metadata' not in events_df:
             self.joint_metadata_df = pd.DataFrame(
-                {'event_id': [], 'event_type': []}, index=pd.Index([], name='metadata_id')
+                {'event_id': [], 'event_type': [], 'subject_id': []}, index=pd.Index([], name='metadata_id')
             )
 
         if subjects_df is not None: assert subjects_df.index.names == ['subject_id']
@@ -569,32 +848,40 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
     @TimeableMixin.TimeAs
     def __build_joint_metadata_df_from_events(self):
         """
-        Builds a joint metadata dataframe by concatenating the `ExpandableDfDict` metadata objects present
-        in each row of the events df, then saves that as `self.joint_metadata_df`.
-        """
-        def metadata_df_with_event_info(r: pd.Series):
-            df = r.metadata.df()
-            df['event_id'] = r.name
-            df['event_type'] = r.event_type
-            df['subject_id'] = r.subject_id
-            return df
-        metadata_df = pd.concat(
-            (metadata_df_with_event_info(r) for _, r in self.events_df.iterrows()), ignore_index=True
+        Builds a joint metadata dataframe by exploding the `ExpandableDfDict` metadata objects present in each
+        row of the events df, then saves that as `self.joint_metadata_df`. The `ExpandableDfDict`s are first
+        unpacked into list-valued columns, which are then exploded in a single vectorized pass.
+        """
+        list_cols_df = pd.DataFrame(
+            [m.df_dict for m in self.events_df['metadata'].values], index=self.events_df.index
         )
-        metadata_df.index = np.arange(len(metadata_df))
-        metadata_df.index.names = ['metadata_id']
-
-        static_cols = ['event_id', 'event_type', 'subject_id']
+        list_cols_df['event_type'] = self.events_df['event_type']
+        list_cols_df['subject_id'] = self.events_df['subject_id']
 
-        non_event_cols = [c for c in metadata_df.columns if c not in static_cols]
-        cols_order = [*static_cols, *sorted(non_event_cols)]
+        metadata_cols = [c for c in list_cols_df.columns if c not in ('event_type', 'subject_id')]
 
-        self.joint_metadata_df = metadata_df[cols_order]
+        self.joint_metadata_df = self.explode_metadata_list_columns(list_cols_df, metadata_cols)
         self.metadata_is_fit = False
 
     @property
     def events_df(self): return self._events_df
 
+    @property
+    def subjects_df(self) -> Optional[pd.DataFrame]: return self._subjects_df
+
+    @subjects_df.setter
+    def subjects_df(self, new_df: Optional[pd.DataFrame]):
+        self._subjects_df = new_df
+        self._bump_events_version()
+
+    def _bump_events_version(self):
+        """
+        Increments `self._events_version`, which marks values derived from `self.events_df` and
+        `self.subjects_df` (e.g., the function values cached by `add_time_dependent_columns`) as stale. This
+        is called whenever either is set, sorted, or appended to, but in-place edits to them are not tracked.
+        """
+        self._events_version = getattr(self, '_events_version', 0) + 1
+
     @property
     def events_df_with_metadata(self):
         """
@@ -653,9 +940,14 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
             self.events_df.drop(columns='metadata', inplace=True)
 
         self.__clear_events_with_metadata()
+        self._bump_events_version()
         self.sort_events()
+        self.__update_event_summary_stats()
 
-        self.event_types = [e for e, _ in Counter(self.events_df.event_type).most_common()]
+    def __update_event_summary_stats(self):
+        """Recomputes the event types, subject IDs, and per-subject event counts from `self.events_df`."""
+        self._event_type_counts = Counter(self.events_df.event_type)
+        self.event_types = [e for e, _ in self._event_type_counts.most_common()]
         self.subject_ids = set(self.events_df.subject_id)
         self.n_events_per_subject = self.events_df.groupby('subject_id').timestamp.count().to_dict()
 
@@ -665,10 +957,258 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
 
             self.subject_ids.update(subjects_with_no_events)
 
+    def __add_event_summary_stats(self, new_events_df: pd.DataFrame):
+        """Updates the event types, subject IDs, and per-subject event counts with the new events."""
+        self._event_type_counts.update(new_events_df.event_type)
+        self.event_types = [e for e, _ in self._event_type_counts.most_common()]
+
+        new_events_per_subject = new_events_df.groupby('subject_id').timestamp.count()
+        for sid, n_events in new_events_per_subject.items():
+            self.n_events_per_subject[sid] = self.n_events_per_subject.get(sid, 0) + n_events
+        self.subject_ids.update(new_events_per_subject.index)
+
+    @TimeableMixin.TimeAs
+    def append_events(
+        self,
+        events_df: pd.DataFrame,
+        metadata_df: Optional[pd.DataFrame] = None,
+        metadata_list_cols: Optional[Sequence[str]] = None,
+        new_subjects_split: Optional[str] = None,
+        refit_drift_threshold: Optional[float] = None,
+    ) -> Optional[float]:
+        """
+        Appends new events and their metadata to the dataset, without re-processing the existing data. The new
+        data are merged into the (sorted) existing data, and the event summary statistics are updated
+        incrementally. New events and metadata are assigned IDs following the existing ones, in their input
+        order.
+
+        If the metadata pre-processors have already been fit, only the new rows are transformed, using the
+        current fit models, after which the pre-processors are updated incrementally with the new training
+        data: vocabulary frequencies are updated with the new observations (unseen elements are counted as
+        `'UNK'`, and vocabulary order is kept fixed, so existing indices remain valid) and normalizers which
+        support `partial_fit` (e.g., `StreamingQuantileNormalizer`) are updated with the new cleaned values.
+        Other models (e.g., outlier detectors) are left unchanged. If the new training data have drifted from
+        the fit pre-processors by more than `refit_drift_threshold`, all metadata is instead re-fit and
+        re-transformed from scratch.
+
+        Args:
+            `events_df` (`pd.DataFrame`):
+                The new events, in the format of the `events_df` argument to `EventStreamDataset.__init__`.
+                The existing event IDs must be integers.
+            `metadata_df` (`Optional[pd.DataFrame]`, defaults to `None`):
+                The metadata of the new events, in the format of the `metadata_df` argument to
+                `EventStreamDataset.__init__`.
+            `metadata_list_cols` (`Optional[Sequence[str]]`, defaults to `None`):
+                The per-event metadata list columns of the new events, as in `EventStreamDataset.__init__`.
+            `new_subjects_split` (`Optional[str]`, *optional*, defaults to `None`):
+                If specified, subjects which are new to the dataset are added to this (existing) split.
+                Otherwise, they are not added to any split.
+            `refit_drift_threshold` (`Optional[float]`, *optional*, defaults to `None`):
+                If specified, and the drift of the new training data (see `_appended_metadata_drift`) exceeds
+                this threshold, all metadata is re-fit from scratch. Otherwise, metadata is never re-fit.
+
+        Returns:
+            The drift of the new training data, or `None` if the metadata pre-processors were not fit.
+        """
+        if new_subjects_split is not None:
+            assert new_subjects_split in self.splits, f"Split {new_subjects_split} not found."
+
+        event_id_offset = int(self.events_df.index.max()) + 1 if len(self.events_df) else 0
+        metadata_id_offset = int(self.joint_metadata_df.index.max()) + 1 if len(self.joint_metadata_df) else 0
+
+        # Mirrors the event IDs assigned by `__init__`, so they can be mapped onto new IDs after the offset.
+        if events_df.index.names == ['event_id']: input_event_ids = events_df.index
+        else: input_event_ids = pd.RangeIndex(len(events_df))
+        new_event_ids = pd.Series(np.arange(len(events_df)) + event_id_offset, index=input_event_ids)
+
+        if metadata_df is not None: metadata_df = metadata_df.copy()
+        delta = self.__class__(
+            self.config, events_df, metadata_df=metadata_df, subjects_df=self.subjects_df,
+            metadata_list_cols=metadata_list_cols,
+        )
+
+        delta.events_df.index = pd.Index(new_event_ids.loc[delta.events_df.index].values, name='event_id')
+        delta.joint_metadata_df['event_id'] = new_event_ids.loc[delta.joint_metadata_df['event_id']].values
+
+        metadata_ids = delta.joint_metadata_df.index.values
+        delta.joint_metadata_df.index = pd.Index(
+            np.argsort(np.argsort(metadata_ids, kind='stable'), kind='stable') + metadata_id_offset,
+            name='metadata_id',
+        )
+
+        if new_subjects_split is not None:
+            new_subjects = set(delta.events_df.subject_id) - self.subject_ids
+            self.split_subjects = {
+                **self.split_subjects,
+                new_subjects_split: self.split_subjects[new_subjects_split] | new_subjects,
+            }
+
+        delta.split_subjects = self.split_subjects
+        delta.inferred_measurement_configs = self.inferred_measurement_configs
+        delta.metadata_is_fit = self.metadata_is_fit
+
+        time_dependent_cols = [
+            col for col, cfg in self.passed_measurement_configs.items()
+            if cfg.temporality == TemporalityType.FUNCTIONAL_TIME_DEPENDENT
+        ]
+        if any(col in self.events_df.columns for col in time_dependent_cols):
+            delta.add_time_dependent_columns()
+
+        drift, do_refit = None, False
+        if self.metadata_is_fit:
+            delta.transform_metadata()
+
+            drift = self._appended_metadata_drift(delta)
+            do_refit = (refit_drift_threshold is not None) and (drift > refit_drift_threshold)
+            if not do_refit:
+                self._update_vocabularies(delta)
+                self._partial_fit_streaming_normalizers(delta)
+
+        with self._time_as('append_events_merge'):
+            # Both parts are already sorted, so we merge the two sorted runs rather than re-sorting.
+            events_order = self._merged_sort_order(
+                self._events_df, delta.events_df, by=['subject_id', 'timestamp']
+            )
+            metadata_order = self._merged_sort_order(
+                self.joint_metadata_df, delta.joint_metadata_df, by=['subject_id']
+            )
+            self._events_df = self._concat_with_categoricals(self._events_df, delta.events_df).iloc[
+                events_order
+            ]
+            self.joint_metadata_df = self._concat_with_categoricals(
+                self.joint_metadata_df, delta.joint_metadata_df
+            ).iloc[metadata_order]
+
+            self._build_subject_offsets()
+            self._bump_events_version()
+            self.__add_event_summary_stats(delta.events_df)
+            self.__clear_events_with_metadata()
+
+        if do_refit: self.refit_metadata()
+        return drift
+
+    @staticmethod
+    def _merged_sort_order(df: pd.DataFrame, new_df: pd.DataFrame, by: Sequence[str]) -> np.ndarray:
+        """
+        Returns the positions, in `pd.concat((df, new_df))`, of the rows of `df` and `new_df` (each already
+        sorted by the columns `by`) in their stable merged order, with rows of `df` first among ties. Each
+        row of `new_df` is placed via a binary search into `df`, so this avoids re-sorting the combined rows.
+        Missing timestamps sort last, as in `pd.DataFrame.sort_values`.
+        """
+        keys = []
+        for col in by:
+            vals, new_vals = np.asarray(df[col].values), np.asarray(new_df[col].values)
+            if (vals.dtype != new_vals.dtype) or (vals.dtype == object):
+                # Structured arrays need native fields, so we compare by rank within the (few) unique values.
+                uniques = np.sort(pd.unique(np.concatenate((pd.unique(vals), pd.unique(new_vals)))))
+                vals, new_vals = np.searchsorted(uniques, vals), np.searchsorted(uniques, new_vals)
+            keys.append((col, vals, new_vals))
+
+        dtype = np.dtype([(col, vals.dtype) for col, vals, _ in keys])
+        old_keys, new_keys = np.empty(len(df), dtype=dtype), np.empty(len(new_df), dtype=dtype)
+        for col, vals, new_vals in keys:
+            old_keys[col], new_keys[col] = vals, new_vals
+
+        new_positions = np.searchsorted(old_keys, new_keys, side='right') + np.arange(len(new_df))
+        is_new = np.zeros(len(df) + len(new_df), dtype=bool)
+        is_new[new_positions] = True
+
+        order = np.empty(len(is_new), dtype=np.int64)
+        order[~is_new] = np.arange(len(df))
+        order[is_new] = len(df) + np.arange(len(new_df))
+        return order
+
+    @staticmethod
+    def _concat_with_categoricals(df: pd.DataFrame, new_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns `new_df` appended to `df`. Columns that are categorical in both keep a categorical dtype, with
+        the categories of `df` followed by any new categories of `new_df`, so the codes of `df` are unchanged.
+        Object columns holding only booleans (e.g., inlier flags without missing values) are explicitly cast
+        to `bool` for the concatenation, as pandas will no longer infer their type, then restored to `object`.
+        """
+        df, new_df = df.copy(), new_df.copy()
+        bool_object_cols = set()
+        for frame in (df, new_df):
+            for col in frame.columns[frame.dtypes == object]:
+                if pd.api.types.infer_dtype(frame[col], skipna=False) == 'boolean':
+                    frame[col] = frame[col].astype(bool)
+                    bool_object_cols.add(col)
+
+        for col in df.columns.intersection(new_df.columns):
+            if not (
+                isinstance(df[col].dtype, pd.CategoricalDtype) and
+                isinstance(new_df[col].dtype, pd.CategoricalDtype)
+            ): continue
+
+            categories = df[col].cat.categories
+            new_categories = new_df[col].cat.categories.difference(categories, sort=False)
+            if len(new_categories): df[col] = df[col].cat.add_categories(new_categories)
+            new_df[col] = new_df[col].cat.set_categories(df[col].cat.categories)
+
+        out = pd.concat((df, new_df))
+        for col in bool_object_cols: out[col] = out[col].astype(object)
+        return out
+
     @TimeableMixin.TimeAs
     def sort_events(self):
-        """Sorts events by subject ID and timestamp in ascending order."""
+        """
+        Sorts events by subject ID and timestamp in ascending order, and (stably) sorts metadata by subject ID,
+        so that each subject's events and metadata are stored contiguously. Then rebuilds the per-subject
+        offsets used by `subject_events_and_metadata`.
+        """
         self.events_df.sort_values(by=['subject_id', 'timestamp'], ascending=True, inplace=True)
+        self.joint_metadata_df.sort_values(by=['subject_id'], kind='stable', inplace=True)
+        self._build_subject_offsets()
+        self._bump_events_version()
+
+    @staticmethod
+    def _contiguous_offsets(keys: np.ndarray) -> Dict[Hashable, Tuple[int, int]]:
+        """
+        Returns a dictionary mapping each key in `keys` to the `(start, end)` row range it spans. Raises a
+        `ValueError` if the rows of any key are not contiguous.
+        """
+        if len(keys) == 0: return {}
+
+        starts = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+        ends = np.concatenate((starts[1:], [len(keys)]))
+
+        offsets = {k: (s, e) for k, s, e in zip(keys[starts].tolist(), starts.tolist(), ends.tolist())}
+        if len(offsets) != len(starts): raise ValueError("Keys are not stored contiguously!")
+        return offsets
+
+    @TimeableMixin.TimeAs
+    def _build_subject_offsets(self):
+        """
+        Builds `self._subject_event_offsets` and `self._subject_metadata_offsets`, which map each subject ID to
+        the `(start, end)` row range of that subject's rows in `self.events_df` and `self.joint_metadata_df`,
+        respectively. Requires both dataframes to be sorted by subject ID.
+        """
+        self._subject_event_offsets = self._contiguous_offsets(self.events_df['subject_id'].values)
+        self._subject_metadata_offsets = self._contiguous_offsets(self.joint_metadata_df['subject_id'].values)
+
+    @TimeableMixin.TimeAs
+    def subject_events_and_metadata(self, subject_id: Hashable) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Returns the events and metadata for subject `subject_id`, as zero-copy, positional slices of
+        `self.events_df` and `self.joint_metadata_df` (so they should not be modified in place). Runs in
+        constant time in the size of the dataset.
+
+        Args:
+            `subject_id` (`Hashable`): The subject whose data should be returned.
+
+        Returns:
+            * `events` (`pd.DataFrame`): The rows of `self.events_df` for this subject, in timestamp order.
+            * `metadata` (`pd.DataFrame`):
+                The rows of `self.joint_metadata_df` for this subject. Unlike `self.metadata_df(...)`,
+                columns which are entirely null for this subject are retained.
+            Both are empty if the subject has no events.
+        """
+        events_start, events_end = self._subject_event_offsets.get(subject_id, (0, 0))
+        metadata_start, metadata_end = self._subject_metadata_offsets.get(subject_id, (0, 0))
+        return (
+            self.events_df.iloc[events_start:events_end],
+            self.joint_metadata_df.iloc[metadata_start:metadata_end],
+        )
 
     @TimeableMixin.TimeAs
     def agg_by_time_type(self):
@@ -678,25 +1218,33 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
         captured in the output metadata object.
         """
 
-        with self._time_as('agg_by_time_type_group_by'):
-            self.events_df = self.events_df.reset_index().groupby([
-                'subject_id', 'timestamp', 'event_type'
-            ]).event_id.agg(set).reset_index()
-        self.events_df.rename(columns={'event_id': 'old_event_id'}, inplace=True)
+        group_cols = ['subject_id', 'timestamp', 'event_type']
 
-        new_to_old_set = self.events_df['old_event_id'].to_dict()
-        self.events_df.drop(columns=['old_event_id'], inplace=True)
+        with self._time_as('agg_by_time_type_group_by'):
+            # New event IDs are the group numbers of the (sorted) groups, which yields the same ordering as
+            # aggregating the old event IDs of each group would, without building python sets or mappings of
+            # IDs. Events with null group keys are dropped, and map to -1.
+            new_event_ids = self.events_df.groupby(group_cols).ngroup().fillna(-1).values.astype(np.int64)
 
-        old_to_new = {}
-        for new, olds in new_to_old_set.items():
-            for old in olds: old_to_new[old] = new
+            is_first = ~pd.Series(new_event_ids).duplicated().values & (new_event_ids != -1)
+            first_idx = np.flatnonzero(is_first)
+            first_idx = first_idx[np.argsort(new_event_ids[first_idx])]
+            new_events_df = self.events_df[group_cols].iloc[first_idx].reset_index(drop=True)
 
         with self._time_as('agg_by_time_type_update_metadata_event_ids'):
-            # This may cause unnecessary OOMs: https://github.com/pandas-dev/pandas/issues/6697
-            #self.joint_metadata_df.event_id.replace(old_to_new, inplace=True)
-            self.joint_metadata_df['event_id'] = self.joint_metadata_df.event_id.apply(
-                lambda x: old_to_new[x]
-            )
+            # We remap metadata event IDs via a hash join against the old event IDs followed by a numpy
+            # gather, which (unlike `replace` or a python mapping; see, e.g.,
+            # https://github.com/pandas-dev/pandas/issues/6697) needs only a few integer arrays of memory.
+            old_event_ids = self.joint_metadata_df['event_id'].values
+            old_event_idx = self.events_df.index.get_indexer(old_event_ids)
+            is_missing = (old_event_idx == -1)
+            is_missing[~is_missing] = (new_event_ids[old_event_idx[~is_missing]] == -1)
+            if is_missing.any():
+                missing = set(old_event_ids[is_missing])
+                raise KeyError(f"Metadata event IDs {missing} have no aggregated event!")
+            self.joint_metadata_df['event_id'] = new_event_ids[old_event_idx]
+
+        self.events_df = new_events_df
         self.__clear_events_with_metadata()
 
     @SeedableMixin.WithSeed
@@ -739,12 +1287,92 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
 
         self.split_subjects = {k: set(v) for k, v in zip(split_names, subjects_per_split)}
 
+    @property
+    def split_subjects(self) -> Dict[str, FrozenSet[Hashable]]:
+        """
+        The subjects in each split, as immutable `frozenset`s. To change the splits, assign a new dictionary
+        to `split_subjects` (which clears the split caches) rather than modifying this one in place.
+        """
+        return self._split_subjects
+
+    @split_subjects.setter
+    def split_subjects(self, split_subjects: Dict[str, Set[Hashable]]):
+        self._split_subjects = {sp: frozenset(subjects) for sp, subjects in split_subjects.items()}
+        self._split_membership_cache = {}
+
     @property
     def splits(self): return set(self.split_subjects.keys())
 
+    def _split_cache(self) -> Dict[str, Any]:
+        """
+        Returns the cache of data derived from `self.split_subjects` (e.g., the codes of
+        `_subject_split_codes`), which is cleared whenever `split_subjects` is assigned, including by `split`.
+        """
+        # The cache is not saved, so is absent on freshly loaded datasets.
+        if not hasattr(self, '_split_membership_cache'): self._split_membership_cache = {}
+        return self._split_membership_cache
+
+    def _subject_split_codes(self) -> pd.Series:
+        """
+        Returns a series mapping each subject in any split to its integer split code, a bitmask with bit `i`
+        set if the subject is in the `i`-th split of `self.split_subjects`. Subjects in no split are omitted.
+        The codes, and the per-row codes of `_row_split_codes`, are cached until the splits change.
+        """
+        cache = self._split_cache()
+        if 'subjects' not in cache:
+            assert len(self.split_subjects) < 63, f"At most 62 splits are supported; got {len(self.splits)}!"
+
+            codes = [pd.Series(0, index=pd.Index([], dtype=object), dtype=np.int64)] + [
+                pd.Series(np.int64(1) << i, index=list(subjects), dtype=np.int64)
+                for i, subjects in enumerate(self.split_subjects.values())
+            ]
+            cache['subjects'] = pd.concat(codes).groupby(level=0).sum()
+
+        return cache['subjects']
+
+    def _split_bitmask(self, split: Optional[str] = None, splits: Optional[Sequence[str]] = None) -> int:
+        """Returns the bitmask of split codes in split `split` or splits `splits` (can't set both)."""
+        assert not ((split is not None) and (splits is not None))
+        if split is not None: splits = [split]
+
+        split_idx = {sp: i for i, sp in enumerate(self.split_subjects)}
+        for sp in splits: assert sp in split_idx, f"Split {sp} not found."
+        return sum(1 << i for i in set(split_idx[sp] for sp in splits))
+
+    def _row_split_codes(self, df_name: str, df: pd.DataFrame) -> np.ndarray:
+        """
+        Returns the split codes of the rows of `df`, the dataframe stored in attribute `df_name`, whose subject
+        IDs are in its index (for `subjects_df`) or its `subject_id` column. Codes are cached against the
+        dataframe's index object, which pandas replaces whenever rows are added, dropped, or re-ordered.
+        """
+        subject_codes = self._subject_split_codes()
+        cache = self._split_cache()
+
+        cached_index, codes = cache.get(df_name, (None, None))
+        if (cached_index is not df.index) or (len(codes) != len(df)):
+            subject_ids = df.index if df_name == 'subjects_df' else df['subject_id'].values
+            subject_idx = subject_codes.index.get_indexer(subject_ids)
+            codes = np.where(subject_idx == -1, 0, subject_codes.values[subject_idx])
+            cache[df_name] = (df.index, codes)
+
+        return codes
+
+    def _split_row_mask(
+        self, df_name: str, split: Optional[str] = None, splits: Optional[Sequence[str]] = None
+    ) -> np.ndarray:
+        """
+        Returns a boolean mask of the rows of the dataframe stored in attribute `df_name` (one of
+        `subjects_df`, `events_df`, or `joint_metadata_df`) for subjects in split `split` or splits `splits`.
+        """
+        df = getattr(self, df_name)
+        return (self._row_split_codes(df_name, df) & self._split_bitmask(split, splits)) != 0
+
     @TimeableMixin.TimeAs
     def subject_ids_for_split(self, split: Optional[str] = None, splits: Optional[str] = None) -> Set[int]:
-        """Returns subjects in split `split` or `splits` (both cannot be set; returns all if neither)."""
+        """
+        Returns subjects in split `split` or `splits` (both cannot be set; returns all if neither). The
+        subjects of a given set of splits are cached (as a `frozenset`) until the splits change.
+        """
         if (split is None) and (splits is None): return self.subject_ids
 
         assert not ((split is not None) and (splits is not None))
@@ -752,7 +1380,10 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
 
         for sp in splits: assert sp in self.splits, f"Split {sp} not found."
 
-        return set().union(*(self.split_subjects[sp] for sp in splits))
+        cache = self._split_cache()
+        key = ('subject_ids', frozenset(splits))
+        if key not in cache: cache[key] = frozenset().union(*(self.split_subjects[sp] for sp in splits))
+        return cache[key]
 
     # We have special callouts for train, tuning, and held_out split subjects.
     @property
@@ -762,21 +1393,16 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
     @property
     def held_out_subject_ids(self): return self.subject_ids_for_split('held_out')
 
+    def _subjects_for_split(self, split: str) -> pd.DataFrame:
+        """Returns the rows of `self.subjects_df` for subjects in split `split`."""
+        return self.subjects_df[self._split_row_mask('subjects_df', split)]
+
     @property
-    def train_subjects_df(self):
-        return self.subjects_df[
-            self.subjects_df.index.isin(self.subject_ids_for_split('train'))
-        ]
+    def train_subjects_df(self): return self._subjects_for_split('train')
     @property
-    def tuning_subjects_df(self):
-        return self.subjects_df[
-            self.subjects_df.index.isin(self.subject_ids_for_split('tuning'))
-        ]
+    def tuning_subjects_df(self): return self._subjects_for_split('tuning')
     @property
-    def held_out_subjects_df(self):
-        return self.subjects_df[
-            self.subjects_df.index.isin(self.subject_ids_for_split('held_out'))
-        ]
+    def held_out_subjects_df(self): return self._subjects_for_split('held_out')
 
     @TimeableMixin.TimeAs
     def _events_for_split(
@@ -784,7 +1410,47 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
     ) -> pd.DataFrame:
         """Returns the events in split `split` or splits `splits` (can't set both), or all events."""
         if split is None and splits is None: return self.events_df
-        return self.events_df[self.events_df.subject_id.isin(self.subject_ids_for_split(split, splits))]
+        return self.events_df[self._split_row_mask('events_df', split, splits)]
+
+    def _metadata_event_type_index(
+        self
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[Hashable, Tuple[int, int]]]:
+        """
+        Returns an index partitioning the rows of `self.joint_metadata_df` by event type, which is cached
+        against the index object of `self.joint_metadata_df` (and is thus rebuilt whenever its rows change).
+
+        Returns:
+            `rows_by_event_type` (`np.ndarray`):
+                A permutation of the row positions of `self.joint_metadata_df` which stably groups them by
+                event type, so the positions of each event type's rows are sorted. Its values map positions in
+                the partitioned order back to the original rows.
+            `partitioned_positions` (`np.ndarray`):
+                The inverse permutation of `rows_by_event_type`, mapping each original row position to its
+                position in the partitioned order.
+            `event_type_offsets` (`Dict[Hashable, Tuple[int, int]]`):
+                A mapping from each event type to the `(start, end)` range of `rows_by_event_type` holding the
+                positions of its rows.
+        """
+        df = self.joint_metadata_df
+        cached = getattr(self, '_metadata_event_type_index_cache', None)
+        if (cached is None) or (cached[0] is not df.index) or (len(cached[1]) != len(df)):
+            codes, event_types = pd.factorize(df['event_type'].values)
+            rows_by_event_type = np.argsort(codes, kind='stable')
+
+            # Rows with null event types (code -1) sort first, and are not in any range.
+            counts = np.bincount(codes[codes != -1], minlength=len(event_types))
+            ends = (codes == -1).sum() + np.cumsum(counts)
+            event_type_offsets = {
+                et: (int(end - count), int(end)) for et, count, end in zip(event_types, counts, ends)
+            }
+
+            partitioned_positions = np.empty_like(rows_by_event_type)
+            partitioned_positions[rows_by_event_type] = np.arange(len(rows_by_event_type))
+
+            cached = (df.index, rows_by_event_type, partitioned_positions, event_type_offsets)
+            self._metadata_event_type_index_cache = cached
+
+        return cached[1], cached[2], cached[3]
 
     @TimeableMixin.TimeAs
     def __metadata_df_idx(
@@ -795,11 +1461,13 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
         split: Optional[str] = None,
         subject_ids: Optional[Sequence[Hashable]] = None,
         subject_id: Optional[Hashable] = None,
-    ) -> np.ndarray:
+    ) -> Optional[np.ndarray]:
         """
-        Returns a numpy array that serves as a valid index into `self.joint_metadata_df` corresponding to
-        events following input constraints. The index returned is in the same order as
-        `self.joint_metadata_df` as of the time of the function call.
+        Returns the (sorted) row positions in `self.joint_metadata_df` of metadata events following input
+        constraints, as of the time of the function call. Positions are gathered from the per-subject offsets
+        or the event type partitioned index and only then filtered by any further constraints, so the cost is
+        proportional to the number of rows selected, rather than the total number of metadata rows (save for
+        split-only constraints).
 
         Args:
             * `event_types` (`Optional[Sequence[str]]`), *optional*, defaults to `None`:
@@ -827,8 +1495,8 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
                 subject `subject_id`.
                 Cannot be simultanesouly set with `subject_ids`.
         Returns:
-            A boolean index into `self.joint_metadata_df` which satisfies the constraints implied by the
-            arguments.
+            An integer position index into `self.joint_metadata_df` which satisfies the constraints implied by
+            the arguments, for use with `.iloc`, or `None` if there are no constraints.
         """
 
         assert not ((subject_id is not None) and (subject_ids is not None))
@@ -836,30 +1504,62 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
 
         if subject_id is not None: subject_ids = [subject_id]
         if subject_ids is not None: assert (split is None) and (splits is None)
-        elif ((split is not None) or (splits is not None)):
-            subject_ids = self.subject_ids_for_split(split, splits)
 
         if event_type is not None: event_types = [event_type]
 
         event_types = set(event_types) if event_types is not None else None
 
         out_idx = None
+        if subject_ids is not None:
+            # The metadata of each subject is stored contiguously, so we can build the index from the
+            # per-subject offsets rather than scanning the full `subject_id` column.
+            ranges = set(self._subject_metadata_offsets.get(subject_id, (0, 0)) for subject_id in subject_ids)
+            out_idx = np.concatenate(
+                [np.zeros(0, dtype=np.int64)] + [np.arange(st, end) for st, end in sorted(ranges) if end > st]
+            )
+
         if event_types is not None:
-            out_idx = self.joint_metadata_df.event_type.isin(event_types).values
+            # Likewise, we use the event type partitioned index rather than scanning the `event_type` column.
+            rows_by_event_type, partitioned_positions, event_type_offsets = self._metadata_event_type_index()
+            type_ranges = [event_type_offsets[et] for et in event_types if et in event_type_offsets]
 
-        if subject_ids is not None:
-            subjects_idx = self.joint_metadata_df.subject_id.isin(subject_ids).values
-            if out_idx is None: out_idx = subjects_idx
-            else: out_idx = out_idx & subjects_idx
+            if out_idx is None:
+                out_idx = np.concatenate(
+                    [np.zeros(0, dtype=np.int64)] + [rows_by_event_type[st:end] for st, end in type_ranges]
+                )
+                if len(type_ranges) > 1: out_idx.sort()
+            else:
+                positions = partitioned_positions[out_idx]
+                is_of_type = np.zeros(len(out_idx), dtype=bool)
+                for st, end in type_ranges: is_of_type |= (positions >= st) & (positions < end)
+                out_idx = out_idx[is_of_type]
+
+        if (split is not None) or (splits is not None):
+            if out_idx is None:
+                out_idx = np.flatnonzero(self._split_row_mask('joint_metadata_df', split, splits))
+            else:
+                codes = self._row_split_codes('joint_metadata_df', self.joint_metadata_df)
+                out_idx = out_idx[(codes[out_idx] & self._split_bitmask(split, splits)) != 0]
 
         return out_idx
 
     @TimeableMixin.TimeAs
-    def metadata_df(self, *args, **kwargs):
-        """Retrieves restricted metadata records and drops nan columns"""
+    def metadata_df(self, *args, columns: Optional[Sequence[str]] = None, **kwargs):
+        """
+        Retrieves restricted metadata records and drops nan columns. Restrictions are as for
+        `__metadata_df_idx`.
+
+        Args:
+            `columns` (`Optional[Sequence[str]]`, *optional*, defaults to `None`):
+                If specified, only these columns are retrieved; the rows are then restricted, and nan columns
+                dropped, over these columns alone. Requested columns absent from the metadata are omitted, as
+                are all-nan columns.
+        """
         idx = self.__metadata_df_idx(*args, **kwargs)
-        if idx is None: df = self.joint_metadata_df
-        else: df = self.joint_metadata_df.loc[idx]
+
+        df = self.joint_metadata_df
+        if columns is not None: df = df[[c for c in columns if c in df.columns]]
+        if idx is not None: df = df.iloc[idx]
         return df.dropna(axis=1, how='all')
 
     # Special accessors for train, tuning, and held-out splits.
@@ -936,13 +1636,57 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
 
     @TimeableMixin.TimeAs
     def add_time_dependent_columns(self):
-        timestamps_series = self.events_df.set_index('subject_id', append=True).timestamp
+        """
+        Adds (or resets) the column of each functional time-dependent measurement to `self.events_df`.
+        Functors supporting `vectorized_call` are evaluated on epoch nanosecond arrays; others on series.
+
+        Function values are cached per functor config, against the version of the events and subjects (see
+        `_bump_events_version`), so re-running `preprocess_metadata` on unchanged events does not recompute
+        them.
+        """
+        cache = getattr(self, '_time_dependent_cache', {})
+        self._time_dependent_cache = cache
+
         for col, cfg in self.passed_measurement_configs.items():
             if cfg.temporality != TemporalityType.FUNCTIONAL_TIME_DEPENDENT: continue
 
-            function_vals = cfg.functor(timestamps_series, self.subjects_df)
-            function_vals.index = function_vals.index.get_level_values('event_id')
-            self.events_df[col] = function_vals
+            cache_key = json.dumps(cfg.functor.to_dict(), sort_keys=True, default=str)
+            cached_version, function_vals = cache.get(cache_key, (None, None))
+            if cached_version != self._events_version:
+                if cfg.functor.is_vectorized: function_vals = self._vectorized_functor_vals(cfg.functor)
+                else:
+                    timestamps_series = self.events_df.set_index('subject_id', append=True).timestamp
+                    function_vals = cfg.functor(timestamps_series, self.subjects_df)
+                    function_vals.index = function_vals.index.get_level_values('event_id')
+                    function_vals = function_vals.reindex(self.events_df.index).values
+                cache[cache_key] = (self._events_version, function_vals)
+
+            # We copy the cached values, as the column will subsequently be transformed in place.
+            self.events_df[col] = function_vals.copy()
+
+    def _vectorized_functor_vals(self, functor: TimeDependentFunctor) -> np.ndarray:
+        """
+        Returns the values of the vectorized `functor` for each event in `self.events_df`. The subject columns
+        it requires are gathered once per subject and repeated over the subject's (contiguous) events, per
+        `self._subject_event_offsets`.
+        """
+        subject_cols = functor.subject_columns()
+        subject_vals = {}
+        if subject_cols:
+            assert self.subjects_df is not None, f"{functor} requires a subjects_df!"
+
+            subject_ids = list(self._subject_event_offsets.keys())
+            subject_rows = self.subjects_df.index.get_indexer(subject_ids)
+            if (subject_rows == -1).any():
+                missing = set(np.asarray(subject_ids, dtype=object)[subject_rows == -1])
+                raise KeyError(f"Subjects {missing} are not in subjects_df!")
+
+            n_events = np.array([end - start for start, end in self._subject_event_offsets.values()])
+            assert n_events.sum() == len(self.events_df), "Subject event offsets are stale!"
+            for col in subject_cols:
+                subject_vals[col] = np.repeat(self.subjects_df[col].values[subject_rows], n_events)
+
+        return functor.vectorized_call(to_epoch_ns(self.events_df['timestamp']), subject_vals)
 
     @TimeableMixin.TimeAs
     def fit_metadata(self):
@@ -955,6 +1699,172 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
         self._fit_categorical_metadata()
         self.metadata_is_fit = True
 
+    @TimeableMixin.TimeAs
+    def refit_metadata(self):
+        """
+        Discards the fit pre-processors and transformed metadata, then re-fits and re-transforms all metadata
+        from the (restored) raw values.
+        """
+        self.restore_numerical_metadata_columns()
+
+        for m in self.measurements:
+            df = self._measurement_df(self.measurement_configs[m])
+            if (df is not None) and (m in df.columns) and isinstance(df[m].dtype, pd.CategoricalDtype):
+                df[m] = df[m].astype(object)
+
+        inlier_cols = [f"{val_col}_is_inlier" for _, val_col in self.dynamic_numerical_columns]
+        self.joint_metadata_df.drop(columns=inlier_cols, errors='ignore', inplace=True)
+        inlier_cols = [f"{col}_is_inlier" for col in self.time_dependent_numerical_columns]
+        self.events_df.drop(columns=inlier_cols, errors='ignore', inplace=True)
+
+        self.inferred_measurement_configs = {}
+        self.fit_metadata()
+        self.transform_metadata()
+
+    def _train_measurement_df(
+        self, config: MeasurementConfig, columns: Optional[Sequence[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Returns the training split dataframe in which the measurement configured by `config` is stored,
+        restricted to those of `columns` which it contains if `columns` is specified. As for `metadata_df`,
+        all-nan columns are omitted for dynamic measurements.
+        """
+        if columns is not None: columns = [c for c in columns if c is not None]
+
+        match config.temporality:
+            case TemporalityType.DYNAMIC:
+                return self.metadata_df(
+                    event_types=config.present_in_event_types, split='train', columns=columns
+                )
+            case TemporalityType.STATIC: df = self.train_subjects_df
+            case TemporalityType.FUNCTIONAL_TIME_DEPENDENT: df = self.train_events_df
+
+        if columns is not None: df = df[[c for c in columns if c in df.columns]]
+        return df
+
+    @classmethod
+    def _vocab_counts(cls, vocab: Vocabulary, vals: pd.Series) -> np.ndarray:
+        """Returns the number of observations in `vals` of each element of `vocab` (unseen ones as UNK)."""
+        codes = cls.vocab_codes(vals, vocab)
+        return np.bincount(codes[codes >= 0], minlength=len(vocab))
+
+    @TimeableMixin.TimeAs
+    def _appended_metadata_drift(self, delta: 'EventStreamDataset') -> float:
+        """
+        Returns the drift of the (transformed) training data of the appended dataset `delta` from the fit
+        pre-processors. This is the largest, over all non-static measurements, of:
+            * The total variation distance between the vocabulary frequencies of the measurement and the
+              frequencies of its new observations.
+            * For key-value numerical measurements with quantile normalizers, the Kolmogorov-Smirnov
+              statistic of the new normalized values (mapped to their quantiles, for normal outputs) against
+              the uniform distribution they would follow absent drift.
+        """
+        drifts = [0.]
+        for col in self.measurements:
+            config = self.measurement_configs[col]
+            if config.temporality == TemporalityType.STATIC: continue
+
+            new_df = delta._train_measurement_df(config, columns=[col, config.values_column])
+            if col not in new_df: continue
+
+            new_obs = new_df[col].dropna()
+            if (config.vocabulary is not None) and len(new_obs):
+                new_freqs = self._vocab_counts(config.vocabulary, new_obs) / len(new_obs)
+                drifts.append(0.5 * np.abs(new_freqs - config.vocabulary.obs_frequencies).sum())
+
+            measurement_metadata = config.measurement_metadata
+            if (
+                (config.temporality != TemporalityType.DYNAMIC) or (not config.is_numeric) or
+                (config.values_column not in new_df) or (measurement_metadata is None) or
+                ('normalizer' not in measurement_metadata)
+            ): continue
+
+            output_distributions = measurement_metadata['normalizer'].map(
+                lambda M: getattr(M, 'output_distribution', None)
+            ).reindex(np.asarray(new_df[col], dtype=object)).values
+            vals = new_df[config.values_column].values.astype(float)
+
+            is_quantile_normalized = np.isin(output_distributions, ['uniform', 'normal']) & ~np.isnan(vals)
+            if not is_quantile_normalized.any(): continue
+
+            quantiles = vals[is_quantile_normalized]
+            is_normal = output_distributions[is_quantile_normalized] == 'normal'
+            quantiles[is_normal] = stats.norm.cdf(quantiles[is_normal])
+            drifts.append(stats.kstest(quantiles, 'uniform').statistic)
+
+        return float(max(drifts))
+
+    @TimeableMixin.TimeAs
+    def _update_vocabularies(self, delta: 'EventStreamDataset'):
+        """
+        Updates the vocabulary frequencies of all non-static measurements with the observations in the
+        training data of the appended dataset `delta`, in place. Vocabularies tracking raw counts are updated
+        exactly; otherwise, old counts are recovered from the frequencies and the number of old observations.
+        """
+        for col in self.measurements:
+            config = self.measurement_configs[col]
+            if (config.vocabulary is None) or (config.temporality == TemporalityType.STATIC): continue
+
+            new_df = delta._train_measurement_df(config, columns=[col])
+            if col not in new_df: continue
+            new_obs = new_df[col].dropna()
+            if not len(new_obs): continue
+
+            vocab = config.vocabulary
+            new_counts = self._vocab_counts(vocab, new_obs)
+
+            if vocab.obs_counts is not None:
+                vocab.obs_counts = vocab.obs_counts + new_counts
+                vocab.total_observations += len(new_obs)
+                vocab.obs_frequencies = vocab.obs_counts / vocab.total_observations
+                continue
+
+            old_df = self._train_measurement_df(config, columns=[col])
+            n_old_obs = old_df[col].notna().sum() if col in old_df else 0
+
+            counts = vocab.obs_frequencies * n_old_obs + new_counts
+            vocab.obs_frequencies = counts / counts.sum()
+
+    @TimeableMixin.TimeAs
+    def _partial_fit_streaming_normalizers(self, delta: 'EventStreamDataset'):
+        """
+        Updates the fit normalizers of key-value numerical measurements which support `partial_fit` with the
+        cleaned (dropped, censored, and inlier) values in the training data of the appended dataset `delta`.
+        Cleaned values are re-derived from the raw (backed-up) values of `delta`.
+        """
+        for key_col, val_col in self.dynamic_numerical_columns:
+            config = self.measurement_configs[key_col]
+            measurement_metadata = config.measurement_metadata
+            if (measurement_metadata is None) or ('normalizer' not in measurement_metadata): continue
+
+            normalizers = measurement_metadata['normalizer'].values
+            can_update = np.array([hasattr(M, 'partial_fit') for M in normalizers], dtype=bool)
+            if not can_update.any(): continue
+
+            backup_key_col, backup_val_col = f"__backup_{key_col}", f"__backup_{val_col}"
+            new_df = delta._train_measurement_df(config, columns=[backup_key_col, backup_val_col])
+            if (backup_key_col not in new_df) or (backup_val_col not in new_df): continue
+
+            kv_df = new_df[[backup_key_col, backup_val_col]].rename(
+                columns={backup_key_col: key_col, backup_val_col: val_col}
+            )
+            kv_df = kv_df[~kv_df[key_col].isna()].copy()
+            kv_df = self.transform_categorical_key_values_df(measurement_metadata, kv_df, key_col, val_col)
+            kv_df = kv_df[kv_df[key_col].isin(config.vocabulary.vocab_set) & ~kv_df[val_col].isna()]
+            if not len(kv_df): continue
+
+            # The cleaned values are those transformed under all models other than the normalizers.
+            keys = kv_df[key_col].values
+            vals, _ = self._transform_numerical_metadata_arrays(
+                keys, kv_df[val_col].values.astype(float), measurement_metadata,
+                do_remove_outliers=(self.config.outlier_detector_config is not None), do_normalize=False,
+            )
+
+            key_idx = measurement_metadata.index.get_indexer(keys)
+            is_present = ~np.isnan(vals)
+            for i in np.unique(key_idx[is_present & can_update[key_idx]]):
+                normalizers[i].partial_fit(vals[is_present & (key_idx == i)].reshape(-1, 1))
+
     @property
     def measurement_configs(self):
         """
@@ -1040,7 +1950,9 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
             self.inferred_measurement_configs[key_col] = inferred_config
 
         with self._time_as('get_kv_df'):
-            kv_train_df = self.metadata_df(event_types=event_types, split='train')[[key_col, val_col]]
+            kv_train_df = self.metadata_df(
+                event_types=event_types, split='train', columns=[key_col, val_col]
+            )[[key_col, val_col]]
 
             N = len(kv_train_df[key_col].dropna())
             total_possible_events = len(kv_train_df)
@@ -1065,36 +1977,108 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
             vals = self.drop_oob_and_censor_outliers(vals, measurement_metadata)
 
         # 3. Per-metadata key, process the metadata values.
-        with warnings.catch_warnings():
-            # As `_fit_dynamic_numerical_metadata_column_vals` returns None, pandas throws a warning about the
-            # default dtype for an empty Series, so we add a filter to ignore that.
-            warnings.simplefilter(action='ignore', category=FutureWarning)
-            vals.groupby(level=key_col).transform(
-                self._fit_dynamic_numerical_metadata_column_vals,
-                key_col=key_col,
-                total_col_obs=N
-            )
+        # Each key is fit under its own seed, drawn up front in key order, so that fits are identical whether
+        # they are run serially or in parallel.
+        key_groups = [(gp_key, gp_vals.rename(gp_key)) for gp_key, gp_vals in vals.groupby(level=key_col)]
+        key_seeds = np.random.randint(0, 2**32 - 1, size=len(key_groups), dtype=np.int64)
 
-    @TimeableMixin.TimeAs
-    def _fit_dynamic_numerical_metadata_column_vals(
-        self, vals: pd.Series, key_col: str, total_col_obs: int
-    ):
-        gp_key = vals.name
-        measurement_metadata = self.inferred_measurement_configs[key_col].measurement_metadata
+        if self.config.num_numerical_fit_workers > 1 and len(key_groups) > 1:
+            self._fit_dynamic_numerical_metadata_column_vals_parallel(key_groups, key_seeds, key_col, N)
+        else:
+            self._fit_dynamic_numerical_metadata_column_vals_serial(key_groups, key_seeds, key_col, N)
 
+    @staticmethod
+    def _metadata_row_for_key(measurement_metadata: pd.DataFrame, gp_key: Hashable) -> pd.Series:
+        """Returns a copy of the row of `measurement_metadata` for `gp_key`, adding an empty one if needed."""
         if gp_key not in measurement_metadata.index:
             measurement_metadata.loc[gp_key] = pd.Series(
                 [None for _ in measurement_metadata.columns], dtype=object
             )
 
-        measurement_metadata_copy = measurement_metadata.loc[gp_key].copy()
+        return measurement_metadata.loc[gp_key].copy()
 
-        output = self._fit_numerical_metadata_column_vals(
-            vals, measurement_metadata_copy, total_col_obs
-        )
+    @TimeableMixin.TimeAs
+    def _fit_dynamic_numerical_metadata_column_vals_serial(
+        self,
+        key_groups: List[Tuple[Hashable, pd.Series]],
+        key_seeds: np.ndarray,
+        key_col: str,
+        total_col_obs: int,
+    ):
+        """
+        Fits the per-key numerical metadata models for key column `key_col` in the main process, fitting each
+        key's metadata row via `_fit_numerical_metadata_column_vals` under that key's seed.
+
+        Args:
+            `key_groups` (`List[Tuple[Hashable, pd.Series]]`): The keys and their values, in key order.
+            `key_seeds` (`np.ndarray`): The seeds under which each key should be fit.
+            `key_col` (`str`): The column name of the governing key column.
+            `total_col_obs` (`int`):
+                The total number of column observations that were observed for this metadata column (_not_
+                just this key!)
+        """
+        measurement_metadata = self.inferred_measurement_configs[key_col].measurement_metadata
 
-        measurement_metadata.loc[gp_key] = measurement_metadata_copy
-        return output
+        for (gp_key, gp_vals), seed in zip(key_groups, key_seeds):
+            metadata_row = self._metadata_row_for_key(measurement_metadata, gp_key)
+            with _temporary_np_seed(seed):
+                self._fit_numerical_metadata_column_vals(gp_vals, metadata_row, total_col_obs)
+            measurement_metadata.loc[gp_key] = metadata_row
+
+    @TimeableMixin.TimeAs
+    def _fit_dynamic_numerical_metadata_column_vals_parallel(
+        self,
+        key_groups: List[Tuple[Hashable, pd.Series]],
+        key_seeds: np.ndarray,
+        key_col: str,
+        total_col_obs: int,
+    ):
+        """
+        Fits the per-key numerical metadata models for key column `key_col` across a pool of
+        `self.config.num_numerical_fit_workers` processes. Each worker receives one key's values, a copy of
+        its metadata row, its seed, and a snapshot of `self.config` (without measurement configs), and returns
+        the fit metadata row. Rows are then merged into `self.inferred_measurement_configs` in key order, so
+        the results are identical to those of the serial path.
+
+        Args:
+            `key_groups` (`List[Tuple[Hashable, pd.Series]]`): The keys and their values, in key order.
+            `key_seeds` (`np.ndarray`): The seeds under which each key should be fit.
+            `key_col` (`str`): The column name of the governing key column.
+            `total_col_obs` (`int`):
+                The total number of column observations that were observed for this metadata column (_not_
+                just this key!)
+        """
+        measurement_metadata = self.inferred_measurement_configs[key_col].measurement_metadata
+        config_snapshot = dataclasses.replace(self.config, measurement_configs={})
+
+        with ProcessPoolExecutor(max_workers=self.config.num_numerical_fit_workers) as pool:
+            futures = [
+                pool.submit(
+                    self._fit_numerical_metadata_key_in_worker, config_snapshot, gp_vals,
+                    self._metadata_row_for_key(measurement_metadata, gp_key), total_col_obs, seed
+                ) for (gp_key, gp_vals), seed in zip(key_groups, key_seeds)
+            ]
+
+            for (gp_key, _), future in zip(key_groups, futures):
+                measurement_metadata.loc[gp_key] = future.result()
+
+    @classmethod
+    def _fit_numerical_metadata_key_in_worker(
+        cls,
+        config: EventStreamDatasetConfig,
+        vals: pd.Series,
+        measurement_metadata: pd.Series,
+        total_col_obs: int,
+        seed: int,
+    ) -> pd.Series:
+        """
+        Fits the numerical metadata models for a single key within a worker process, via
+        `_fit_numerical_metadata_vals_for_config` with the settings in `config`, and returns the fit metadata
+        row.
+        """
+        with _temporary_np_seed(seed):
+            cls._fit_numerical_metadata_vals_for_config(config, vals, measurement_metadata, total_col_obs)
+        return measurement_metadata
 
     @TimeableMixin.TimeAs
     def _fit_time_dependent_numerical_metadata_column(self, col: str):
@@ -1122,7 +2106,7 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
             self.inferred_measurement_configs[col] = inferred_config
 
         with self._time_as('get_vals'):
-            vals = self.train_events_df[col]
+            vals = self._train_measurement_df(inferred_config, columns=[col])[col]
 
             N = len(vals.dropna())
             total_possible_events = len(vals)
@@ -1160,9 +2144,22 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
         self, vals: pd.Series, measurement_metadata: pd.Series, total_col_obs: int
     ):
         """
-        Fits the requisite numerical preprocessors on the given metadata column values.
-        TODO(mmd): It may be that this is not efficient, and instead configuration objects should be passed in
-        as inputs to avoid needing the full class context across all groupby workers.
+        Fits the requisite numerical preprocessors on the given metadata column values, via
+        `_fit_numerical_metadata_vals_for_config` with the settings in `self.config`.
+        """
+        self._fit_numerical_metadata_vals_for_config(self.config, vals, measurement_metadata, total_col_obs)
+
+    @classmethod
+    def _fit_numerical_metadata_vals_for_config(
+        cls,
+        config: EventStreamDatasetConfig,
+        vals: pd.Series,
+        measurement_metadata: pd.Series,
+        total_col_obs: int,
+    ):
+        """
+        Fits the requisite numerical preprocessors on the given metadata column values, per the settings in
+        `config`. This needs no instance state, so it can run within worker processes.
 
         Performs the following steps:
             1. Sets the column type if it is not pre-set. If necessary, converts the values to the appropriate
@@ -1172,8 +2169,9 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
             3. Fits a normalizer model.
 
         Args:
+            `config` (`EventStreamDatasetConfig`): The configuration governing pre-processing.
             `vals` (`pd.Series`): The values to be pre-processed.
-            `key_col` (`str`): The name of the key column that is being processed.
+            `measurement_metadata` (`pd.Series`): The metadata row in which to store the fit models.
             `total_col_obs` (`int`):
                 The total number of column observations that were observed for this metadata column (_not_
                 just this key!)
@@ -1186,7 +2184,9 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
         # type prior to subsequent processing, but does not alter persistent metadata.
 
         if pd.isnull(measurement_metadata['value_type']):
-            measurement_metadata.loc['value_type'] = self._infer_val_type(vals, total_col_obs, total_key_obs)
+            measurement_metadata.loc['value_type'] = cls._infer_val_type_for_config(
+                config, vals, total_col_obs, total_key_obs
+            )
 
         # After inferring the value type, we need to convert it or return if necessary.
         match measurement_metadata.loc['value_type']:
@@ -1195,35 +2195,45 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
             case _: return
 
         # 2. Fits an outlier detection model, then removes outliers locally prior to normalization.
-        if self.config.outlier_detector_config is not None:
-            with self._time_as('fit_outlier_detector'):
-                outlier_model = self._fit_metadata_model(vals, self.config.outlier_detector_config)
-                measurement_metadata.loc['outlier_model'] = outlier_model
+        if config.outlier_detector_config is not None:
+            outlier_model = cls._fit_metadata_model(vals, config.outlier_detector_config)
+            measurement_metadata.loc['outlier_model'] = outlier_model
 
-                inliers = outlier_model.predict(to_sklearn_np(vals)).reshape(-1)
-                if (inliers == -1).all():
-                    measurement_metadata.loc['value_type'] = NumericDataModalitySubtype.DROPPED
-                    return
+            inliers = outlier_model.predict(to_sklearn_np(vals)).reshape(-1)
+            if (inliers == -1).all():
+                measurement_metadata.loc['value_type'] = NumericDataModalitySubtype.DROPPED
+                return
 
-                vals[inliers == -1] = np.NaN
+            vals[inliers == -1] = np.NaN
 
         # 3. Fits a normalizer model.
-        if self.config.normalizer_config is not None:
-            with self._time_as('fit_normalizer'):
-                normalizer_model = self._fit_metadata_model(vals, self.config.normalizer_config)
-                measurement_metadata.loc['normalizer'] = normalizer_model
+        if config.normalizer_config is not None:
+            normalizer_model = cls._fit_metadata_model(vals, config.normalizer_config)
+            measurement_metadata.loc['normalizer'] = normalizer_model
 
     @TimeableMixin.TimeAs
     def _infer_val_type(
         self, vals: pd.Series, total_col_obs: int, total_key_obs: int
     ) -> NumericDataModalitySubtype:
         """
-        Infers the appropriate type of the passed metadata column values. Performs the following steps:
+        Infers the appropriate type of the passed metadata column values, via `_infer_val_type_for_config`
+        with the settings in `self.config`.
+        """
+        return self._infer_val_type_for_config(self.config, vals, total_col_obs, total_key_obs)
+
+    @staticmethod
+    def _infer_val_type_for_config(
+        config: EventStreamDatasetConfig, vals: pd.Series, total_col_obs: int, total_key_obs: int
+    ) -> NumericDataModalitySubtype:
+        """
+        Infers the appropriate type of the passed metadata column values, per the settings in `config`.
+        Performs the following steps:
             1. Determines if the column should be dropped for having too few measurements.
             2. Determines if the column actually contains integral, not floating point values.
             3. Determines if the column should be partially or fully re-categorized as a categorical column.
 
         Args:
+            `config` (`EventStreamDatasetConfig`): The configuration governing pre-processing.
             `vals` (`pd.Series`): The values to be pre-processed.
             `total_col_obs` (`int`):
                 The total number of column observations that were observed for this metadata column (_not_
@@ -1236,7 +2246,7 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
         """
         # 1. Determines if the column should be dropped for having too few measurements.
         if lt_count_or_proportion(
-            total_key_obs, self.config.min_valid_vocab_element_observations, total_col_obs
+            total_key_obs, config.min_valid_vocab_element_observations, total_col_obs
         ):
             # In this case, there are too few values to even form a valid observation, so we drop all numeric
             # values and return NaN. Presuming this is the only instance of the key column (which it should
@@ -1247,9 +2257,9 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
         vals = vals.dropna()
 
         # 2. Determine if the column actually contains integral, not floating point values.
-        if self.config.min_true_float_frequency is not None:
+        if config.min_true_float_frequency is not None:
             int_freq = (vals == np.floor(vals)).mean()
-            if int_freq > 1 - self.config.min_true_float_frequency:
+            if int_freq > 1 - config.min_true_float_frequency:
                 vals = vals.round(0).astype(int)
                 value_type = NumericDataModalitySubtype.INTEGER
 
@@ -1258,10 +2268,10 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
 
         if (
             lt_count_or_proportion(
-                len(value_counts), self.config.min_unique_numerical_observations, len(vals)
+                len(value_counts), config.min_unique_numerical_observations, len(vals)
             ) or (
-                (self.config.max_numerical_value_frequency is not None) and
-                ((value_counts.iloc[0] / len(vals)) > self.config.max_numerical_value_frequency)
+                (config.max_numerical_value_frequency is not None) and
+                ((value_counts.iloc[0] / len(vals)) > config.max_numerical_value_frequency)
             )
         ):
             # Here, we convert the output to categorical.
@@ -1292,54 +2302,73 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
 
     @TimeableMixin.TimeAs
     def _fit_categorical_metadata_column(self, col: str):
-        passed_config = self.passed_measurement_configs[col]
-
-        if col not in self.inferred_measurement_configs:
-            self.inferred_measurement_configs[col] = copy.deepcopy(passed_config)
-
-        config = self.inferred_measurement_configs[col]
-
-        match config.temporality:
-            case TemporalityType.DYNAMIC:
-                measurement_df = self.metadata_df(event_types=config.present_in_event_types, split='train')
-            case TemporalityType.STATIC:
-                measurement_df = self.train_subjects_df
-            case TemporalityType.FUNCTIONAL_TIME_DEPENDENT:
-                measurement_df = self.train_events_df
+        config = self._categorical_inferred_config(col)
+        measurement_df = self._train_measurement_df(config, columns=[col, config.values_column])
 
         if col not in measurement_df:
             config.drop()
             return
 
         total_possible_events = len(measurement_df)
+        observations = self._categorical_metadata_observations(config, col, measurement_df)
+        if observations is None: return
+
+        return self._fit_categorical_metadata_column_vals(observations, config, total_possible_events)
+
+    def _categorical_inferred_config(self, col: str) -> MeasurementConfig:
+        """Returns the inferred config of measurement `col`, copying it from the passed config if unset."""
+        if col not in self.inferred_measurement_configs:
+            self.inferred_measurement_configs[col] = copy.deepcopy(self.passed_measurement_configs[col])
+        return self.inferred_measurement_configs[col]
+
+    @classmethod
+    def _categorical_metadata_observations(
+        cls, config: MeasurementConfig, col: str, measurement_df: pd.DataFrame
+    ) -> Optional[pd.Series]:
+        """
+        Returns the non-null categorical observations of measurement `col` (configured by `config`) in
+        `measurement_df` over which its vocabulary is fit, or `None` if the measurement has no vocabulary.
+        """
         measurement_df = measurement_df[~pd.isnull(measurement_df[col])]
 
         match config.modality:
-            case DataModality.DROPPED: return
+            case DataModality.DROPPED: return None
 
             case DataModality.MULTIVARIATE_REGRESSION:
                 kv_df = measurement_df[[col, config.values_column]].copy()
-                kv_df = self.transform_categorical_key_values_df(
+                kv_df = cls.transform_categorical_key_values_df(
                     config.measurement_metadata, kv_df, col, config.values_column
                 )
-                observations = kv_df[col]
+                return kv_df[col]
 
             case DataModality.UNIVARIATE_REGRESSION:
-                observations = self.transform_categorical_values_series(
+                return cls.transform_categorical_values_series(
                     config.measurement_metadata, measurement_df[col].copy()
                 )
-                if observations is None: return
 
-            case _: observations = measurement_df[col].copy()
-
-        return self._fit_categorical_metadata_column_vals(observations, config, total_possible_events)
+            case _: return measurement_df[col].copy()
 
     @TimeableMixin.TimeAs
     def _fit_categorical_metadata_column_vals(
         self, vals: pd.Series, inferred_config: MeasurementConfig, total_possible_events: int
     ):
+        return self._fit_categorical_metadata_column_counts(
+            inferred_config, len(vals), total_possible_events, lambda: Vocabulary.count_observations(vals)
+        )
+
+    def _fit_categorical_metadata_column_counts(
+        self,
+        inferred_config: MeasurementConfig,
+        N: int,
+        total_possible_events: int,
+        count_observations: Callable[[], Dict[Hashable, int]],
+    ):
+        """
+        Fits the observation frequency and vocabulary of a categorical measurement from its `N` observations
+        out of `total_possible_events`. `count_observations` returns the counts of the observed elements (see
+        `Vocabulary.count_observations`), and is only called if a vocabulary needs to be built.
+        """
         # 1. Set the overall observation frequency for the column.
-        N = len(vals)
         inferred_config.observation_frequency = N / total_possible_events
 
         # 2. Drop the column if observations occur too rarely.
@@ -1349,10 +2378,13 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
 
         # 3. Fit metadata vocabularies on the trianing set.
         if inferred_config.vocabulary is None:
+            counts = count_observations()
             try:
-                inferred_config.vocabulary = Vocabulary.build_vocab(vals)
+                inferred_config.vocabulary = Vocabulary(
+                    vocabulary=list(counts.keys()), obs_counts=list(counts.values()), total_observations=N
+                )
             except AssertionError as e:
-                raise AssertionError(f"Failed to build vocabulary for {col}") from e
+                raise AssertionError(f"Failed to build vocabulary for {inferred_config.name}") from e
 
         # 4. Eliminate observations that occur too rarely.
         if self.config.min_valid_vocab_element_observations is not None:
@@ -1374,8 +2406,68 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
         for k in self.time_dependent_numerical_columns:
             self._transform_time_dependent_numerical_metadata_column(k)
 
+        if self.config.do_encode_categorical_metadata: self.encode_categorical_metadata()
+
         self.__clear_events_with_metadata()
 
+    def _measurement_df(self, config: MeasurementConfig) -> Optional[pd.DataFrame]:
+        """Returns the dataframe in which the measurement configured by `config` is stored."""
+        match config.temporality:
+            case TemporalityType.DYNAMIC: return self.joint_metadata_df
+            case TemporalityType.STATIC: return self.subjects_df
+            case TemporalityType.FUNCTIONAL_TIME_DEPENDENT: return self.events_df
+
+    @TimeableMixin.TimeAs
+    def encode_categorical_metadata(self):
+        """
+        Converts each (present) measurement column with a fit vocabulary into a pandas categorical column
+        whose categories begin with the vocabulary, so that the integer codes of in-vocabulary values are
+        their vocabulary indices (with `'UNK'` at `0`). Out-of-vocabulary values are retained as additional
+        categories after the vocabulary, so no information is lost, and are read as `UNK` by
+        `EventStreamDataset.vocab_codes`. Codes are stored in the smallest sufficient integer type.
+        Columns that are already encoded are left unchanged.
+        """
+        for m in self.measurements:
+            config = self.measurement_configs[m]
+            if config.vocabulary is None: continue
+
+            df = self._measurement_df(config)
+            if (df is None) or (m not in df.columns): continue
+
+            df[m] = self._encode_vocab_column(df[m], config.vocabulary)
+
+    @staticmethod
+    def _encode_vocab_column(vals: pd.Series, vocab: Vocabulary) -> pd.Series:
+        """Returns `vals` as a categorical series whose categories begin with `vocab.vocabulary`."""
+        if (
+            isinstance(vals.dtype, pd.CategoricalDtype) and
+            (list(vals.cat.categories[:len(vocab)]) == vocab.vocabulary)
+        ): return vals
+
+        vals = vals.astype(object)
+        out_of_vocab = pd.unique(vals[vals.notna() & ~vals.isin(vocab.vocab_set)])
+        return pd.Series(
+            pd.Categorical(vals, categories=[*vocab.vocabulary, *out_of_vocab]), index=vals.index,
+            name=vals.name,
+        )
+
+    @staticmethod
+    def vocab_codes(vals: pd.Series, vocab: Vocabulary) -> np.ndarray:
+        """
+        Returns the vocabulary index of each value in `vals`, with `0` (`UNK`) for out-of-vocabulary values
+        and `-1` for missing values. For columns encoded by `encode_categorical_metadata`, indices are read
+        directly from the categorical codes, without any per-element lookups.
+        """
+        if isinstance(vals.dtype, pd.CategoricalDtype) and (
+            list(vals.cat.categories[:len(vocab)]) == vocab.vocabulary
+        ):
+            codes = vals.cat.codes.values.astype(np.int64)
+            return np.where(codes >= len(vocab), 0, codes)
+
+        codes = vals.map(vocab.idxmap).fillna(0).values.astype(np.int64)
+        codes[vals.isna().values] = -1
+        return codes
+
     @TimeableMixin.TimeAs
     def _transform_dynamic_numerical_metadata_column(self, key_col: str, val_col: str):
         """
@@ -1398,7 +2490,7 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
         measurement_metadata = config.measurement_metadata
 
         event_types = config.present_in_event_types
-        kv_df = self.metadata_df(event_types=event_types)[[key_col, val_col]]
+        kv_df = self.metadata_df(event_types=event_types, columns=[key_col, val_col])[[key_col, val_col]]
         kv_df = kv_df[~kv_df[key_col].isna()].copy()
 
         # 1. Transforms keys to categorical representations for categorical keys.
@@ -1407,33 +2499,242 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
         # 2. Eliminates any values associated with dropped or categorical keys.
         kv_df.loc[~(kv_df[key_col].isin(config.vocabulary.vocab_set)), val_col] = np.NaN
 
-        # Reset the true metadata from steps one and two before continuing.
-        with warnings.catch_warnings():
-            # This operation throws a Deprecation warning because pandas thinks the new columns are a
-            # different type than the prior columns, so current behavior is to set this with a copy and new
-            # behavior will be to set it in place. It actually isn't a new type though, but I think pandas
-            # doesn't realize that for some reason. This rationale is an inference from the other source of
-            # this warning in the code.
-            warnings.simplefilter(action='ignore', category=DeprecationWarning)
-            self.joint_metadata_df.loc[kv_df.index, kv_df.columns] = kv_df
+        # Reset the true metadata from steps one and two before continuing. Results are written by position
+        # into full copies of the output columns, which is much faster than label-based `.loc` updates.
+        positions = self.joint_metadata_df.index.get_indexer(kv_df.index)
+        self._set_metadata_column_values(key_col, positions, kv_df[key_col].values)
+        self._set_metadata_column_values(val_col, positions, kv_df[val_col].values)
 
         # 3. Eliminates hard outliers and performs censoring via specified config.
-        present_idx = ~kv_df[val_col].isna()
+        present_idx = ~kv_df[val_col].isna().values
 
         if not present_idx.any(): return
 
         kv_df = kv_df[present_idx]
 
-        inlier_col = f"{val_col}_is_inlier"
-        kv_df[inlier_col] = None
-        kv_df.astype({inlier_col: 'boolean'}, copy=False)
+        vals, is_inlier = self._transform_numerical_metadata_kv_arrays(
+            kv_df[key_col].values, kv_df[val_col].values.astype(float), measurement_metadata
+        )
+
+        self._set_metadata_column_values(val_col, positions[present_idx], vals)
+        self._set_metadata_column_values(f"{val_col}_is_inlier", positions[present_idx], is_inlier)
+
+    def _set_metadata_column_values(self, col: str, positions: np.ndarray, vals: np.ndarray):
+        """
+        Sets the values of `self.joint_metadata_df[col]` at row positions `positions` to `vals`, via a
+        preallocated copy of the column, which is created (filled with `None`) if it does not yet exist.
+        """
+        if col in self.joint_metadata_df.columns:
+            new_col = self.joint_metadata_df[col].to_numpy(copy=True)
+            if not np.can_cast(vals.dtype, new_col.dtype): new_col = new_col.astype(object)
+        else:
+            new_col = np.full(len(self.joint_metadata_df), None, dtype=object)
+
+        new_col[positions] = vals
+        self.joint_metadata_df[col] = new_col
+
+    @TimeableMixin.TimeAs
+    def _transform_numerical_metadata_kv_arrays(
+        self, keys: np.ndarray, vals: np.ndarray, measurement_metadata: pd.DataFrame
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Transforms the (present) values `vals` of a key-value numerical column, with keys `keys`, in chunks of
+        `self.config.numerical_transform_chunk_size` rows. If `self.config.num_numerical_transform_workers` is
+        greater than one, chunks are transformed across a pool of processes, each of which receives only the
+        rows of `measurement_metadata` for the keys in its chunk. Chunk outputs are written into preallocated
+        output arrays.
+
+        If all of the column's fit models can be packed into a `PackedNumericalModels`, they are packed once
+        here and applied to each chunk in vectorized form, and workers receive the packed models in place of
+        the (much larger) model objects.
+
+        Args:
+            `keys` (`np.ndarray`): The keys of the values to be transformed.
+            `vals` (`np.ndarray`): The (non-null) float values to be transformed.
+            `measurement_metadata` (`pd.DataFrame`): The fit metadata for the column, indexed by key.
+
+        Returns:
+            The transformed values (with dropped values and outliers set to `np.NaN`), and an object array of
+            whether or not each value is an inlier (`None` for values which were dropped).
+        """
+        chunk_size = self.config.numerical_transform_chunk_size
+        chunks = [slice(st, st+chunk_size) for st in range(0, len(vals), chunk_size)]
+
+        out_vals = np.full(len(vals), np.NaN)
+        out_is_inlier = np.full(len(vals), None, dtype=object)
+
+        packed_models = PackedNumericalModels.from_measurement_metadata(measurement_metadata)
+
+        if self.config.num_numerical_transform_workers > 1 and len(chunks) > 1:
+            config_snapshot = dataclasses.replace(self.config, measurement_configs={})
+            if packed_models is not None:
+                model_cols = [c for c in ('outlier_model', 'normalizer') if c in measurement_metadata.columns]
+                measurement_metadata = measurement_metadata.drop(columns=model_cols)
+
+            with ProcessPoolExecutor(max_workers=self.config.num_numerical_transform_workers) as pool:
+                futures = [
+                    pool.submit(
+                        self._transform_numerical_metadata_chunk_in_worker, config_snapshot, keys[chunk],
+                        vals[chunk], measurement_metadata[measurement_metadata.index.isin(keys[chunk])],
+                        packed_models,
+                    ) for chunk in chunks
+                ]
+                for chunk, future in zip(chunks, futures):
+                    out_vals[chunk], out_is_inlier[chunk] = future.result()
+        else:
+            for chunk in chunks:
+                out_vals[chunk], out_is_inlier[chunk] = self._transform_numerical_metadata_chunk(
+                    keys[chunk], vals[chunk], measurement_metadata, packed_models
+                )
+
+        return out_vals, out_is_inlier
+
+    @classmethod
+    def _transform_numerical_metadata_chunk_in_worker(
+        cls,
+        config: EventStreamDatasetConfig,
+        keys: np.ndarray,
+        vals: np.ndarray,
+        measurement_metadata: pd.DataFrame,
+        packed_models: Optional[PackedNumericalModels] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Transforms a single chunk of a key-value numerical column within a worker process, via
+        `_transform_numerical_metadata_arrays` with the models specified in `config`.
+        """
+        return cls._transform_numerical_metadata_arrays(
+            keys, vals, measurement_metadata, packed_models,
+            do_remove_outliers=(config.outlier_detector_config is not None),
+            do_normalize=(config.normalizer_config is not None),
+        )
+
+    @TimeableMixin.TimeAs
+    def _transform_numerical_metadata_chunk(
+        self,
+        keys: np.ndarray,
+        vals: np.ndarray,
+        measurement_metadata: pd.DataFrame,
+        packed_models: Optional[PackedNumericalModels] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Transforms a chunk of a key-value numerical column, via `_transform_numerical_metadata_arrays`,
+        removing outliers and normalizing values if `self.config` specifies an outlier detector or
+        normalizer, respectively.
+        """
+        return self._transform_numerical_metadata_arrays(
+            keys, vals, measurement_metadata, packed_models,
+            do_remove_outliers=(self.config.outlier_detector_config is not None),
+            do_normalize=(self.config.normalizer_config is not None),
+        )
+
+    @staticmethod
+    def _transform_numerical_metadata_arrays(
+        keys: np.ndarray,
+        vals: np.ndarray,
+        measurement_metadata: pd.DataFrame,
+        packed_models: Optional[PackedNumericalModels] = None,
+        do_remove_outliers: bool = True,
+        do_normalize: bool = True,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Transforms a chunk of a key-value numerical column. Performs, for all keys at once, the following
+        steps:
+            1. Eliminates values of dropped or categorical keys.
+            2. Eliminates hard outliers and performs censoring via the bounds in `measurement_metadata`.
+            3. Rounds values of integer keys.
+            4. Adds inlier/outlier indices and removes learned outliers, if `do_remove_outliers`.
+            5. Normalizes values, if `do_normalize`.
+        Steps 1-3 are vectorized over the gathered per-key metadata. If `packed_models` is specified, steps 4
+        and 5 are vectorized as well; otherwise, they apply each key's fit model to the contiguous run of that
+        key's values in a (stable) key-sorted order.
 
-        self.joint_metadata_df.loc[kv_df.index, [val_col, inlier_col]] = kv_df.groupby(
-            key_col, group_keys=False
-        ).apply(
-            self._transform_numerical_metadata_column_vals_gp, measurement_metadata, val_col, inlier_col
+        Args:
+            `keys` (`np.ndarray`): The keys of the values to be transformed.
+            `vals` (`np.ndarray`): The (non-null) float values to be transformed.
+            `measurement_metadata` (`pd.DataFrame`): The fit metadata for the column, indexed by key.
+            `packed_models` (`Optional[PackedNumericalModels]`, *optional*, defaults to `None`):
+                The packed fit models of the column, which are used in place of the model columns of
+                `measurement_metadata` if specified.
+            `do_remove_outliers` (`bool`, *optional*, defaults to `True`):
+                Whether to apply the fit outlier detection models (step 4).
+            `do_normalize` (`bool`, *optional*, defaults to `True`):
+                Whether to apply the fit normalizers (step 5).
+
+        Returns: The transformed values and inlier indicators; see `_transform_numerical_metadata_kv_arrays`.
+
+        Raises:
+            `KeyError`: If any key in `keys` is not present in `measurement_metadata`.
+        """
+        key_idx = measurement_metadata.index.get_indexer(keys)
+        if (key_idx == -1).any():
+            raise KeyError(f"Keys {set(keys[key_idx == -1])} are missing from `measurement_metadata`!")
+
+        is_inlier = np.full(len(vals), None, dtype=object)
+
+        # 1. Eliminates values of dropped or categorical keys.
+        value_types = measurement_metadata['value_type'].values
+        is_dropped_key = np.array([
+            t in {
+                NumericDataModalitySubtype.DROPPED,
+                NumericDataModalitySubtype.CATEGORICAL_INTEGER,
+                NumericDataModalitySubtype.CATEGORICAL_FLOAT,
+            } for t in value_types
+        ], dtype=bool)
+        vals = np.where(is_dropped_key[key_idx], np.NaN, vals)
+
+        # 2. Eliminates hard outliers and performs censoring.
+        vals = EventStreamDataset._drop_or_censor_arrays(
+            vals, **EventStreamDataset._gather_drop_or_censor_bounds(measurement_metadata, key_idx)
         )
 
+        # 3. Rounds values of integer keys.
+        is_integer_key = np.array([t == NumericDataModalitySubtype.INTEGER for t in value_types], dtype=bool)
+        vals = np.where(is_integer_key[key_idx], np.round(vals), vals)
+
+        present_idx = ~np.isnan(vals)
+
+        # Each key's values are contiguous in a stable key-sorted order of the present values.
+        def key_runs(idx: np.ndarray):
+            positions = np.flatnonzero(idx)
+            positions = positions[np.argsort(key_idx[positions], kind='stable')]
+            run_starts = np.flatnonzero(np.diff(key_idx[positions])) + 1
+            for run in np.split(positions, run_starts):
+                if len(run): yield key_idx[run[0]], run
+
+        if packed_models is not None: packed_key_ids = packed_models.key_ids(keys)
+
+        # 4. Adds inlier/outlier indices and removes learned outliers.
+        if do_remove_outliers:
+            is_inlier[present_idx] = True
+
+        if do_remove_outliers and (packed_models is not None):
+            present_is_inlier = packed_models.is_inlier(packed_key_ids[present_idx], vals[present_idx])
+            is_inlier[present_idx] = present_is_inlier
+            vals[np.flatnonzero(present_idx)[~present_is_inlier]] = np.NaN
+            present_idx = ~np.isnan(vals)
+        elif do_remove_outliers and ('outlier_model' in measurement_metadata):
+            models = measurement_metadata['outlier_model'].values
+            for key_pos, run in key_runs(present_idx):
+                M = models[key_pos]
+                if pd.isnull(M): continue
+                run_is_inlier = M.predict(vals[run].reshape((-1, 1))).reshape(-1) == 1
+                is_inlier[run] = run_is_inlier
+                vals[run[~run_is_inlier]] = np.NaN
+
+            present_idx = ~np.isnan(vals)
+
+        # 5. Normalizes values.
+        if do_normalize and (packed_models is not None):
+            vals[present_idx] = packed_models.normalize(packed_key_ids[present_idx], vals[present_idx])
+        elif do_normalize and ('normalizer' in measurement_metadata):
+            models = measurement_metadata['normalizer'].values
+            for key_pos, run in key_runs(present_idx):
+                M = models[key_pos]
+                if pd.isnull(M): continue
+                vals[run] = M.transform(vals[run].reshape((-1, 1))).reshape(-1)
+
+        return vals, is_inlier
+
     @TimeableMixin.TimeAs
     def _transform_time_dependent_numerical_metadata_column(self, col: str):
         """
@@ -1477,14 +2778,6 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
             vals_df, measurement_metadata, col, inlier_col
         )
 
-    @TimeableMixin.TimeAs
-    def _transform_numerical_metadata_column_vals_gp(
-        self, vals: pd.DataFrame, measurement_metadata: pd.DataFrame, val_col: str, inlier_col: str,
-    ) -> pd.Series:
-        return self._transform_numerical_metadata_column_vals(
-            vals, measurement_metadata.loc[vals.name], val_col, inlier_col
-        )
-
     @TimeableMixin.TimeAs
     def _transform_numerical_metadata_column_vals(
         self, vals_df: pd.DataFrame, measurement_metadata: pd.Series, val_col: str, inlier_col: str,
@@ -1593,3 +2886,252 @@ class EventStreamDataset(SeedableMixin, SaveableMixin, TimeableMixin):
             return pd.Series(M.transform(to_sklearn_np(vals)).reshape(-1), index=vals.index, name=vals.name)
         else:
             return vals
+
+    @staticmethod
+    def _json_default(obj: Any) -> Any:
+        """Converts numpy types and sets to JSON-native types for `json.dump`."""
+        match obj:
+            case np.ndarray(): return obj.tolist()
+            case np.generic(): return obj.item()
+            case set() | frozenset(): return sorted(obj)
+            case _: raise TypeError(f"Object of type {type(obj)} is not JSON serializable!")
+
+    @classmethod
+    def _model_to_state(cls, model: Any, ref: str, arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """
+        Converts a fit outlier detection or normalizer model into a JSON-able state dictionary, storing any
+        array-valued fit parameters in `arrays` under keys prefixed by `ref`. Models whose class is not in
+        `cls.METADATA_MODELS` are pickled whole, as are attributes that are neither arrays nor JSON scalars
+        (e.g., callable thresholds).
+        """
+        model_names = {model_cls: name for name, model_cls in cls.METADATA_MODELS.items()}
+        if type(model) not in model_names:
+            arrays[ref] = np.array(model, dtype=object)
+            return {'cls': None}
+
+        state = {'cls': model_names[type(model)], 'attrs': {}, 'arrays': [], 'pickled': []}
+        for attr, val in vars(model).items():
+            match val:
+                case np.ndarray() if val.dtype != object:
+                    arrays[f"{ref}/{attr}"] = val
+                    state['arrays'].append(attr)
+                case None | bool() | int() | float() | str(): state['attrs'][attr] = val
+                case np.generic(): state['attrs'][attr] = val.item()
+                case _:
+                    arrays[f"{ref}/{attr}"] = np.array(val, dtype=object)
+                    state['pickled'].append(attr)
+        return state
+
+    @classmethod
+    def _model_from_state(cls, state: Dict[str, Any], ref: str, arrays: Dict[str, np.ndarray]) -> Any:
+        """Rebuilds a model from the output of `_model_to_state`, without re-running its constructor."""
+        if state['cls'] is None: return arrays[ref].item()
+
+        model_cls = cls.METADATA_MODELS[state['cls']]
+        model = model_cls.__new__(model_cls)
+        for attr, val in state['attrs'].items(): setattr(model, attr, val)
+        for attr in state['arrays']: setattr(model, attr, arrays[f"{ref}/{attr}"])
+        for attr in state['pickled']: setattr(model, attr, arrays[f"{ref}/{attr}"].item())
+        return model
+
+    @classmethod
+    def _measurement_configs_to_dict(
+        cls,
+        measurement_configs: Dict[str, MeasurementConfig],
+        model_states: Dict[str, Dict[str, Any]],
+        arrays: Dict[str, np.ndarray],
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Converts `measurement_configs` into JSON-able dictionaries. Fit models in `measurement_metadata` are
+        replaced by string references into `model_states` (and `arrays`), which are populated in place.
+        """
+        out = {}
+        for m, cfg in measurement_configs.items():
+            cfg = copy.copy(cfg)
+            if cfg.measurement_metadata is not None:
+                measurement_metadata = cfg.measurement_metadata.copy()
+                model_fields = [c for c in ('outlier_model', 'normalizer') if c in measurement_metadata]
+
+                for model_field in model_fields:
+                    vals = measurement_metadata[model_field]
+                    if type(measurement_metadata) is pd.Series: vals = pd.Series([vals], dtype=object)
+
+                    refs = []
+                    for model in vals:
+                        if (model is None) or (isinstance(model, float) and np.isnan(model)):
+                            refs.append(None)
+                            continue
+                        ref = f"model_{len(model_states)}"
+                        model_states[ref] = cls._model_to_state(model, ref, arrays)
+                        refs.append(ref)
+
+                    if type(measurement_metadata) is pd.Series: measurement_metadata[model_field] = refs[0]
+                    else: measurement_metadata[model_field] = pd.Series(refs, index=vals.index, dtype=object)
+
+                cfg.measurement_metadata = measurement_metadata
+
+            out[m] = cfg.to_dict()
+        return out
+
+    @classmethod
+    def _measurement_configs_from_dict(
+        cls,
+        as_dicts: Dict[str, Dict[str, Any]],
+        model_states: Dict[str, Dict[str, Any]],
+        arrays: Dict[str, np.ndarray],
+    ) -> Dict[str, MeasurementConfig]:
+        """Inverts `_measurement_configs_to_dict`."""
+        out = {}
+        for m, as_dict in as_dicts.items():
+            as_dict['temporality'] = TemporalityType(as_dict['temporality'])
+            if as_dict['modality'] is not None: as_dict['modality'] = DataModality(as_dict['modality'])
+            if as_dict['present_in_event_types'] is not None:
+                as_dict['present_in_event_types'] = set(as_dict['present_in_event_types'])
+
+            cfg = MeasurementConfig.from_dict(as_dict)
+            measurement_metadata = cfg.measurement_metadata
+            if measurement_metadata is not None:
+                for model_field in ('outlier_model', 'normalizer'):
+                    if model_field not in measurement_metadata: continue
+
+                    if type(measurement_metadata) is pd.Series:
+                        ref = measurement_metadata[model_field]
+                        if ref is not None:
+                            measurement_metadata[model_field] = cls._model_from_state(
+                                model_states[ref], ref, arrays
+                            )
+                    else:
+                        measurement_metadata[model_field] = pd.Series([
+                            None if ref is None else cls._model_from_state(model_states[ref], ref, arrays)
+                            for ref in measurement_metadata[model_field]
+                        ], index=measurement_metadata.index, dtype=object)
+            out[m] = cfg
+        return out
+
+    @TimeableMixin.TimeAs
+    def save_to_dir(self, save_dir: Path, do_overwrite: bool = False):
+        """
+        Saves this dataset to `save_dir` in a directory format which can be loaded near-instantly (and
+        partially) via `EventStreamDataset.load_from_dir`. Unlike `_save`, nothing is pickled except the rare
+        model attribute or unregistered model that can't be stored otherwise. The layout is:
+            * `events_df`, `joint_metadata_df`, `subjects_df`:
+                The dataframes, in the columnar format of `columnar_io`, in which numerical columns are
+                memory-mapped on load.
+            * `config.json`, `inferred_measurement_configs.json`:
+                The passed and fit configurations, including vocabularies, as JSON.
+            * `measurement_models.json`, `measurement_models.npz`:
+                The fit outlier detection and normalization models referenced in the configurations'
+                `measurement_metadata`, with scalar parameters as JSON and array parameters as numpy arrays.
+            * `attrs.json`: Remaining attributes, such as the subject splits.
+
+        Args:
+            `save_dir` (`Path`): The directory in which to save the dataset.
+            `do_overwrite` (`bool`, *optional*, defaults to `False`): Whether to overwrite `save_dir`.
+        """
+        if save_dir.exists():
+            if not do_overwrite: raise FileExistsError(f"{save_dir} already exists!")
+            shutil.rmtree(save_dir)
+        save_dir.mkdir(parents=True)
+
+        model_states, arrays = {}, {}
+        config = {
+            **self.config.to_dict(),
+            'measurement_configs': self._measurement_configs_to_dict(
+                self.config.measurement_configs, model_states, arrays
+            ),
+        }
+        inferred_measurement_configs = self._measurement_configs_to_dict(
+            self.inferred_measurement_configs, model_states, arrays
+        )
+        attrs = {
+            'metadata_is_fit': self.metadata_is_fit,
+            'split_subjects': {sp: sorted(subjects) for sp, subjects in self.split_subjects.items()},
+        }
+
+        for fn, obj in (
+            ('config.json', config),
+            ('inferred_measurement_configs.json', inferred_measurement_configs),
+            ('measurement_models.json', model_states),
+            ('attrs.json', attrs),
+        ):
+            with open(save_dir / fn, mode='w') as f: json.dump(obj, f, default=self._json_default)
+
+        np.savez(save_dir / 'measurement_models.npz', **arrays)
+
+        save_df(self.events_df, save_dir / 'events_df')
+        save_df(self.joint_metadata_df, save_dir / 'joint_metadata_df')
+        if self.subjects_df is not None: save_df(self.subjects_df, save_dir / 'subjects_df')
+
+    @classmethod
+    def load_from_dir(
+        cls,
+        load_dir: Path,
+        split: Optional[str] = None,
+        splits: Optional[Sequence[str]] = None,
+        do_load_data: bool = True,
+    ) -> 'EventStreamDataset':
+        """
+        Loads a dataset saved via `save_to_dir`. Dataframe columns are memory-mapped rather than read, so
+        loading is near-instant, and subsets of the dataset can be loaded on their own.
+
+        Args:
+            `load_dir` (`Path`): The directory from which to load the dataset.
+            `split` (`Optional[str]`, *optional*, defaults to `None`):
+                If specified, only events, metadata, and subjects for subjects in this split will be loaded.
+                Cannot be set simultaneously with `splits`. Note that while memory-mapped columns are only
+                read for the split's rows, columns which are stored pickled (e.g., object-dtype columns) are
+                necessarily unpickled in full before being restricted to the split.
+            `splits` (`Optional[Sequence[str]]`, *optional*, defaults to `None`):
+                If specified, only events, metadata, and subjects for subjects in these splits will be loaded.
+                Cannot be set simultaneously with `split`.
+            `do_load_data` (`bool`, *optional*, defaults to `True`):
+                If `False`, only configurations, vocabularies, fit models, and splits are loaded, and the
+                dataframes are left empty (with their columns), e.g. for use at inference time.
+
+        Returns:
+            The loaded `EventStreamDataset`. Its `split_subjects` always reflect the full saved dataset, even
+            if only a subset of the data was loaded.
+        """
+        with open(load_dir / 'measurement_models.json', mode='r') as f: model_states = json.load(f)
+        with np.load(load_dir / 'measurement_models.npz', allow_pickle=True) as npz: arrays = dict(npz)
+
+        with open(load_dir / 'config.json', mode='r') as f: config = json.load(f)
+        config['measurement_configs'] = cls._measurement_configs_from_dict(
+            config['measurement_configs'], model_states, arrays
+        )
+
+        with open(load_dir / 'inferred_measurement_configs.json', mode='r') as f:
+            inferred_measurement_configs = cls._measurement_configs_from_dict(
+                json.load(f), model_states, arrays
+            )
+
+        with open(load_dir / 'attrs.json', mode='r') as f: attrs = json.load(f)
+
+        obj = cls.__new__(cls)
+        obj.config = EventStreamDatasetConfig(**config)
+        obj.inferred_measurement_configs = inferred_measurement_configs
+        obj.metadata_is_fit = attrs['metadata_is_fit']
+        obj.split_subjects = {sp: set(subjects) for sp, subjects in attrs['split_subjects'].items()}
+
+        # Without data, the (empty) dataframes are built from their saved schemas alone.
+        load_fn = load_df if do_load_data else load_empty_df
+
+        events_df = load_fn(load_dir / 'events_df')
+        joint_metadata_df = load_fn(load_dir / 'joint_metadata_df')
+        if (load_dir / 'subjects_df').exists(): subjects_df = load_fn(load_dir / 'subjects_df')
+        else: subjects_df = None
+
+        if do_load_data and ((split is not None) or (splits is not None)):
+            subject_ids = obj.subject_ids_for_split(split, splits)
+            events_df = events_df[events_df.subject_id.isin(subject_ids)]
+            joint_metadata_df = joint_metadata_df[joint_metadata_df.subject_id.isin(subject_ids)]
+            if subjects_df is not None: subjects_df = subjects_df[subjects_df.index.isin(subject_ids)]
+
+        obj.joint_metadata_df = joint_metadata_df
+        obj.subjects_df = subjects_df
+        obj._events_df = events_df
+        obj.__events_df_with_metadata_stale = True
+        obj.__update_event_summary_stats()
+        obj._build_subject_offsets()
+
+        return obj
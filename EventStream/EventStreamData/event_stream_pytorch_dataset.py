@@ -1,15 +1,16 @@
-import itertools, torch, numpy as np, pandas as pd
+import itertools, json, torch, numpy as np, pandas as pd
 
 from collections import defaultdict
 from datetime import datetime
 from functools import cached_property
 from mixins import SeedableMixin
+from pathlib import Path
 
 from .event_stream_dataset import EventStreamDataset
 from .config import EventStreamPytorchDatasetConfig
 from .types import DataModality, EventStreamPytorchBatch, TemporalityType
 
-from typing import Dict, Hashable, List, Optional, Tuple, Union
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
 
 DATA_ITEM_T = Dict[str, List[float]]
 
@@ -106,6 +107,7 @@ class EventStreamPytorchDataset(SeedableMixin, torch.utils.data.Dataset):
 
         super().__init__()
         self.data = E
+        self.config = config
 
         self.seq_padding_side = config.seq_padding_side
         assert self.seq_padding_side in ('left', 'right'), f"{self.seq_padding_side} is invalid!"
@@ -173,6 +175,10 @@ class EventStreamPytorchDataset(SeedableMixin, torch.utils.data.Dataset):
                 self.task_types[t] = task_type
                 self.task_df[t] = normalized_vals
 
+        # Populated by `compile`.
+        self.compiled = None
+        self._compiled_subject_idx = None
+
     @property
     def do_produce_static_data(self): return self.data.has_static_measurements
 
@@ -247,84 +253,266 @@ class EventStreamPytorchDataset(SeedableMixin, torch.utils.data.Dataset):
         else:
             return self._seeded_getitem_from_range(self.subject_ids[idx])
 
-    @SeedableMixin.WithSeed
-    def _seeded_getitem_from_range(
-        self,
-        subject_id: Hashable,
-        start_time: Optional[datetime] = None,
-        end_time: Optional[datetime] = None,
-    ) -> Dict[str, list]:
+    def item_sizes(self) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Returns a dictionary corresponding to a batch element for a single patient. This will not be
-        tensorized as that work will need to be re-done in the collate function regardless. The output will
-        have structure:
-        {
-            'time': [seq_len],
-            'dynamic_indices': [seq_len, n_data_per_event] (ragged),
-            'dynamic_values': [seq_len, n_data_per_event] (ragged),
-            'dynamic_measurement_indices': [seq_len, n_data_per_event] (ragged),
-            'static_indices': [seq_len, n_data_per_event] (ragged),
-            'static_values': [seq_len, n_data_per_event] (ragged),
-            'static_measurement_indices': [seq_len, n_data_per_event] (ragged),
-        }
-          1. `time` captures the time of the sequence elements.
-          2. `dynamic_indices` captures the categorical metadata elements listed in `self.data_cols` in a unified
-             vocabulary space spanning all metadata vocabularies.
-          3. `dynamic_values` captures the numerical metadata elements listed in `self.data_cols`. If no
-             numerical elements are listed in `self.data_cols` for a given categorical column, the according
-             index in this output will be `np.NaN`.
-          4. `dynamic_measurement_indices` captures which metadata vocabulary was used to source a given data element.
+        Returns upper bounds on the sequence length and the maximum number of data elements per event of each
+        item in this dataset (in `__getitem__` order), without materializing any items. These are computed
+        from `self.data.n_events_per_subject` and per-event data element counts, which are exact if this
+        dataset has been compiled and otherwise counted from the non-null dynamic metadata of each event. For
+        datasets with a `task_df`, the sizes are those of each row's subject's full sequence.
 
-        If `self.do_normalize_log_inter_event_times`, then `time` will be approximately modified as follows:
-            1. `obs_TTE = time.diff()` Capture the observed inter_event_times.
-            2. `mod_TTE = np.exp((np.log(obs_TTE + 1) - self.mean_log_inter...)/self.std_log_inter...)`:
-               Modify the times between events by first padding them so none are <= 0, then ensuring that
-               their log has mean 0 and standard deviation 1, then re-exponentiating them out of the log
-               space.
-            3. `mod_time = mod_TTE.cumsum()` Re-sum the modified inter-event times to get modified raw times.
+        Returns: A tuple of integer numpy arrays `(seq_lens, n_data)`.
         """
+        if self.compiled is not None:
+            event_offsets = self.compiled['subject_event_offsets']
+            n_data_per_event = np.diff(self.compiled['event_data_offsets'])
+            max_n_data = {
+                sid: (n_data_per_event[st:end].max() if end > st else 0) for sid, st, end in zip(
+                    self.subject_ids, event_offsets[:-1], event_offsets[1:]
+                )
+            }
+        else:
+            events_df = self.data.events_df[self.data.events_df.subject_id.isin(set(self.subject_ids))]
+
+            # Each event has an event type element, one element per present event-level column, and one per
+            # non-null dynamic metadata value.
+            n_event_cols = sum((c[0] if type(c) is tuple else c) in events_df.columns for c in self.event_cols)
+            n_data_per_event = pd.Series(1 + n_event_cols, index=events_df.index)
+
+            metadata_df = self.data.joint_metadata_df
+            dynamic_cols = [c[0] if type(c) is tuple else c for c in self.dynamic_cols]
+            dynamic_cols = [c for c in dynamic_cols if c in metadata_df.columns]
+            if dynamic_cols:
+                metadata_df = metadata_df[metadata_df.event_id.isin(events_df.index)]
+                n_data_per_event = n_data_per_event.add(
+                    metadata_df[dynamic_cols].notna().sum(axis=1).groupby(metadata_df.event_id).sum(),
+                    fill_value=0
+                )
 
-        # First find the subject corresponding to this dataset element.
-        subj_data = self.data.events_df[self.data.events_df.subject_id == subject_id]
-        if start_time is not None:
-            subj_data = subj_data[subj_data.timestamp >= start_time]
-        if end_time is not None:
-            subj_data = subj_data[subj_data.timestamp <= end_time]
-
-        subj_metadata = self.data.metadata_df(subject_id=subject_id)
+            max_n_data = n_data_per_event.groupby(events_df.subject_id).max().to_dict()
+
+        subject_ids = self.task_df.subject_id.values if self.has_task else self.subject_ids
+        seq_lens = np.array(
+            [min(self.data.n_events_per_subject.get(sid, 0), self.max_seq_len) for sid in subject_ids],
+            dtype=np.int64
+        )
+        n_data = np.array([max_n_data.get(sid, 0) for sid in subject_ids], dtype=np.int64)
+        return seq_lens, n_data
+
+    # The arrays stored by `compile`, and their dtypes.
+    COMPILED_ARRAYS = {
+        'subject_event_offsets': np.int64,
+        'event_timestamps': 'datetime64[ns]',
+        'event_data_offsets': np.int64,
+        'dynamic_indices': np.int32,
+        'dynamic_values': np.float32,
+        'dynamic_measurement_indices': np.int32,
+        'subject_static_offsets': np.int64,
+        'static_indices': np.int32,
+        'static_measurement_indices': np.int32,
+    }
 
-        start_time = subj_data.timestamp.min()
-        out = {}
+    def compile(self, save_dir: Optional[Path] = None, do_overwrite: bool = False):
+        """
+        Compiles the data elements of all subjects in this dataset's split into flat, CSR-style ragged numpy
+        arrays, so that subsequent calls to `__getitem__` reduce to a few array slices rather than re-deriving
+        each item from the underlying pandas dataframes. The compiled arrays are:
+            * `subject_event_offsets` (`[n_subjects + 1]`): Subject `self.subject_ids[i]`'s events are stored
+              at positions `subject_event_offsets[i]:subject_event_offsets[i+1]` of the per-event arrays.
+            * `event_timestamps` (`[n_events]`): The timestamp of each event.
+            * `event_data_offsets` (`[n_events + 1]`): Event `j`'s data elements are stored at positions
+              `event_data_offsets[j]:event_data_offsets[j+1]` of the per-data-element arrays.
+            * `dynamic_indices`, `dynamic_values`, and `dynamic_measurement_indices` (`[n_data_elements]`):
+              The (`int32`, `float32`, and `int32`, respectively) per-data-element arrays.
+            * `subject_static_offsets`, `static_indices`, and `static_measurement_indices`: The analogous
+              arrays for static data, which are empty if `self.do_produce_static_data` is `False`.
+
+        Note that the compiled arrays reflect the state of `self.data` at compilation time, so this should be
+        called only after all pre-processing is complete. When saved, they are stored alongside a fingerprint
+        of the dataset and config they were compiled from (see `_compile_fingerprint`), and loading arrays
+        whose fingerprint or subjects do not match this dataset raises a `ValueError`.
 
-        # If we need to truncate to `self.max_seq_len`, grab a random full-size span to capture that.
-        # TODO(mmd): This will proportionally underweight the front and back ends of the subjects data
-        # relative to the middle, as there are fewer full length sequences containing those elements.
-        if len(subj_data) > self.max_seq_len:
-            start_idx = np.random.choice(len(subj_data) - self.max_seq_len)
-            subj_data = subj_data.iloc[start_idx:start_idx+self.max_seq_len]
+        Args:
+            `save_dir` (`Optional[Path]`, *optional*, defaults to `None`):
+                If specified, the compiled arrays will be saved to (or, if already present and not
+                `do_overwrite`, loaded from) this directory and memory-mapped from disk.
+            `do_overwrite` (`bool`, *optional*, defaults to `False`):
+                Whether to re-compile and overwrite arrays already present in `save_dir`.
+        """
+        fingerprint = self._compile_fingerprint()
+        if save_dir is not None and (save_dir / 'fingerprint.json').exists() and not do_overwrite:
+            with open(save_dir / 'fingerprint.json', mode='r') as f: saved_fingerprint = json.load(f)
+            subject_ids = np.load(
+                save_dir / 'subject_ids.npy', allow_pickle=saved_fingerprint.get('subject_ids_pickled', False)
+            )
+            if (saved_fingerprint != fingerprint) or (list(subject_ids) != list(self.subject_ids)):
+                raise ValueError(
+                    f"Compiled arrays in {save_dir} are for a different dataset or config than this one! "
+                    "Pass `do_overwrite=True` to re-compile."
+                )
+        else:
+            compiled = self._compile_arrays()
 
-        # Now we need to produce the 4 tensor elements in this dataset:
-        # time, dynamic_indices, dynamic_values, and dynamic_measurement_indices
+            if save_dir is None:
+                self.compiled = compiled
+                self._compiled_subject_idx = {sid: i for i, sid in enumerate(self.subject_ids)}
+                return
 
-        # Normalize time to the start of the sequence and convert it to minutes.
-        time_min = (subj_data.timestamp - start_time) / pd.to_timedelta(1, unit='minute')
+            save_dir.mkdir(parents=True, exist_ok=True)
+            for k, v in compiled.items(): np.save(save_dir / f"{k}.npy", v, allow_pickle=False)
 
-        if self.do_normalize_log_inter_event_times:
-            time_deltas = time_min.diff()
-            # We do the + 1 here because it is possible that events have the same timestamp. This should be
-            # mirrored in the calculation of mean_/std_log_inter_event_time_min.
-            time_deltas = np.exp(
-                (np.log(time_deltas + 1) - self.mean_log_inter_event_time_min) /
-                self.std_log_inter_event_time_min
+            # Subject IDs are only pickled if they can't be stored as a native numpy array.
+            subject_ids = np.array(self.subject_ids)
+            np.save(
+                save_dir / 'subject_ids.npy', subject_ids, allow_pickle=fingerprint['subject_ids_pickled']
             )
-            time_min = time_deltas.fillna(0).cumsum()
-        out['time'] = time_min.values
+            with open(save_dir / 'fingerprint.json', mode='w') as f:
+                json.dump(fingerprint, f, default=EventStreamDataset._json_default)
 
-        # For data elements, we'll build a ragged representation for now,
-        # then will convert everything to padded tensors in the collate function.
+        # Copy-on-write keeps the arrays writable in memory (as torch expects) without touching the files.
+        self.compiled = {k: np.load(save_dir / f"{k}.npy", mmap_mode='c') for k in self.COMPILED_ARRAYS}
+        self._compiled_subject_idx = {sid: i for i, sid in enumerate(self.subject_ids)}
+
+    def _compile_fingerprint(self) -> Dict[str, Any]:
+        """
+        Returns a JSON-able summary of everything the compiled arrays depend on, which is saved alongside them
+        by `compile` and used to reject stale compiled arrays on load.
+        """
+        fingerprint = {
+            'n_events': len(self.data.events_df),
+            'n_metadata': len(self.data.joint_metadata_df),
+            'n_subjects': len(self.subject_ids),
+            'subject_ids_pickled': np.array(self.subject_ids).dtype.kind == 'O',
+            'event_types': list(self.event_types_idxmap),
+            'vocab_sizes': {
+                col: len(idxmap) for col, idxmap in self.data.measurement_idxmaps.items()
+                if col in self.measurement_vocab_offsets
+            },
+            'measurement_vocab_offsets': self.measurement_vocab_offsets,
+            'total_vocab_size': self.total_vocab_size,
+            'config': self.config.to_dict(),
+        }
+        # We round-trip through JSON so this compares equal to a fingerprint loaded from disk.
+        return json.loads(json.dumps(fingerprint, default=EventStreamDataset._json_default))
+
+    @staticmethod
+    def _subject_rows(
+        subject_ids: List[Hashable], offsets: Dict[Hashable, Tuple[int, int]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the concatenated row positions of the (contiguous) slices `offsets[subject_id]` for each
+        subject in `subject_ids`, in order, and the number of rows of each subject.
+        """
+        ranges = np.array([offsets.get(sid, (0, 0)) for sid in subject_ids], dtype=np.int64).reshape(-1, 2)
+        starts, lengths = ranges[:, 0], ranges[:, 1] - ranges[:, 0]
+        rows = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return rows, lengths
 
+    def _compile_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Builds the arrays stored by `compile` in one vectorized pass over this dataset's subjects' events and
+        metadata. Data elements are produced per measurement across all events at once, then stably sorted by
+        event, which reproduces the per-event element order of `_event_data_elements` (the event type, then
+        each column of `self.dynamic_cols` in metadata row order, then each column of `self.event_cols`).
+        """
+        event_rows, n_events = self._subject_rows(self.subject_ids, self.data._subject_event_offsets)
+        events = self.data.events_df.iloc[event_rows]
+        metadata_rows, _ = self._subject_rows(self.subject_ids, self.data._subject_metadata_offsets)
+        metadata = self.data.joint_metadata_df.iloc[metadata_rows]
+
+        # The position of each metadata row's event within `events`.
+        metadata_event_idx = pd.Index(events.index).get_indexer(metadata.event_id)
+
+        event_idx, indices, values, measurement_indices = [], [], [], []
+        def add_elements(ev_idx: np.ndarray, idx: np.ndarray, vals: Optional[np.ndarray], col: str):
+            event_idx.append(ev_idx)
+            indices.append(idx + self.measurement_vocab_offsets[col])
+            values.append(np.full(len(idx), np.NaN) if vals is None else vals.astype(np.float64))
+            measurement_indices.append(np.full(len(idx), self.measurements_idxmap[col]))
+
+        # The first data element of every event is its event type, which has no associated value.
+        event_type_idx = pd.Index(list(self.event_types_idxmap)).get_indexer(events.event_type.astype(object))
+        if (event_type_idx < 0).any():
+            raise KeyError(f"Unknown event types {set(events.event_type[event_type_idx < 0])}!")
+        add_elements(np.arange(len(events)), event_type_idx, None, 'event_type')
+
+        for col in self.dynamic_cols:
+            if type(col) is tuple: col, vals_col = col
+            else: vals_col = None
+
+            if col not in metadata.columns: continue
+
+            # Some values may be nested sequences, which, as in `_event_data_elements`, we need to flatten.
+            # `rows` tracks the metadata row of each (flattened) value.
+            col_vals, rows = metadata[col], np.arange(len(metadata))
+            if col_vals.dtype == object:
+                col_vals = col_vals.reset_index(drop=True).explode()
+                rows = col_vals.index.values
+
+            codes = self.data.vocab_codes(col_vals, self.data.measurement_configs[col].vocabulary)
+            ev_idx = metadata_event_idx[rows]
+            valid = (codes >= 0) & (ev_idx >= 0)
+            vals = metadata[vals_col].values[rows[valid]] if vals_col in metadata.columns else None
+            add_elements(ev_idx[valid], codes[valid], vals, col)
+
+        for col in self.event_cols:
+            if type(col) is tuple: col, vals_col = col
+            else: vals_col = None
+
+            if col not in events.columns: continue
+
+            if self.data.measurement_configs[col].modality == DataModality.UNIVARIATE_REGRESSION:
+                idx, vals = np.zeros(len(events), dtype=np.int64), events[col].values
+            else:
+                # Missing and out-of-vocabulary values both map to the 'UNK' (0) vocabulary element.
+                idx = self.data.vocab_codes(events[col], self.data.measurement_configs[col].vocabulary)
+                idx = np.maximum(idx, 0)
+                vals = events[vals_col].values if vals_col in events.columns else None
+            add_elements(np.arange(len(events)), idx, vals, col)
+
+        event_idx = np.concatenate(event_idx)
+        order = np.argsort(event_idx, kind='stable')
+        values = np.concatenate(values)[order]
+        # We normalize infinite values to missing values here as well.
+        values[np.isinf(values)] = np.NaN
+
+        compiled = {
+            'subject_event_offsets': np.concatenate(([0], np.cumsum(n_events))),
+            'event_timestamps': events.timestamp.values,
+            'event_data_offsets': np.concatenate(
+                ([0], np.cumsum(np.bincount(event_idx, minlength=len(events))))
+            ),
+            'dynamic_indices': np.concatenate(indices)[order],
+            'dynamic_values': values,
+            'dynamic_measurement_indices': np.concatenate(measurement_indices)[order],
+        }
+
+        static_cols, static_indices = [], []
+        if self.do_produce_static_data:
+            static_cols = [c for c in self.static_cols if c in self.data.subjects_df.columns]
+            subjects = self.data.subjects_df.loc[self.subject_ids]
+            static_indices = [
+                np.maximum(self.data.vocab_codes(subjects[c], self.data.measurement_configs[c].vocabulary), 0)
+                + self.measurement_vocab_offsets[c] for c in static_cols
+            ]
+        compiled['subject_static_offsets'] = np.arange(len(self.subject_ids) + 1) * len(static_cols)
+        compiled['static_indices'] = (
+            np.stack(static_indices, axis=1).ravel() if static_cols else np.zeros(0, dtype=np.int64)
+        )
+        compiled['static_measurement_indices'] = np.tile(
+            [self.measurements_idxmap[c] for c in static_cols], len(self.subject_ids)
+        )
+
+        return {k: np.asarray(v).astype(self.COMPILED_ARRAYS[k]) for k, v in compiled.items()}
+
+    def _event_data_elements(
+        self, subj_data: pd.DataFrame, subj_metadata: pd.DataFrame
+    ) -> Tuple[List[List[int]], List[List[float]], List[List[int]]]:
+        """
+        Returns the ragged `dynamic_indices`, `dynamic_values`, and `dynamic_measurement_indices` lists (each
+        with one inner list per event) for the events in `subj_data`, whose metadata is in `subj_metadata`.
+        """
         dynamic_indices, dynamic_values, dynamic_measurement_indices = [], [], []
-        # TODO(mmd): convert to apply to make this faster
         for event_id, r in subj_data.iterrows():
             # The first metadata element will always be the event type, so we initialize with that. It has no
             # value associated with it.
@@ -347,20 +535,28 @@ class EventStreamPytorchDataset(SeedableMixin, torch.utils.data.Dataset):
                 # As we normalize everything to a single vocabulary, we need to grab the offset here.
                 offset = self.measurement_vocab_offsets[col]
 
-                vals = metadata[col].values
-                # Some values may be nested sequences, which we need to flatten.
-                if type(vals[0]) in (list, tuple): vals = list(itertools.chain.from_iterable(vals))
+                if isinstance(metadata[col].dtype, pd.CategoricalDtype):
+                    # Encoded columns (see `EventStreamDataset.encode_categorical_metadata`) store vocabulary
+                    # indices directly as codes, with -1 for missing values.
+                    vocab = self.data.measurement_configs[col].vocabulary
+                    codes = self.data.vocab_codes(metadata[col], vocab)
+                    vals_valid_idx = codes >= 0
+                    new_indices = (codes[vals_valid_idx] + offset).tolist()
+                else:
+                    vals = metadata[col].values
+                    # Some values may be nested sequences, which we need to flatten.
+                    if type(vals[0]) in (list, tuple): vals = list(itertools.chain.from_iterable(vals))
 
-                # Some values may be missing, which we need to ignore. We don't use pandas or numpy here as
-                # the type of vals is just a list.
-                vals_valid_idx = np.array([not pd.isnull(v) for v in vals])
-                vals = [v for v, b in zip(vals, vals_valid_idx) if b]
+                    # Some values may be missing, which we need to ignore. We don't use pandas or numpy here
+                    # as the type of vals is just a list.
+                    vals_valid_idx = np.array([not pd.isnull(v) for v in vals])
+                    vals = [v for v, b in zip(vals, vals_valid_idx) if b]
 
-                # As 0 is a sentinel vocabulary element of 'UNK' in all vocabularies, that is what we use of
-                # we don't find the associated key in the metadata idxmap.
-                new_indices = [
-                    self.data.measurement_idxmaps[col].get(v, 0) + offset for v in vals
-                ]
+                    # As 0 is a sentinel vocabulary element of 'UNK' in all vocabularies, that is what we use
+                    # of we don't find the associated key in the metadata idxmap.
+                    new_indices = [
+                        self.data.measurement_idxmaps[col].get(v, 0) + offset for v in vals
+                    ]
                 event_dynamic_indices.extend(new_indices)
                 event_dynamic_measurement_indices.extend([self.measurements_idxmap[col] for _ in new_indices])
 
@@ -408,14 +604,10 @@ class EventStreamPytorchDataset(SeedableMixin, torch.utils.data.Dataset):
             dynamic_values.append(event_dynamic_values)
             dynamic_measurement_indices.append(event_dynamic_measurement_indices)
 
-        if not self.do_produce_static_data:
-            return {
-                'time': time_min.values,
-                'dynamic_indices': dynamic_indices,
-                'dynamic_values': dynamic_values,
-                'dynamic_measurement_indices': dynamic_measurement_indices,
-            }
+        return dynamic_indices, dynamic_values, dynamic_measurement_indices
 
+    def _static_data_elements(self, subject_id: Hashable) -> Tuple[List[int], List[int]]:
+        """Returns the `static_indices` and `static_measurement_indices` lists for subject `subject_id`."""
         subj_static_data = self.data.subjects_df.loc[subject_id]
 
         static_indices = []
@@ -432,117 +624,222 @@ class EventStreamPytorchDataset(SeedableMixin, torch.utils.data.Dataset):
             static_indices.append(self.data.measurement_idxmaps[col].get(val, 0) + offset)
             static_measurement_indices.append(self.measurements_idxmap[col])
 
-        return {
-            'time': time_min.values,
-            'dynamic_indices': dynamic_indices,
-            'dynamic_values': dynamic_values,
-            'dynamic_measurement_indices': dynamic_measurement_indices,
-            'static_indices': static_indices,
-            'static_measurement_indices': static_measurement_indices,
+        return static_indices, static_measurement_indices
+
+    def _normalized_time(self, timestamps: np.ndarray, start_time: np.datetime64) -> np.ndarray:
+        """Converts `timestamps` into (possibly normalized; see `_seeded_getitem_from_range`) minutes."""
+        time_min = (timestamps - start_time) / np.timedelta64(1, 'm')
+
+        if self.do_normalize_log_inter_event_times and len(time_min) > 0:
+            # We do the + 1 here because it is possible that events have the same timestamp. This should be
+            # mirrored in the calculation of mean_/std_log_inter_event_time_min.
+            time_deltas = np.exp(
+                (np.log(np.diff(time_min) + 1) - self.mean_log_inter_event_time_min) /
+                self.std_log_inter_event_time_min
+            )
+            time_min = np.concatenate(([0.], time_deltas)).cumsum()
+        return time_min
+
+    @SeedableMixin.WithSeed
+    def _seeded_getitem_from_range(
+        self,
+        subject_id: Hashable,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> Dict[str, list]:
+        """
+        Returns a dictionary corresponding to a batch element for a single patient. This will not be
+        tensorized as that work will need to be re-done in the collate function regardless. The output will
+        have structure:
+        {
+            'time': [seq_len],
+            'dynamic_indices': [seq_len, n_data_per_event] (ragged),
+            'dynamic_values': [seq_len, n_data_per_event] (ragged),
+            'dynamic_measurement_indices': [seq_len, n_data_per_event] (ragged),
+            'static_indices': [seq_len, n_data_per_event] (ragged),
+            'static_values': [seq_len, n_data_per_event] (ragged),
+            'static_measurement_indices': [seq_len, n_data_per_event] (ragged),
         }
+          1. `time` captures the time of the sequence elements.
+          2. `dynamic_indices` captures the categorical metadata elements listed in `self.data_cols` in a unified
+             vocabulary space spanning all metadata vocabularies.
+          3. `dynamic_values` captures the numerical metadata elements listed in `self.data_cols`. If no
+             numerical elements are listed in `self.data_cols` for a given categorical column, the according
+             index in this output will be `np.NaN`.
+          4. `dynamic_measurement_indices` captures which metadata vocabulary was used to source a given data element.
 
-    def __static_and_dynamic_collate(self, batch: List[DATA_ITEM_T]) -> EventStreamPytorchBatch:
-        out_batch = self.__dynamic_only_collate(batch)
+        If `self.do_normalize_log_inter_event_times`, then `time` will be approximately modified as follows:
+            1. `obs_TTE = time.diff()` Capture the observed inter_event_times.
+            2. `mod_TTE = np.exp((np.log(obs_TTE + 1) - self.mean_log_inter...)/self.std_log_inter...)`:
+               Modify the times between events by first padding them so none are <= 0, then ensuring that
+               their log has mean 0 and standard deviation 1, then re-exponentiating them out of the log
+               space.
+            3. `mod_time = mod_TTE.cumsum()` Re-sum the modified inter-event times to get modified raw times.
 
-        # Get the maximum number of static elements in the batch.
-        max_n_static = max(len(e['static_indices']) for e in batch)
+        If this dataset has been compiled (see `compile`), the output is read from the compiled ragged arrays
+        rather than re-derived from `self.data`, and the ragged elements are numpy arrays rather than lists.
+        """
 
-        # Walk through the batch and pad the associated tensors in all requisite dimensions.
-        out = defaultdict(list)
-        for e in batch:
-            if self.do_produce_static_data:
-                n_static = len(e['static_indices'])
-                static_delta = max_n_static - n_static
-                out['static_indices'].append(torch.nn.functional.pad(
-                    torch.Tensor(e['static_indices']), (0, static_delta), value=np.NaN
-                ))
-                out['static_measurement_indices'].append(torch.nn.functional.pad(
-                    torch.Tensor(e['static_measurement_indices']), (0, static_delta), value=np.NaN
-                ))
-
-        # Unsqueeze the padded tensors into the batch dimension and combine them.
-        out = {k: torch.cat([T.unsqueeze(0) for T in Ts], dim=0) for k, Ts in out.items()}
-
-        # Convert to the right types and add to the batch.
-        out_batch['static_indices'] = torch.nan_to_num(out['static_indices'], nan=0).long()
-        out_batch['static_measurement_indices'] = torch.nan_to_num(
-            out['static_measurement_indices'], nan=0
-        ).long()
+        # First find the subject corresponding to this dataset element.
+        if self.compiled is None:
+            subj_data, subj_metadata = self.data.subject_events_and_metadata(subject_id)
+            if start_time is not None:
+                subj_data = subj_data[subj_data.timestamp >= start_time]
+            if end_time is not None:
+                subj_data = subj_data[subj_data.timestamp <= end_time]
+
+            subj_metadata = subj_metadata.dropna(axis=1, how='all')
+            timestamps = subj_data.timestamp.values
+        else:
+            subj_idx = self._compiled_subject_idx[subject_id]
+            st, end = self.compiled['subject_event_offsets'][subj_idx:subj_idx+2]
+            timestamps = self.compiled['event_timestamps'][st:end]
 
-        return out_batch
+            keep = np.ones(len(timestamps), dtype=bool)
+            if start_time is not None: keep &= (timestamps >= np.datetime64(start_time))
+            if end_time is not None: keep &= (timestamps <= np.datetime64(end_time))
 
-    def __dynamic_only_collate(self, batch: List[DATA_ITEM_T]) -> EventStreamPytorchBatch:
-        # Get the local max sequence length and n_data elements for padding.
-        max_seq_len = max(len(e['time']) for e in batch)
+            event_idx = st + np.flatnonzero(keep)
+            timestamps = timestamps[keep]
 
-        max_n_data = 0
-        for e in batch:
-            for v in e['dynamic_indices']: max_n_data = max(max_n_data, len(v))
-        if max_n_data == 0:
-            raise ValueError(
-                f"Batch has no dynamic measurements! Got:\n{batch[0]}\n{batch[1]}\n..."
-            )
+        start_time = timestamps.min() if len(timestamps) > 0 else None
 
-        # Walk through the batch and pad the associated tensors in all requisite dimensions.
-        out = defaultdict(list)
-        for e in batch:
-            seq_len   = len(e['time'])
-            seq_delta = max_seq_len - seq_len
+        # If we need to truncate to `self.max_seq_len`, grab a random full-size span to capture that.
+        # TODO(mmd): This will proportionally underweight the front and back ends of the subjects data
+        # relative to the middle, as there are fewer full length sequences containing those elements.
+        if len(timestamps) > self.max_seq_len:
+            start_idx = np.random.choice(len(timestamps) - self.max_seq_len)
+            timestamps = timestamps[start_idx:start_idx+self.max_seq_len]
+            if self.compiled is None: subj_data = subj_data.iloc[start_idx:start_idx+self.max_seq_len]
+            else: event_idx = event_idx[start_idx:start_idx+self.max_seq_len]
 
-            if self.seq_padding_side == 'right':
-                out['time'].append(torch.nn.functional.pad(
-                    torch.Tensor(e['time']), (0, seq_delta), value=np.NaN
-                ))
-            else:
-                out['time'].append(torch.nn.functional.pad(
-                    torch.Tensor(e['time']), (seq_delta, 0), value=np.NaN
-                ))
+        # Now we need to produce the 4 tensor elements in this dataset:
+        # time, dynamic_indices, dynamic_values, and dynamic_measurement_indices
 
-            data_elements = defaultdict(list)
-            for k in ('dynamic_indices', 'dynamic_values', 'dynamic_measurement_indices'):
-                for vs in e[k]:
-                    data_delta = max_n_data - len(vs)
+        # Normalize time to the start of the sequence and convert it to minutes.
+        out = {'time': self._normalized_time(timestamps, start_time)}
 
-                    # We don't worry about seq_padding_side here as this is not the sequence dimension.
-                    data_elements[k].append(torch.nn.functional.pad(
-                        torch.Tensor(vs), (0, data_delta), value=np.NaN
-                    ))
+        # For data elements, we'll build a ragged representation for now,
+        # then will convert everything to padded tensors in the collate function.
+        if self.compiled is None:
+            dynamic_indices, dynamic_values, dynamic_measurement_indices = self._event_data_elements(
+                subj_data, subj_metadata
+            )
+        else:
+            data_offsets = self.compiled['event_data_offsets']
+            data_slices = [
+                slice(st, end) for st, end in zip(data_offsets[event_idx], data_offsets[event_idx+1])
+            ]
+            dynamic_indices = [self.compiled['dynamic_indices'][sl] for sl in data_slices]
+            dynamic_values = [self.compiled['dynamic_values'][sl] for sl in data_slices]
+            dynamic_measurement_indices = [
+                self.compiled['dynamic_measurement_indices'][sl] for sl in data_slices
+            ]
 
-                if len(data_elements[k]) == 0:
-                    raise ValueError(
-                        f"Batch element has no {k}! Got:\n{e}."
-                    )
+        out['dynamic_indices'] = dynamic_indices
+        out['dynamic_values'] = dynamic_values
+        out['dynamic_measurement_indices'] = dynamic_measurement_indices
 
-                if self.seq_padding_side == 'right':
-                    data_elements[k] = torch.nn.functional.pad(
-                        torch.cat([T.unsqueeze(0) for T in data_elements[k]]),
-                        (0, 0, 0, seq_delta), value=np.NaN
-                    )
-                else:
-                    data_elements[k] = torch.nn.functional.pad(
-                        torch.cat([T.unsqueeze(0) for T in data_elements[k]]),
-                        (0, 0, seq_delta, 0), value=np.NaN
-                    )
+        if not self.do_produce_static_data: return out
 
-                out[k].append(data_elements[k])
+        if self.compiled is None:
+            static_indices, static_measurement_indices = self._static_data_elements(subject_id)
+        else:
+            st, end = self.compiled['subject_static_offsets'][subj_idx:subj_idx+2]
+            static_indices = self.compiled['static_indices'][st:end]
+            static_measurement_indices = self.compiled['static_measurement_indices'][st:end]
 
-        # Unsqueeze the padded tensors into the batch dimension and combine them.
-        out_batch = {
-            k: torch.cat([T.unsqueeze(0) for T in Ts], dim=0) for k, Ts in out.items()
-        }
+        out['static_indices'] = static_indices
+        out['static_measurement_indices'] = static_measurement_indices
+        return out
+
+    @staticmethod
+    def _ragged_positions(
+        lengths: np.ndarray, max_len: int, pad_left: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (row, column) positions in a `[len(lengths), max_len]` padded array at which the
+        concatenated elements of a ragged list with row lengths `lengths` should be placed.
+        """
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        row_starts = np.cumsum(lengths) - lengths
+        cols = np.arange(lengths.sum()) - np.repeat(row_starts, lengths)
+        if pad_left: cols += np.repeat(max_len - lengths, lengths)
+        return rows, cols
+
+    def __static_and_dynamic_collate(self, batch: List[DATA_ITEM_T]) -> EventStreamPytorchBatch:
+        out_batch = self.__dynamic_only_collate(batch)
+
+        # Get the maximum number of static elements in the batch.
+        n_static = np.array([len(e['static_indices']) for e in batch], dtype=np.int64)
+        max_n_static = n_static.max()
+
+        # Fill the (zero-padded) static tensors directly from the concatenated static elements.
+        rows, cols = self._ragged_positions(n_static, max_n_static)
+        for k in ('static_indices', 'static_measurement_indices'):
+            out = np.zeros((len(batch), max_n_static), dtype=np.int64)
+            out[rows, cols] = np.fromiter(
+                itertools.chain.from_iterable(e[k] for e in batch), dtype=np.int64, count=len(rows)
+            )
+            out_batch[k] = torch.from_numpy(out)
 
-        # Add event and data masks on the basis of which elements are present, then convert the tensor
-        # elements to the appropraite types.
-        out_batch['event_mask'] = ~out_batch['time'].isnan()
-        out_batch['dynamic_values_mask'] = ~out_batch['dynamic_values'].isnan()
+        return out_batch
 
-        out_batch['time'] = torch.nan_to_num(out_batch['time'], nan=0)
+    def __dynamic_only_collate(self, batch: List[DATA_ITEM_T]) -> EventStreamPytorchBatch:
+        # Get the local max sequence length and n_data elements for padding.
+        seq_lens = np.array([len(e['time']) for e in batch], dtype=np.int64)
+        max_seq_len = seq_lens.max()
 
-        out_batch['dynamic_indices'] = torch.nan_to_num(out_batch['dynamic_indices'], nan=0).long()
-        out_batch['dynamic_measurement_indices'] = torch.nan_to_num(
-            out_batch['dynamic_measurement_indices'], nan=0
-        ).long()
-        out_batch['dynamic_values'] = torch.nan_to_num(out_batch['dynamic_values'], nan=0)
+        n_data = np.fromiter(
+            (len(v) for e in batch for v in e['dynamic_indices']), dtype=np.int64, count=seq_lens.sum()
+        )
+        max_n_data = n_data.max() if len(n_data) > 0 else 0
+        if max_n_data == 0:
+            raise ValueError(
+                f"Batch has no dynamic measurements! Got:\n{batch[0]}\n{batch[1]}\n..."
+            )
+        for e in batch:
+            if len(e['dynamic_indices']) == 0:
+                raise ValueError(f"Batch element has no dynamic_indices! Got:\n{e}.")
+
+        # Every output tensor is preallocated at its final (padded) shape and dtype, then filled in one shot
+        # via fancy indexing at the positions of the present events and data elements.
+        # We don't worry about seq_padding_side for data elements as that is not the sequence dimension.
+        event_rows, event_cols = self._ragged_positions(
+            seq_lens, max_seq_len, pad_left=(self.seq_padding_side == 'left')
+        )
+        data_events, data_cols = self._ragged_positions(n_data, max_n_data)
+        data_rows, data_event_cols = event_rows[data_events], event_cols[data_events]
+        n_total_data = len(data_events)
+
+        out_batch = {}
+
+        time = np.fromiter(
+            itertools.chain.from_iterable(e['time'] for e in batch), dtype=np.float32, count=len(event_rows)
+        )
+        out_batch['event_mask'] = np.zeros((len(batch), max_seq_len), dtype=bool)
+        out_batch['event_mask'][event_rows, event_cols] = ~np.isnan(time)
+        out_batch['time'] = np.zeros((len(batch), max_seq_len), dtype=np.float32)
+        out_batch['time'][event_rows, event_cols] = np.nan_to_num(time, nan=0)
+
+        for k in ('dynamic_indices', 'dynamic_measurement_indices'):
+            vals = np.fromiter(
+                itertools.chain.from_iterable(itertools.chain.from_iterable(e[k] for e in batch)),
+                dtype=np.int64, count=n_total_data,
+            )
+            out_batch[k] = np.zeros((len(batch), max_seq_len, max_n_data), dtype=np.int64)
+            out_batch[k][data_rows, data_event_cols, data_cols] = vals
+
+        vals = np.fromiter(
+            itertools.chain.from_iterable(itertools.chain.from_iterable(e['dynamic_values'] for e in batch)),
+            dtype=np.float32, count=n_total_data,
+        )
+        out_batch['dynamic_values_mask'] = np.zeros((len(batch), max_seq_len, max_n_data), dtype=bool)
+        out_batch['dynamic_values_mask'][data_rows, data_event_cols, data_cols] = ~np.isnan(vals)
+        out_batch['dynamic_values'] = np.zeros((len(batch), max_seq_len, max_n_data), dtype=np.float32)
+        out_batch['dynamic_values'][data_rows, data_event_cols, data_cols] = np.nan_to_num(vals, nan=0)
+
+        out_batch = {k: torch.from_numpy(v) for k, v in out_batch.items()}
 
         out_batch = EventStreamPytorchBatch(**out_batch)
 
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import dataclasses, numpy as np, pandas as pd
+
+from functools import cached_property
+from scipy import stats
+from sklearn.preprocessing import QuantileTransformer
+from typing import Optional
+
+from ..StreamingQuantileNormalizer.streaming_quantile_normalizer import StreamingQuantileNormalizer
+from ..VarianceImpactOutlierDetector.variance_impact_outlier_detector import (
+    VarianceImpactOutlierDetector
+)
+
+# Mirrors the threshold `QuantileTransformer` uses to identify values at the bounds of its quantiles.
+QUANTILE_BOUNDS_THRESHOLD = 1e-7
+
+@dataclasses.dataclass
+class PackedNumericalModels():
+    """
+    A packed representation of the per-key outlier detection and normalization models of a key-value
+    numerical measurement, which applies all keys' models at once via vectorized gathers and searches rather
+    than one `predict`/`transform` call per key. Models are indexed by key id, which is the position of the
+    key in `keys`.
+
+    Only `VarianceImpactOutlierDetector` outlier detectors and (single feature) `QuantileTransformer` or
+    `StreamingQuantileNormalizer` normalizers can be packed. Outputs match those of the per-key models.
+
+    Attributes:
+        `keys` (`pd.Index`): The keys of the measurement, in key id order.
+        `thresh_small` (`np.ndarray`):
+            Per key id, values at or below this threshold are outliers. Is `-np.inf` for keys without an
+            outlier detection model.
+        `thresh_large` (`np.ndarray`):
+            Per key id, values at or above this threshold are outliers. Is `np.inf` for keys without an
+            outlier detection model.
+        `quantile_offsets` (`np.ndarray`):
+            The quantile table for key id `i` is stored in
+            `quantiles[quantile_offsets[i]:quantile_offsets[i+1]]` (and likewise for `references`). Keys
+            without normalizers have empty tables.
+        `quantiles` (`np.ndarray`): The stacked quantile tables of all keys.
+        `references` (`np.ndarray`): The stacked reference (output) tables of all keys.
+        `is_normal_output` (`np.ndarray`): Per key id, whether the normalizer outputs normal quantiles.
+    """
+
+    keys: pd.Index
+    thresh_small: np.ndarray
+    thresh_large: np.ndarray
+    quantile_offsets: np.ndarray
+    quantiles: np.ndarray
+    references: np.ndarray
+    is_normal_output: np.ndarray
+
+    @classmethod
+    def from_measurement_metadata(cls, measurement_metadata: pd.DataFrame) -> Optional[PackedNumericalModels]:
+        """
+        Packs the `outlier_model` and `normalizer` columns (either of which may be absent) of the per-key
+        `measurement_metadata` of a key-value numerical measurement.
+
+        Returns: The packed models, or `None` if any model is not of a packable type.
+        """
+        N = len(measurement_metadata)
+        thresh_small, thresh_large = np.full(N, -np.inf), np.full(N, np.inf)
+        quantile_lens, quantiles, references = np.zeros(N, dtype=np.int64), [], []
+        is_normal_output = np.zeros(N, dtype=bool)
+
+        if 'outlier_model' in measurement_metadata.columns:
+            for i, M in enumerate(measurement_metadata['outlier_model'].values):
+                if pd.isnull(M): continue
+                if type(M) is not VarianceImpactOutlierDetector: return None
+                thresh_small[i], thresh_large[i] = M.thresh_small_, M.thresh_large_
+
+        if 'normalizer' in measurement_metadata.columns:
+            for i, M in enumerate(measurement_metadata['normalizer'].values):
+                if pd.isnull(M): continue
+                if type(M) not in (QuantileTransformer, StreamingQuantileNormalizer): return None
+                if M.quantiles_.shape[1] != 1: return None
+                quantile_lens[i] = len(M.references_)
+                quantiles.append(M.quantiles_[:, 0])
+                references.append(M.references_)
+                is_normal_output[i] = (M.output_distribution == 'normal')
+
+        return cls(
+            keys=measurement_metadata.index,
+            thresh_small=thresh_small,
+            thresh_large=thresh_large,
+            quantile_offsets=np.concatenate(([0], np.cumsum(quantile_lens))),
+            quantiles=np.concatenate(quantiles) if quantiles else np.zeros(0),
+            references=np.concatenate(references) if references else np.zeros(0),
+            is_normal_output=is_normal_output,
+        )
+
+    def key_ids(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Returns the key ids of `keys`.
+
+        Raises:
+            `KeyError`: If any key in `keys` was not packed.
+        """
+        key_ids = self.keys.get_indexer(keys)
+        if (key_ids == -1).any(): raise KeyError(f"Keys {set(keys[key_ids == -1])} were not packed!")
+        return key_ids
+
+    @cached_property
+    def _segment_reversed_idx(self) -> np.ndarray:
+        """Indexes `quantiles` (or `references`) such that each key's table is reversed in place."""
+        starts, ends = self.quantile_offsets[:-1], self.quantile_offsets[1:]
+        segment_ends = np.repeat(starts + ends - 1, ends - starts)
+        return segment_ends - np.arange(len(self.quantiles))
+
+    def is_inlier(self, key_ids: np.ndarray, vals: np.ndarray) -> np.ndarray:
+        """Returns whether each value in `vals` is an inlier under the outlier model of its key."""
+        return (vals > self.thresh_small[key_ids]) & (vals < self.thresh_large[key_ids])
+
+    @staticmethod
+    def _segmented_interp(
+        x: np.ndarray, starts: np.ndarray, ends: np.ndarray, xp: np.ndarray, fp: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns `np.interp(x[i], xp[starts[i]:ends[i]], fp[starts[i]:ends[i]])` for all `i` at once, via a
+        vectorized binary search over the (non-empty) segments. Follows `np.interp`'s arithmetic exactly.
+        """
+        # Finds the number of elements of each segment which are <= x (i.e., a right-sided searchsorted).
+        lo, hi = starts.copy(), ends.copy()
+        while True:
+            active = lo < hi
+            if not active.any(): break
+            mid = np.where(active, (lo + hi) // 2, 0)
+            go_right = active & (xp[mid] <= x)
+            lo = np.where(go_right, mid + 1, lo)
+            hi = np.where(active & ~go_right, mid, hi)
+
+        j = np.clip(lo - 1, starts, ends - 1)
+        j_next = np.minimum(j + 1, ends - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = (fp[j_next] - fp[j]) / (xp[j_next] - xp[j])
+            out = slope * (x - xp[j]) + fp[j]
+            out = np.where(np.isnan(out), slope * (x - xp[j_next]) + fp[j_next], out)
+
+        out = np.where(x == xp[j], fp[j], out)
+        out = np.where((lo == ends) | (j == ends - 1), fp[ends - 1], out)
+        out = np.where(x < xp[starts], fp[starts], out)
+        return out
+
+    def normalize(self, key_ids: np.ndarray, vals: np.ndarray) -> np.ndarray:
+        """
+        Returns `vals` transformed by the normalizer of their keys, or unchanged for keys without normalizers.
+        Follows `QuantileTransformer._transform_col`.
+        """
+        out = vals.astype(float, copy=True)
+
+        starts, ends = self.quantile_offsets[key_ids], self.quantile_offsets[key_ids + 1]
+        has_normalizer = ends > starts
+        if not has_normalizer.any(): return out
+
+        x, starts, ends = vals[has_normalizer], starts[has_normalizer], ends[has_normalizer]
+        is_normal_output = self.is_normal_output[key_ids[has_normalizer]]
+
+        # `QuantileTransformer` averages interpolations in both directions, to handle repeated quantiles.
+        # The reversed direction is equivalent to interpolating `-x` on the negated and reversed segments.
+        rev_idx = self._segment_reversed_idx
+        y = 0.5 * (
+            self._segmented_interp(x, starts, ends, self.quantiles, self.references)
+            - self._segmented_interp(-x, starts, ends, -self.quantiles[rev_idx], -self.references[rev_idx])
+        )
+
+        lower_bound_x, upper_bound_x = self.quantiles[starts], self.quantiles[ends - 1]
+        is_lower = np.where(
+            is_normal_output, x - QUANTILE_BOUNDS_THRESHOLD < lower_bound_x, x == lower_bound_x
+        )
+        is_upper = np.where(
+            is_normal_output, x + QUANTILE_BOUNDS_THRESHOLD > upper_bound_x, x == upper_bound_x
+        )
+        y = np.where(is_upper, 1., y)
+        y = np.where(is_lower, 0., y)
+
+        if is_normal_output.any():
+            clip_min = stats.norm.ppf(QUANTILE_BOUNDS_THRESHOLD - np.spacing(1))
+            clip_max = stats.norm.ppf(1 - (QUANTILE_BOUNDS_THRESHOLD - np.spacing(1)))
+            y[is_normal_output] = np.clip(stats.norm.ppf(y[is_normal_output]), clip_min, clip_max)
+
+        out[has_normalizer] = y
+        return out
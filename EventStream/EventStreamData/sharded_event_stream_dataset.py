@@ -0,0 +1,428 @@
+from __future__ import annotations
+
+import dill, numpy as np, pandas as pd, shutil
+
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Set
+
+from mixins import TimeableMixin
+
+from .columnar_io import load_df, load_df_columns, save_df
+from .config import EventStreamDatasetConfig, MeasurementConfig
+from .event_stream_dataset import EventStreamDataset
+from .types import TemporalityType
+from .vocabulary import Vocabulary
+
+class ShardedEventStreamDataset(EventStreamDataset):
+    """
+    An `EventStreamDataset` whose `events_df` and `joint_metadata_df` live on local disk as
+    subject-partitioned shards, rather than in memory. Each shard holds all events and metadata for a
+    disjoint set of subjects, so any per-subject operation can be performed one shard at a time. Shards are
+    stored in the columnar format of `columnar_io`, so numerical columns are memory-mapped on load and column
+    subsets can be loaded without reading the rest of the shard.
+
+    The directory layout is:
+        * `state.pkl`: The (small) dataset-level state: config, fit measurement configs, splits, etc.
+        * `subject_shards`: A columnar dataframe mapping each `subject_id` to the shard that contains it.
+        * `subjects_df`: The columnar `subjects_df`, if present.
+        * `shards/{i}/events_df` and `shards/{i}/joint_metadata_df`: The columnar data for shard `i`.
+
+    Split and subject accessors (`subject_ids_for_split`, `train_subject_ids`, etc.) are served from the
+    dataset-level state without touching any shards. `metadata_df(...)`, `train_events_df` and related
+    accessors only load the shards that contain the requested subjects. `events_df` and `joint_metadata_df`
+    are supported for compatibility, but materialize every shard in memory and should be avoided on large
+    datasets; use `iter_shards` instead.
+
+    Args:
+        `save_dir` (`Path`): The directory containing the sharded dataset, as written by `write_shards`.
+    """
+
+    STATE_ATTRS = (
+        'config', 'metadata_is_fit', 'inferred_measurement_configs', 'split_subjects', 'event_types',
+        'subject_ids', 'n_events_per_subject'
+    )
+
+    @classmethod
+    def write_shards(
+        cls,
+        save_dir: Path,
+        shards: Iterable[EventStreamDataset],
+        config: EventStreamDatasetConfig,
+        subjects_df: Optional[pd.DataFrame] = None,
+        split_subjects: Optional[Dict[str, Set[Hashable]]] = None,
+        do_offset_ids: bool = True,
+        do_overwrite: bool = False,
+    ) -> 'ShardedEventStreamDataset':
+        """
+        Writes a sharded dataset to `save_dir` from an iterable of in-memory `EventStreamDataset` shards, then
+        returns it. Shards are consumed one at a time, so `shards` may be a generator that builds each shard
+        from a subject-partitioned chunk of the raw data; the full dataset never needs to fit in memory.
+
+        Args:
+            `save_dir` (`Path`): The directory in which to write the sharded dataset.
+            `shards` (`Iterable[EventStreamDataset]`):
+                The shards to write. Each must contain a disjoint set of subjects. Their own `config`,
+                `subjects_df`, and splits are ignored.
+            `config` (`EventStreamDatasetConfig`): The configuration for the sharded dataset.
+            `subjects_df` (`Optional[pd.DataFrame]`, *optional*, defaults to `None`):
+                The `subjects_df` for the full dataset.
+            `split_subjects` (`Optional[Dict[str, Set[Hashable]]]`, *optional*, defaults to `None`):
+                If specified, the subject splits for the full dataset. Otherwise, the dataset is unsplit.
+            `do_offset_ids` (`bool`, *optional*, defaults to `True`):
+                Whether the `event_id`s and `metadata_id`s of each shard should be offset by the running
+                totals of the prior shards, so that they are globally unique. Should be `False` only if the
+                shards' ids are already globally unique.
+            `do_overwrite` (`bool`, *optional*, defaults to `False`): Whether to overwrite `save_dir`.
+
+        Returns: The `ShardedEventStreamDataset` stored in `save_dir`.
+        """
+        if save_dir.exists():
+            if not do_overwrite: raise FileExistsError(f"{save_dir} already exists!")
+            shutil.rmtree(save_dir)
+        save_dir.mkdir(parents=True)
+
+        subject_shards = []
+        event_types = Counter()
+        n_events_per_subject = {}
+        event_id_offset, metadata_id_offset = 0, 0
+
+        for i, shard in enumerate(shards):
+            events_df = shard.events_df
+            joint_metadata_df = shard.joint_metadata_df
+
+            if do_offset_ids:
+                events_df = events_df.set_axis(events_df.index + event_id_offset, axis=0)
+                joint_metadata_df = joint_metadata_df.set_axis(
+                    joint_metadata_df.index + metadata_id_offset, axis=0
+                )
+                joint_metadata_df['event_id'] = joint_metadata_df['event_id'] + event_id_offset
+
+                if len(shard.events_df): event_id_offset += shard.events_df.index.max() + 1
+                if len(shard.joint_metadata_df): metadata_id_offset += shard.joint_metadata_df.index.max() + 1
+
+            shard_subjects = sorted(shard.n_events_per_subject.keys())
+            overlap = set(shard_subjects) & set(n_events_per_subject.keys())
+            if overlap: raise ValueError(f"Subjects {list(overlap)[:5]} are present in multiple shards!")
+
+            subject_shards.append(pd.Series(i, index=pd.Index(shard_subjects, name='subject_id')))
+            event_types.update(events_df.event_type)
+            n_events_per_subject.update(shard.n_events_per_subject)
+
+            save_df(events_df, save_dir / 'shards' / str(i) / 'events_df')
+            save_df(joint_metadata_df, save_dir / 'shards' / str(i) / 'joint_metadata_df')
+
+        if not subject_shards: raise ValueError("No shards were provided!")
+
+        save_df(pd.concat(subject_shards).to_frame('shard'), save_dir / 'subject_shards')
+        if subjects_df is not None:
+            assert subjects_df.index.names == ['subject_id']
+            save_df(subjects_df, save_dir / 'subjects_df')
+
+            for sid in set(subjects_df.index.values) - set(n_events_per_subject.keys()):
+                n_events_per_subject[sid] = 0
+
+        state = {
+            'config': config,
+            'metadata_is_fit': False,
+            'inferred_measurement_configs': {},
+            'split_subjects': {} if split_subjects is None else split_subjects,
+            'event_types': [e for e, _ in event_types.most_common()],
+            'subject_ids': set(n_events_per_subject.keys()),
+            'n_events_per_subject': n_events_per_subject,
+        }
+        with open(save_dir / 'state.pkl', mode='wb') as f: dill.dump(state, f)
+
+        return cls(save_dir)
+
+    @classmethod
+    def from_event_stream_dataset(
+        cls, E: EventStreamDataset, save_dir: Path, n_shards: int, do_overwrite: bool = False
+    ) -> 'ShardedEventStreamDataset':
+        """
+        Writes the in-memory `EventStreamDataset` `E` to `save_dir` as `n_shards` subject-partitioned shards,
+        preserving its `event_id`s, `metadata_id`s, splits, and any fit preprocessing state.
+        """
+        subject_partitions = np.array_split(np.array(sorted(E.subject_ids)), n_shards)
+
+        def shards():
+            for subjects in subject_partitions:
+                shard = EventStreamDataset(
+                    E.config,
+                    events_df=E.events_df[E.events_df.subject_id.isin(subjects)],
+                    metadata_df=E.joint_metadata_df[E.joint_metadata_df.subject_id.isin(subjects)],
+                )
+                shard.n_events_per_subject.update({s: 0 for s in subjects if s not in shard.subject_ids})
+                yield shard
+
+        sharded = cls.write_shards(
+            save_dir, shards(), E.config, subjects_df=E.subjects_df, split_subjects=E.split_subjects,
+            do_offset_ids=False, do_overwrite=do_overwrite,
+        )
+        sharded.metadata_is_fit = E.metadata_is_fit
+        sharded.inferred_measurement_configs = E.inferred_measurement_configs
+        sharded.save_state()
+        return sharded
+
+    def __init__(self, save_dir: Path):
+        self.save_dir = save_dir
+
+        with open(save_dir / 'state.pkl', mode='rb') as f: state = dill.load(f)
+        for attr in self.STATE_ATTRS: setattr(self, attr, state[attr])
+
+        self.subject_shards = load_df(save_dir / 'subject_shards', mmap=False)['shard']
+        self.n_shards = self.subject_shards.max() + 1
+
+        if (save_dir / 'subjects_df').exists(): self.subjects_df = load_df(save_dir / 'subjects_df')
+        else: self.subjects_df = None
+
+    def save_state(self):
+        """Writes the dataset-level state (config, fit preprocessing state, splits, etc.) to disk."""
+        state = {attr: getattr(self, attr) for attr in self.STATE_ATTRS}
+        with open(self.save_dir / 'state.pkl', mode='wb') as f: dill.dump(state, f)
+
+    def _shard_dir(self, shard: int) -> Path: return self.save_dir / 'shards' / str(shard)
+
+    def shards_for_subjects(self, subject_ids: Optional[Iterable[Hashable]] = None) -> List[int]:
+        """
+        Returns the (sorted) shards that contain any of `subject_ids`, or all shards if it is `None`. Shard 0
+        is returned if no shard contains any of `subject_ids`, so that empty results retain their columns.
+        """
+        if subject_ids is None: return list(range(self.n_shards))
+        shards = self.subject_shards[self.subject_shards.index.isin(list(subject_ids))]
+        return sorted(set(shards.values)) or [0]
+
+    @TimeableMixin.TimeAs
+    def load_shard(
+        self,
+        shard: int,
+        events_columns: Optional[Sequence[str]] = None,
+        metadata_columns: Optional[Sequence[str]] = None,
+    ) -> EventStreamDataset:
+        """
+        Loads shard `shard` as an in-memory `EventStreamDataset`, which shares this dataset's config, splits,
+        and fit preprocessing state.
+
+        Args:
+            `shard` (`int`): Which shard to load.
+            `events_columns` (`Optional[Sequence[str]]`, *optional*, defaults to `None`):
+                If specified, only these columns (in addition to the mandatory `subject_id`, `timestamp`, and
+                `event_type` columns) of the shard's `events_df` will be loaded.
+            `metadata_columns` (`Optional[Sequence[str]]`, *optional*, defaults to `None`):
+                If specified, only these columns (in addition to the mandatory `event_id`, `event_type`, and
+                `subject_id` columns) of the shard's `joint_metadata_df` will be loaded.
+        """
+        shard_dir = self._shard_dir(shard)
+
+        if events_columns is not None:
+            events_columns = ['subject_id', 'timestamp', 'event_type', *events_columns]
+        if metadata_columns is not None:
+            metadata_columns = ['event_id', 'event_type', 'subject_id', *metadata_columns]
+
+        events_df = load_df(shard_dir / 'events_df', columns=events_columns)
+        joint_metadata_df = load_df(shard_dir / 'joint_metadata_df', columns=metadata_columns)
+
+        if self.subjects_df is None: subjects_df = None
+        else:
+            shard_subjects = self.subject_shards.index[self.subject_shards == shard]
+            subjects_df = self.subjects_df[self.subjects_df.index.isin(shard_subjects)]
+
+        E = EventStreamDataset(
+            self.config, events_df=events_df, metadata_df=joint_metadata_df, subjects_df=subjects_df,
+            do_copy=False
+        )
+        E.split_subjects = self.split_subjects
+        E.inferred_measurement_configs = self.inferred_measurement_configs
+        E.metadata_is_fit = self.metadata_is_fit
+        return E
+
+    def iter_shards(
+        self, shards: Optional[Sequence[int]] = None, **load_kwargs
+    ) -> Iterator[EventStreamDataset]:
+        """Lazily loads and yields shards `shards` (or all shards), one at a time. See `load_shard`."""
+        if shards is None: shards = range(self.n_shards)
+        for shard in shards: yield self.load_shard(shard, **load_kwargs)
+
+    @TimeableMixin.TimeAs
+    def save_shard(self, shard: int, E: EventStreamDataset):
+        """Overwrites shard `shard` on disk with the contents of `E`."""
+        shard_dir = self._shard_dir(shard)
+        save_df(E.events_df, shard_dir / 'events_df', do_overwrite=True)
+        save_df(E.joint_metadata_df, shard_dir / 'joint_metadata_df', do_overwrite=True)
+
+    @property
+    def events_df(self) -> pd.DataFrame:
+        """Materializes the full `events_df` across all shards in memory."""
+        return pd.concat([E.events_df for E in self.iter_shards()])
+
+    @property
+    def joint_metadata_df(self) -> pd.DataFrame:
+        """Materializes the full `joint_metadata_df` across all shards in memory."""
+        return pd.concat([E.joint_metadata_df for E in self.iter_shards()])
+
+    @property
+    def events_df_with_metadata(self) -> pd.DataFrame:
+        """Materializes the full `events_df_with_metadata` across all shards in memory."""
+        return pd.concat([E.events_df_with_metadata for E in self.iter_shards()])
+
+    @TimeableMixin.TimeAs
+    def _events_for_split(
+        self, split: Optional[str] = None, splits: Optional[Sequence[str]] = None
+    ) -> pd.DataFrame:
+        """Returns the events in split `split` or splits `splits` (can't set both), or all events."""
+        if split is None and splits is None: return self.events_df
+
+        subject_ids = self.subject_ids_for_split(split, splits)
+        return pd.concat([
+            E.events_df[E.events_df.subject_id.isin(subject_ids)]
+            for E in self.iter_shards(self.shards_for_subjects(subject_ids))
+        ])
+
+    @TimeableMixin.TimeAs
+    def metadata_df(
+        self,
+        event_types: Optional[Sequence[str]] = None,
+        event_type: Optional[str] = None,
+        splits: Optional[Sequence[str]] = None,
+        split: Optional[str] = None,
+        subject_ids: Optional[Sequence[Hashable]] = None,
+        subject_id: Optional[Hashable] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Retrieves restricted metadata records and drops nan columns, loading only the shards containing
+        the relevant subjects (and, if `columns` is specified, only those of `columns` stored in each shard).
+        See `EventStreamDataset.metadata_df`.
+        """
+        if subject_id is not None: shard_subjects = [subject_id]
+        elif subject_ids is not None: shard_subjects = subject_ids
+        elif (split is not None) or (splits is not None):
+            shard_subjects = self.subject_ids_for_split(split, splits)
+        else: shard_subjects = None
+
+        kwargs = {
+            'event_types': event_types, 'event_type': event_type, 'splits': splits, 'split': split,
+            'subject_ids': subject_ids, 'subject_id': subject_id,
+        }
+        mandatory_columns = ('event_id', 'event_type', 'subject_id')
+
+        dfs = []
+        for shard in self.shards_for_subjects(shard_subjects):
+            if columns is None: metadata_columns = None
+            else:
+                stored = set(load_df_columns(self._shard_dir(shard) / 'joint_metadata_df'))
+                metadata_columns = [c for c in columns if (c in stored) and (c not in mandatory_columns)]
+
+            # `metadata_df` doesn't read the events of the shard, so only their mandatory columns are loaded.
+            E = self.load_shard(shard, events_columns=[], metadata_columns=metadata_columns)
+            dfs.append(E.metadata_df(**kwargs, columns=columns))
+        return pd.concat(dfs).dropna(axis=1, how='all')
+
+    def _apply_to_shards(self, method: str):
+        """Loads each shard in turn, calls `EventStreamDataset.{method}` on it, and writes it back to disk."""
+        for shard in range(self.n_shards):
+            E = self.load_shard(shard)
+            getattr(E, method)()
+            self.save_shard(shard, E)
+
+    @TimeableMixin.TimeAs
+    def add_time_dependent_columns(self):
+        """Adds time-dependent columns to each shard in turn."""
+        self._apply_to_shards('add_time_dependent_columns')
+
+    @TimeableMixin.TimeAs
+    def backup_numerical_metadata_columns(self):
+        """Backs up the all numerical columns of each shard in turn."""
+        self._apply_to_shards('backup_numerical_metadata_columns')
+
+    @TimeableMixin.TimeAs
+    def restore_numerical_metadata_columns(self):
+        """Restores backed-up copies of all numerical columns of each shard in turn."""
+        self._apply_to_shards('restore_numerical_metadata_columns')
+
+    # Not timed separately, as `EventStreamDataset.fit_metadata` already is.
+    def fit_metadata(self):
+        """
+        Fits preprocessing models over the train split, loading shards lazily and only the train rows of the
+        columns of a single measurement at a time. See `EventStreamDataset.fit_metadata`.
+
+        Categorical vocabularies are fit shard by shard: only each shard's element counts are retained, and
+        these are summed exactly. Numerical measurements instead pool the train values of their (key and)
+        values columns over all shards, as value type inference and outlier detection require all of a key's
+        values at once (and normalizers are fit on those same values). Peak memory is thus bounded by the
+        train values of the largest numerical measurement plus a single shard.
+        """
+        super().fit_metadata()
+        self.save_state()
+
+    def _iter_train_measurement_dfs(
+        self, config: MeasurementConfig, columns: Optional[Sequence[str]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Lazily yields, shard by shard, the training split dataframe in which the (non-static) measurement
+        configured by `config` is stored, loading only those of `columns` (if specified) which each shard
+        stores. See `EventStreamDataset._train_measurement_df`.
+        """
+        if columns is not None: columns = [c for c in columns if c is not None]
+        is_dynamic = (config.temporality == TemporalityType.DYNAMIC)
+        df_name = 'joint_metadata_df' if is_dynamic else 'events_df'
+
+        for shard in self.shards_for_subjects(self.subject_ids_for_split('train')):
+            if columns is None: load_columns = None
+            else:
+                stored = set(load_df_columns(self._shard_dir(shard) / df_name))
+                load_columns = [c for c in columns if c in stored]
+
+            if is_dynamic: E = self.load_shard(shard, events_columns=[], metadata_columns=load_columns)
+            else: E = self.load_shard(shard, events_columns=load_columns, metadata_columns=[])
+            yield E._train_measurement_df(config, columns)
+
+    def _train_measurement_df(
+        self, config: MeasurementConfig, columns: Optional[Sequence[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Returns the training split dataframe in which the measurement configured by `config` is stored,
+        loading only those of `columns` (if specified) from each shard. See
+        `EventStreamDataset._train_measurement_df`.
+        """
+        if config.temporality != TemporalityType.FUNCTIONAL_TIME_DEPENDENT:
+            # Dynamic measurements are read via `metadata_df`, which already loads only `columns`.
+            return super()._train_measurement_df(config, columns)
+        return pd.concat(self._iter_train_measurement_dfs(config, columns))
+
+    # Not timed separately, as `EventStreamDataset._fit_categorical_metadata_column` already is.
+    def _fit_categorical_metadata_column(self, col: str):
+        """
+        Fits the categorical measurement `col` shard by shard, summing each shard's element counts (in order
+        of first observation) rather than pooling its observations. This yields exactly the vocabulary of a
+        pooled fit, including the order of tied elements, which merging per-shard vocabularies via
+        `Vocabulary.merge` would not.
+        """
+        config = self._categorical_inferred_config(col)
+        if config.temporality == TemporalityType.STATIC:
+            return super()._fit_categorical_metadata_column(col)
+
+        is_present, N, total_possible_events, counts = False, 0, 0, {}
+        for measurement_df in self._iter_train_measurement_dfs(config, [col, config.values_column]):
+            total_possible_events += len(measurement_df)
+            if col not in measurement_df: continue
+
+            is_present = True
+            observations = self._categorical_metadata_observations(config, col, measurement_df)
+            if observations is None: return
+
+            N += len(observations)
+            if config.vocabulary is None:
+                for v, c in Vocabulary.count_observations(observations).items():
+                    counts[v] = counts.get(v, 0) + c
+
+        if not is_present:
+            config.drop()
+            return
+
+        return self._fit_categorical_metadata_column_counts(config, N, total_possible_events, lambda: counts)
+
+    @TimeableMixin.TimeAs
+    def transform_metadata(self):
+        """Transforms each shard in turn given the fit pre-processors, writing the results back to disk."""
+        self._apply_to_shards('transform_metadata')
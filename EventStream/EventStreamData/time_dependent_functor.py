@@ -1,11 +1,24 @@
 from __future__ import annotations
 
-import abc, pandas as pd
+import abc, numpy as np, pandas as pd
 
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from .types import DataModality
 
+# The int64 value of null (`NaT`) timestamps in epoch nanosecond arrays.
+NAT_EPOCH_NS = np.iinfo(np.int64).min
+NS_PER_HOUR = 60 * 60 * 10**9
+NS_PER_YEAR = pd.to_timedelta(365, 'days').value
+
+def to_epoch_ns(timestamps: pd.Series) -> np.ndarray:
+    """
+    Returns the wall-clock times of `timestamps` (i.e., ignoring any timezone) as int64 nanoseconds since the
+    epoch, with null timestamps as `NAT_EPOCH_NS`.
+    """
+    if getattr(timestamps.dtype, 'tz', None) is not None: timestamps = timestamps.dt.tz_localize(None)
+    return np.asarray(timestamps.values, dtype='datetime64[ns]').view(np.int64)
+
 class TimeDependentFunctor(abc.ABC):
     """An abstract base class defining the interface necessary for specifying time-dependent functions."""
     OUTPUT_MODALITY = DataModality.DROPPED
@@ -41,6 +54,37 @@ class TimeDependentFunctor(abc.ABC):
         """
         raise NotImplementedError(f"Must overwrite in subclass!")
 
+    def subject_columns(self) -> List[str]:
+        """Returns the columns of `subject_df` which `vectorized_call` requires."""
+        return []
+
+    @property
+    def is_vectorized(self) -> bool:
+        """Whether or not this functor overwrites `vectorized_call`."""
+        return type(self).vectorized_call is not TimeDependentFunctor.vectorized_call
+
+    def vectorized_call(self, timestamps: np.ndarray, subject_vals: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Computes the value of the time-dependent function over plain arrays. May be overwritten to provide a
+        faster implementation than `__call__`; `EventStreamDataset` uses it in place of `__call__` if so.
+
+        Args:
+            `timestamps` (`np.ndarray`):
+                The timestamps of the events, as int64 nanoseconds since the epoch (see `to_epoch_ns`).
+            `subject_vals` (`Dict[str, np.ndarray]`):
+                For each column in `self.subject_columns()`, the values of that column of `subject_df` for the
+                subject of each event, aligned with `timestamps`.
+        Returns:
+            The result of the time-dependent function in question, as an array aligned with `timestamps`.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not support vectorized calls!")
+
+    def _call_via_vectorized(self, time: pd.Series, subject_df: pd.DataFrame) -> pd.Series:
+        """Implements `__call__` (with its signature) via `vectorized_call`."""
+        subject_ids = time.index.get_level_values('subject_id')
+        subject_vals = {col: subject_df.loc[subject_ids, col].values for col in self.subject_columns()}
+        return pd.Series(self.vectorized_call(to_epoch_ns(time), subject_vals), index=time.index)
+
     def __eq__(self, other: 'TimeDependentFunctor') -> bool: return self.to_dict() == other.to_dict()
 
 class AgeFunctor(TimeDependentFunctor):
@@ -50,23 +94,35 @@ class AgeFunctor(TimeDependentFunctor):
     def __init__(self, dob_col: str):
         self.dob_col = dob_col
 
+    def subject_columns(self) -> List[str]: return [self.dob_col]
+
+    def vectorized_call(self, timestamps: np.ndarray, subject_vals: Dict[str, np.ndarray]) -> np.ndarray:
+        dob = np.asarray(subject_vals[self.dob_col], dtype='datetime64[ns]').view(np.int64)
+
+        out = (timestamps - dob) / NS_PER_YEAR
+        out[(timestamps == NAT_EPOCH_NS) | (dob == NAT_EPOCH_NS)] = np.NaN
+        return out
+
     def __call__(self, time: pd.Series, subject_df: pd.DataFrame) -> pd.Series:
-        return (
-            (time - subject_df.loc[time.index.get_level_values('subject_id'), self.dob_col].values) /
-            pd.to_timedelta(365, 'days')
-        )
+        return self._call_via_vectorized(time, subject_df)
 
 class TimeOfDayFunctor(TimeDependentFunctor):
     """An example functor that returns the time-of-day in 4 categories when the event occurred."""
     OUTPUT_MODALITY = DataModality.SINGLE_LABEL_CLASSIFICATION
 
     def __init__(self): pass
-    def __call__(self, time: pd.Series, _) -> pd.Series:
-        return time.apply(
-            lambda dt: (
-                'EARLY_AM' if dt.hour < 6 else
-                'AM' if dt.hour < 12 else
-                'PM' if dt.hour < 21 else
-                'LATE_PM'
-            )
-        )
+
+    def vectorized_call(self, timestamps: np.ndarray, _) -> np.ndarray:
+        hours = (timestamps // NS_PER_HOUR) % 24
+
+        out = np.full(len(timestamps), 'LATE_PM', dtype=object)
+        out[hours < 21] = 'PM'
+        out[hours < 12] = 'AM'
+        out[hours < 6] = 'EARLY_AM'
+
+        # Null timestamps have no hour, so fail every comparison and are `'LATE_PM'`.
+        out[timestamps == NAT_EPOCH_NS] = 'LATE_PM'
+        return out
+
+    def __call__(self, time: pd.Series, subject_df: pd.DataFrame) -> pd.Series:
+        return self._call_via_vectorized(time, subject_df)
@@ -4,7 +4,7 @@ import copy, dataclasses, numpy as np, pandas as pd
 
 from collections import Counter
 from functools import cached_property
-from typing import Dict, Generic, List, Optional, Sequence, Set, TypeVar, Union
+from typing import Dict, Generic, List, Optional, Sequence, Set, Tuple, TypeVar, Union
 
 from ..utils import COUNT_OR_PROPORTION, is_monotonically_nonincreasing
 
@@ -20,9 +20,18 @@ class Vocabulary(Generic[VOCAB_ELEMENT]):
     # least frequently observed.
     vocabulary: Optional[List[Union[str, VOCAB_ELEMENT]]] = None
 
-    # The observed frequencies of elements of the vocabulary.
+    # The observed frequencies of elements of the vocabulary. If omitted, these are computed from
+    # `obs_counts` and `total_observations`.
     obs_frequencies: Optional[np.ndarray] = None
 
+    # The raw observation counts of elements of the vocabulary, if known. Vocabularies tracking raw counts can
+    # be merged exactly, via `merge`.
+    obs_counts: Optional[np.ndarray] = None
+
+    # The total number of observations over which `obs_counts` were counted (i.e., the denominator of
+    # `obs_frequencies`).
+    total_observations: Optional[int] = None
+
     @cached_property
     def idxmap(self) -> Dict[VOCAB_ELEMENT, int]:
         """Returns a mapping from vocab element to vocabulary integer index."""
@@ -54,6 +63,14 @@ class Vocabulary(Generic[VOCAB_ELEMENT]):
     def __post_init__(self):
         """Validates the vocabulary and sorts the vocabulary in the proper order."""
         assert len(self.vocabulary) > 0, "Empty vocabularies are not supported!"
+
+        if self.obs_counts is not None:
+            assert self.total_observations is not None, "Raw counts require `total_observations`!"
+            assert len(self.vocabulary) == len(self.obs_counts)
+            self.obs_counts = np.array(self.obs_counts)
+            if self.obs_frequencies is None:
+                self.obs_frequencies = self.obs_counts / self.total_observations
+
         assert len(self.vocabulary) == len(self.obs_frequencies)
 
         vocab_set = set(self.vocabulary)
@@ -68,18 +85,23 @@ class Vocabulary(Generic[VOCAB_ELEMENT]):
 
         vocab = copy.deepcopy(self.vocabulary)
         obs_frequencies = self.obs_frequencies
+        obs_counts = self.obs_counts
 
         if 'UNK' in vocab_set:
             unk_index = vocab.index('UNK')
             unk_freq = obs_frequencies[unk_index]
             obs_frequencies = np.delete(obs_frequencies, unk_index)
+            if obs_counts is not None:
+                unk_count = obs_counts[unk_index]
+                obs_counts = np.delete(obs_counts, unk_index)
             del vocab[unk_index]
-        else: unk_freq = 0
+        else: unk_freq, unk_count = 0, 0
 
         idx = np.argsort(-obs_frequencies)
 
         self.vocabulary = ['UNK'] + [vocab[i] for i in idx]
         self.obs_frequencies = np.concatenate(([unk_freq], obs_frequencies[idx]))
+        if obs_counts is not None: self.obs_counts = np.concatenate(([unk_count], obs_counts[idx]))
 
     def filter(self, total_observations: int, min_valid_element_freq: COUNT_OR_PROPORTION):
         """
@@ -109,8 +131,51 @@ class Vocabulary(Generic[VOCAB_ELEMENT]):
 
         self.vocabulary = self.vocabulary[:idx+1]
         self.obs_frequencies = self.obs_frequencies[:idx+1]
+        if self.obs_counts is not None:
+            self.obs_counts[0] += self.obs_counts[idx+1:].sum()
+            self.obs_counts = self.obs_counts[:idx+1]
+        if hasattr(self, 'idxmap'): delattr(self, 'idxmap')
+
+    def merge(self, other: Vocabulary) -> Vocabulary:
+        """
+        Merges `other` into this vocabulary in place, as if this vocabulary had also been built on the
+        observations of `other`. Both vocabularies must track raw counts.
+
+        Merging unfiltered vocabularies (e.g., built on separate shards of the data) yields exactly the counts
+        and frequencies of a single build over all observations, so `filter` retains the same elements.
+        Elements with tied frequencies may be ordered differently, however. Merging filtered vocabularies is
+        not exact, as the elements of each which were pushed into `'UNK'` can not be recovered.
+
+        Args:
+            `other` (`Vocabulary`): The vocabulary to merge into this one.
+
+        Returns: This vocabulary, for chaining.
+        """
+        assert (self.obs_counts is not None) and (other.obs_counts is not None), (
+            "Can only merge vocabularies which track raw counts!"
+        )
+
+        counts = dict(zip(self.vocabulary, self.obs_counts))
+        for v, c in zip(other.vocabulary, other.obs_counts): counts[v] = counts.get(v, 0) + c
+
+        self.vocabulary = list(counts.keys())
+        self.obs_counts = np.array(list(counts.values()))
+        self.total_observations += other.total_observations
+        self.obs_frequencies = self.obs_counts / self.total_observations
         if hasattr(self, 'idxmap'): delattr(self, 'idxmap')
 
+        self.__post_init__()
+        return self
+
+    @classmethod
+    def merged(cls, vocabs: Sequence[Vocabulary]) -> Vocabulary:
+        """Returns a new vocabulary merging all of `vocabs` (see `merge`)."""
+        assert len(vocabs) > 0, "Must pass at least one vocabulary!"
+
+        out = copy.deepcopy(vocabs[0])
+        for vocab in vocabs[1:]: out.merge(vocab)
+        return out
+
     @staticmethod
     def __nested_update_container(container: Union[set, Counter], val: NESTED_VOCAB_SEQUENCE):
         """
@@ -122,12 +187,71 @@ class Vocabulary(Generic[VOCAB_ELEMENT]):
             for v in val: Vocabulary.__nested_update_container(container, v)
         else: container.update([val])
 
+    @staticmethod
+    def _count_flat_observations(
+        observations: Union[pd.Series, np.ndarray]
+    ) -> Optional[Tuple[List[VOCAB_ELEMENT], np.ndarray]]:
+        """
+        Counts the elements of a (possibly nested) series or array of observations with vectorized operations.
+        Nested list-like entries are flattened via `explode` rather than recursion. Elements are returned in
+        order of first observation, exactly as `__nested_update_container` would insert them into a `Counter`,
+        so that the `__post_init__` sort orders ties identically.
+
+        Returns: The observed elements and their counts, or `None` if the observations contain null elements
+            other than float `NaN`s (which `__nested_update_container` would count, but `pd.factorize`
+            would drop), in which case the caller must fall back to the recursive path.
+        """
+        is_array = isinstance(observations, np.ndarray)
+        if is_array and observations.ndim != 1: return None
+
+        vals = pd.Series(observations, copy=False) if is_array else observations
+        if vals.dtype == object and pd.api.types.infer_dtype(vals, skipna=True).startswith('mixed'):
+            nested_types = (list, tuple, np.ndarray, pd.Series)
+            while any(isinstance(v, nested_types) for v in vals.values):
+                is_array = False
+                vals = vals.explode(ignore_index=True)
+
+        codes, uniques = pd.factorize(vals.values)
+        is_null = (codes == -1)
+        if is_null.any():
+            nan_types = (float, np.float32, np.float64)
+            if not all(isinstance(v, nan_types) for v in vals.values[is_null]): return None
+            codes = codes[~is_null]
+            first_idx = np.flatnonzero(~is_null)[np.unique(codes, return_index=True)[1]]
+        else:
+            first_idx = np.unique(codes, return_index=True)[1]
+
+        # We take the first observed instance of each element from the original values, rather than
+        # `uniques`, so that element types match those produced by iterating over the observations.
+        vocab = list(observations[first_idx]) if is_array else list(vals.iloc[first_idx])
+        return vocab, np.bincount(codes, minlength=len(uniques))
+
     @classmethod
-    def build_vocab(cls, observations: NESTED_VOCAB_SEQUENCE) -> 'Vocabulary':
-        """Builds a vocabulary from a set of observed elements."""
+    def count_observations(cls, observations: NESTED_VOCAB_SEQUENCE) -> Dict[VOCAB_ELEMENT, int]:
+        """
+        Counts the observed elements of a set of observations, in order of first observation. Flat or nested
+        pandas series, numpy arrays, and pyarrow arrays are counted via a vectorized fast path; other
+        sequences are walked recursively. Counts over consecutive chunks of observations can be summed (in
+        order) to recover the counts over all of them, elements and order included.
+        """
+        if hasattr(observations, 'to_pandas') and not isinstance(observations, (pd.Series, pd.DataFrame)):
+            observations = observations.to_pandas()
+
+        if isinstance(observations, (pd.Series, np.ndarray)):
+            counted = cls._count_flat_observations(observations)
+            if counted is not None:
+                vocab, counts = counted
+                return dict(zip(vocab, counts.tolist()))
+
         counter = Counter()
         cls.__nested_update_container(counter, observations)
+        return dict(counter)
 
-        vocab = list(counter.keys())
-        freq = [counter[k] / len(observations) for k in vocab]
-        return cls(vocabulary=vocab, obs_frequencies=freq)
+    @classmethod
+    def build_vocab(cls, observations: NESTED_VOCAB_SEQUENCE) -> 'Vocabulary':
+        """Builds a vocabulary from a set of observed elements. See `count_observations`."""
+        counts = cls.count_observations(observations)
+        return cls(
+            vocabulary=list(counts.keys()), obs_counts=list(counts.values()),
+            total_observations=len(observations)
+        )
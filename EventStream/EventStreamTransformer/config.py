@@ -3,9 +3,10 @@ import dataclasses, enum, math
 from pathlib import Path
 from transformers import PretrainedConfig
 
-from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
 
 from ..utils import StrEnum, JSONableMixin
+from ..EventStreamData.batch_sampler import LengthBucketedBatchSampler
 from ..EventStreamData.data_embedding_layer import StaticEmbeddingMode, MeasIndexGroupOptions
 from ..EventStreamData.event_stream_pytorch_dataset import EventStreamPytorchDataset
 from ..EventStreamData.types import DataModality, TemporalityType
@@ -26,7 +27,16 @@ class EventStreamOptimizationConfig(JSONableMixin):
         `max_epochs` (`int`, default is 100):
             The maximum number of training epochs.
         `batch_size` (`int`, default is 32):
-            The batch size used during stochastic gradient descent.
+            The batch size used during stochastic gradient descent. If `max_batch_data_elements` is set, this
+            is instead the maximum batch size.
+        `do_bucket_by_length` (`bool`, default is False):
+            Whether to batch items of similar sequence length and data element density together via a
+            `LengthBucketedBatchSampler`, to reduce padding.
+        `max_batch_data_elements` (`Optional[int]`, *optional*, default is None):
+            If set, batches are formed in token-budget mode: each batch holds as many items as fit within this
+            many padded data elements (`batch_size X seq_len X n_data`) plus, for the model's attention heads,
+            attention scores (`batch_size X n_heads X seq_len X seq_len`). This caps the peak memory of each
+            step rather than the number of items. Requires `do_bucket_by_length`.
         `lr_frac_warmup_steps` (`Optional[float]`, *optional*, default is 0.01):
             What fraction of the total training steps should be spent increasing the learning rate during the
             learning rate warmup period. Should not be set simultaneously with `lr_num_warmup_steps`. This is
@@ -51,16 +61,49 @@ class EventStreamOptimizationConfig(JSONableMixin):
     end_lr:                float = 1e-7
     max_epochs:            int   = 100
     batch_size:            int   = 32
+    do_bucket_by_length:   bool  = False
+    max_batch_data_elements: Optional[int] = None
     lr_frac_warmup_steps:  Optional[float] = 0.01
     lr_num_warmup_steps:   Optional[int]   = None
     max_training_steps:    Optional[int] = None
     lr_decay_power:        float = 1.0
     weight_decay:          float = 0.01
 
-    def set_to_dataset(self, dataset: EventStreamPytorchDataset):
-        """Sets missing parameters in the optimization config to appropriate values given `dataset`'s size."""
+    def __post_init__(self):
+        assert self.do_bucket_by_length or (self.max_batch_data_elements is None), (
+            "`max_batch_data_elements` requires `do_bucket_by_length`!"
+        )
+
+    def dataloader_kwargs(
+        self, dataset: EventStreamPytorchDataset, shuffle: bool, n_attention_heads: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Returns the batching keyword arguments for a `torch.utils.data.DataLoader` over `dataset` under this
+        config (either `batch_size` and `shuffle` or a `LengthBucketedBatchSampler` as `batch_sampler`). In
+        token-budget mode, `n_attention_heads` is the number of attention heads of the model being trained.
+        """
+        if not self.do_bucket_by_length: return {'batch_size': self.batch_size, 'shuffle': shuffle}
+
+        return {
+            'batch_sampler': LengthBucketedBatchSampler(
+                dataset, batch_size=self.batch_size, max_batch_data_elements=self.max_batch_data_elements,
+                n_attention_heads=n_attention_heads, shuffle=shuffle,
+            )
+        }
+
+    def set_to_dataset(self, dataset: EventStreamPytorchDataset, n_attention_heads: int = 0):
+        """
+        Sets missing parameters in the optimization config to appropriate values given `dataset`'s size. In
+        token-budget mode, `n_attention_heads` is as in `dataloader_kwargs`.
+        """
 
-        steps_per_epoch = int(math.ceil(len(dataset) / self.batch_size))
+        if self.max_batch_data_elements is None:
+            steps_per_epoch = int(math.ceil(len(dataset) / self.batch_size))
+        else:
+            # In token-budget mode, the number of batches per epoch varies slightly with the shuffled order,
+            # so we use a single sample as an estimate.
+            batch_sampler = self.dataloader_kwargs(dataset, True, n_attention_heads)['batch_sampler']
+            steps_per_epoch = len(batch_sampler)
 
         if self.max_training_steps is None:
             self.max_training_steps = steps_per_epoch * self.max_epochs
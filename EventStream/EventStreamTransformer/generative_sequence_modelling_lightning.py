@@ -152,6 +152,7 @@ class StructuredEventStreamForGenerativeSequenceModelingLightningModule(pl.Light
         skip_metrics: Sequence[str],
         prefix: str,
         measurement: str,
+        batch_size: int,
     ):
         """
         This helper function logs the set of named metrics for the predictions `preds` and labels `labels`.
@@ -169,6 +170,7 @@ class StructuredEventStreamForGenerativeSequenceModelingLightningModule(pl.Light
                 The prefix that should be used when logging metric results. Will likely be 'train', 'tuning',
                 or 'held_out', for example.
             `measurement` (`str`): The measurement of this metric calculation. Affects the log name.
+            `batch_size` (`int`): The number of items in the batch, used to weight epoch-level aggregation.
         """
         for metric_name, metric in metrics.items():
             # We'll want to skip a metric if any element of our skip_metrics list is a substring of the metric
@@ -178,8 +180,7 @@ class StructuredEventStreamForGenerativeSequenceModelingLightningModule(pl.Light
             try:
                 metric(preds, labels)
                 self.log(
-                    f"{prefix}_{measurement}_{metric_name}", metric,
-                    batch_size=self.optimization_config.batch_size
+                    f"{prefix}_{measurement}_{metric_name}", metric, batch_size=batch_size
                 )
             except (ValueError, IndexError) as e:
                 print(
@@ -208,9 +209,14 @@ class StructuredEventStreamForGenerativeSequenceModelingLightningModule(pl.Light
                 The prefix that should be used when logging metric results. Will likely be 'train', 'tuning',
                 or 'held_out', for example.
         """
+        # Batches may vary in size (e.g., under token-budget batching), so we log with the actual batch size
+        # rather than `self.optimization_config.batch_size`, so that epoch-level aggregates are weighted
+        # correctly.
+        batch_size = results['event_mask'].shape[0]
+
         # We'll commonly log metrics via the `self._log_metric_dict` helper, with some shared keyword
         # arguments.
-        log_metric_kwargs = {'skip_metrics': skip_metrics, 'prefix': prefix}
+        log_metric_kwargs = {'skip_metrics': skip_metrics, 'prefix': prefix, 'batch_size': batch_size}
 
         # Time-to-event
         # The output of the model for time-to-event (and for regression targets as well) are pytorch
@@ -307,20 +313,20 @@ class StructuredEventStreamForGenerativeSequenceModelingLightningModule(pl.Light
         # Now, all that is left is to log the losses as well.
         self.log_dict(
             {f"{prefix}_{k}_cls_NLL": v for k, v in results['losses']['classification'].items()},
-            batch_size=self.optimization_config.batch_size,
+            batch_size=batch_size,
         )
         self.log_dict(
             {f"{prefix}_{k}_reg_NLL": v for k, v in results['losses']['regression'].items()},
-            batch_size=self.optimization_config.batch_size,
+            batch_size=batch_size,
         )
         self.log(
             f"{prefix}_TTE_reg_NLL", results['losses']['time_to_event'],
-            batch_size=self.optimization_config.batch_size,
+            batch_size=batch_size,
         )
 
         self.log(
             f"{prefix}_loss", results['loss'],
-            batch_size=self.optimization_config.batch_size,
+            batch_size=batch_size,
         )
 
     def training_step(self, batch: EventStreamPytorchBatch, batch_idx: int) -> torch.Tensor:
@@ -430,7 +436,7 @@ def fit_generative_sequence_model(
     # Setting up configurations
     config.set_to_dataset(train_pyd)
 
-    optimization_config.set_to_dataset(train_pyd)
+    optimization_config.set_to_dataset(train_pyd, n_attention_heads=config.num_attention_heads)
 
     # We don't have 'do_overwrite' support in this class.
     config_fp = save_dir / 'config.json'
@@ -455,17 +461,19 @@ def fit_generative_sequence_model(
     # Setting up torch dataloader
     train_dataloader = torch.utils.data.DataLoader(
         train_pyd,
-        batch_size  = optimization_config.batch_size,
         num_workers = num_dataloader_workers,
         collate_fn  = train_pyd.collate,
-        shuffle     = True,
+        **optimization_config.dataloader_kwargs(
+            train_pyd, shuffle=True, n_attention_heads=config.num_attention_heads
+        ),
     )
     tuning_dataloader = torch.utils.data.DataLoader(
         tuning_pyd,
-        batch_size  = optimization_config.batch_size,
         num_workers = num_dataloader_workers,
         collate_fn  = tuning_pyd.collate,
-        shuffle     = False,
+        **optimization_config.dataloader_kwargs(
+            tuning_pyd, shuffle=False, n_attention_heads=config.num_attention_heads
+        ),
     )
 
     # Setting up model configurations
@@ -10,6 +10,7 @@ from .config import (
 )
 from .transformer import StructuredEventStreamTransformer, StructuredEventStreamTransformerPreTrainedModel
 from .utils import safe_masked_max, safe_weighted_avg
+from ..EventStreamData.batch_sampler import LengthBucketedBatchSampler
 from ..EventStreamData.event_stream_dataset import EventStreamDataset
 from ..EventStreamData.config import EventStreamPytorchDatasetConfig
 from ..EventStreamData.event_stream_pytorch_dataset import EventStreamPytorchDataset
@@ -93,9 +94,15 @@ def get_embeddings(
     data_config: Optional[EventStreamPytorchDatasetConfig] = None,
     do_overwrite: bool = False,
     get_embeddings_on_split: str = 'held_out',
+    do_bucket_by_length: bool = False,
+    max_batch_data_elements: Optional[int] = None,
 ):
     """
     Gets the embeddings for the model saved in `load_model_dir`.
+
+    If `do_bucket_by_length`, items are batched by similar length via a `LengthBucketedBatchSampler` (in
+    token-budget mode if `max_batch_data_elements` is set) and the embeddings are returned in `task_df` order
+    regardless.
     """
 
     assert load_model_dir.is_dir()
@@ -131,12 +138,21 @@ def get_embeddings(
     LM = StructuredEventStreamForEmbeddingLightningModule(config, pretrained_weights_fp)
 
     # Setting up torch dataloader
+    if do_bucket_by_length:
+        batch_sampler = LengthBucketedBatchSampler(
+            pyd, batch_size=batch_size, max_batch_data_elements=max_batch_data_elements,
+            n_attention_heads=config.num_attention_heads, shuffle=False, pool_size=len(pyd),
+        )
+        dataloader_kwargs = {'batch_sampler': batch_sampler}
+    else:
+        assert max_batch_data_elements is None, "`max_batch_data_elements` requires `do_bucket_by_length`!"
+        dataloader_kwargs = {'batch_size': batch_size, 'shuffle': False}
+
     dataloader = torch.utils.data.DataLoader(
         pyd,
-        batch_size  = batch_size,
         num_workers = num_dataloader_workers,
         collate_fn  = pyd.collate,
-        shuffle     = False,
+        **dataloader_kwargs,
     )
 
     checkpoints_dir = save_embeddings_dir / "model_checkpoints"
@@ -150,6 +166,10 @@ def get_embeddings(
 
     # Getting Embeddings model
     embeddings = torch.cat(trainer.predict(LM, dataloader), 0)
+    if do_bucket_by_length:
+        # Without shuffling, the sampler's batches are deterministic, so we can restore the original order.
+        order = torch.LongTensor([i for batch in batch_sampler for i in batch])
+        embeddings = embeddings[torch.argsort(order)]
 
     torch.save(embeddings, embeddings_fp)
 
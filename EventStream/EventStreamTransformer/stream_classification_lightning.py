@@ -136,6 +136,7 @@ class StructuredEventStreamForStreamClassificationLightningModule(pl.LightningMo
         metrics: Dict[str, torchmetrics.Metric],
         skip_metrics: Sequence[str],
         prefix: str,
+        batch_size: int,
     ):
         """
         This helper function logs the set of named metrics for the predictions `preds` and labels `labels`.
@@ -152,6 +153,7 @@ class StructuredEventStreamForStreamClassificationLightningModule(pl.LightningMo
             `prefix` (`str`):
                 The prefix that should be used when logging metric results. Will likely be 'train', 'tuning',
                 or 'held_out', for example.
+            `batch_size` (`int`): The number of items in the batch, used to weight epoch-level aggregation.
         """
         for metric_name, metric in metrics.items():
             # We'll want to skip a metric if any element of our skip_metrics list is a substring of the metric
@@ -160,7 +162,7 @@ class StructuredEventStreamForStreamClassificationLightningModule(pl.LightningMo
 
             try:
                 metric(preds, labels)
-                self.log(f"{prefix}_{metric_name}", metric)
+                self.log(f"{prefix}_{metric_name}", metric, batch_size=batch_size)
             except (ValueError, IndexError) as e:
                 print(
                     f"Failed to compute {metric_name} "
@@ -188,13 +190,15 @@ class StructuredEventStreamForStreamClassificationLightningModule(pl.LightningMo
                 The prefix that should be used when logging metric results. Will likely be 'train', 'tuning',
                 or 'held_out', for example.
         """
+        # Batches may vary in size (e.g., under token-budget batching), so we log with the actual batch size.
+        batch_size = results.labels.shape[0]
 
         self._log_metric_dict(
             preds=results.preds, labels=results.labels, metrics=self.metrics, skip_metrics=skip_metrics,
-            prefix=prefix
+            prefix=prefix, batch_size=batch_size
         )
 
-        self.log(f"{prefix}_loss", results.loss)
+        self.log(f"{prefix}_loss", results.loss, batch_size=batch_size)
 
     def training_step(self, batch, batch_idx):
         """Training step. Skips logging all AUROC, AUPRC, and per_class metric to save compute."""
@@ -303,7 +307,7 @@ def fit_stream_classification_model(
     # Setting up configurations
     config.set_to_dataset(train_pyd)
 
-    optimization_config.set_to_dataset(train_pyd)
+    optimization_config.set_to_dataset(train_pyd, n_attention_heads=config.num_attention_heads)
 
     config.to_json_file(save_dir / "config.json")
     optimization_config.to_json_file(save_dir / "optimization_config.json", do_overwrite=do_overwrite)
@@ -325,17 +329,19 @@ def fit_stream_classification_model(
     # Setting up torch dataloader
     train_dataloader = torch.utils.data.DataLoader(
         train_pyd,
-        batch_size  = optimization_config.batch_size,
         num_workers = num_dataloader_workers,
         collate_fn  = train_pyd.collate,
-        shuffle     = True,
+        **optimization_config.dataloader_kwargs(
+            train_pyd, shuffle=True, n_attention_heads=config.num_attention_heads
+        ),
     )
     tuning_dataloader = torch.utils.data.DataLoader(
         tuning_pyd,
-        batch_size  = optimization_config.batch_size,
         num_workers = num_dataloader_workers,
         collate_fn  = tuning_pyd.collate,
-        shuffle     = False,
+        **optimization_config.dataloader_kwargs(
+            tuning_pyd, shuffle=False, n_attention_heads=config.num_attention_heads
+        ),
     )
 
     # Setting up model configurations
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import numpy as np
+
+from scipy import stats
+from typing import Iterable
+
+# Mirrors the threshold `sklearn.preprocessing.QuantileTransformer` uses to identify values at the bounds of
+# its quantiles.
+BOUNDS_THRESHOLD = 1e-7
+
+class StreamingQuantileNormalizer():
+    """
+    A quantile normalizer whose quantiles are estimated by a mergeable streaming quantile sketch (a merging
+    t-digest), rather than from a dense copy of all training values. It exposes the same `fit`/`transform`
+    interface as `sklearn.preprocessing.QuantileTransformer`, and transforms values identically given its
+    estimated quantiles.
+
+    The sketch summarizes the data as weighted centroids, which are small near the tails of the distribution
+    (where quantiles must be resolved finely) and large near its median. Data can be added incrementally, via
+    `partial_fit`, and sketches fit separately (e.g., over different shards or in different workers) can be
+    combined via `merge`, so the full data never need to be in memory at once. `fit` itself processes its
+    input in chunks of `chunk_size` values.
+
+    Args:
+        `compression` (`int`, *optional*, defaults to `500`):
+            The compression parameter of the t-digest. The sketch holds at most roughly `compression / 2`
+            centroids; larger values yield more accurate quantiles.
+        `output_distribution` (`str`, *optional*, defaults to `'uniform'`):
+            The marginal distribution of the transformed data; either `'uniform'` or `'normal'`.
+        `chunk_size` (`int`, *optional*, defaults to `1000000`):
+            The number of values added to the sketch at a time.
+    """
+
+    @staticmethod
+    def validate_and_squeeze(vals: np.ndarray) -> np.ndarray:
+        """Checks that `vals` is in the expected sklearn shape but is actually 1D, then squeezes it down."""
+        assert len(vals.shape) == 2
+        assert len(vals.squeeze(-1).shape) == 1
+        return vals.squeeze(-1)
+
+    def __init__(
+        self, compression: int = 500, output_distribution: str = 'uniform', chunk_size: int = 1000000
+    ):
+        assert compression >= 2, f"compression must be at least 2; got {compression}!"
+        assert output_distribution in ('uniform', 'normal'), (
+            f"output_distribution must be 'uniform' or 'normal'; got {output_distribution}!"
+        )
+        assert chunk_size >= 1, f"chunk_size must be positive; got {chunk_size}!"
+
+        self.compression = compression
+        self.output_distribution = output_distribution
+        self.chunk_size = chunk_size
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({', '.join(f'{k}={v}' for k, v in vars(self).items())})"
+
+    def _reset(self):
+        """Clears the sketch."""
+        self.means_ = np.zeros(0)
+        self.weights_ = np.zeros(0)
+        self.min_ = np.inf
+        self.max_ = -np.inf
+
+    def _k_scale(self, q: np.ndarray) -> np.ndarray:
+        """The t-digest `k_1` scale function, which is steepest (i.e., has smallest centroids) at the tails."""
+        return self.compression / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0, 1) - 1)
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray):
+        """
+        Merges the centroids `means` and `weights` into a new sketch. Each (sorted) centroid is assigned to
+        the unit interval of the scale function containing its mid-point quantile, and centroids sharing an
+        interval are merged, so every merged centroid spans a bounded range of the scale function.
+        """
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+
+        cum_weights = np.cumsum(weights)
+        mid_qs = (cum_weights - weights / 2) / cum_weights[-1]
+        buckets = np.floor(self._k_scale(mid_qs)).astype(np.int64)
+
+        bucket_starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+        bucket_weights = np.add.reduceat(weights, bucket_starts)
+
+        self.means_ = np.add.reduceat(means * weights, bucket_starts) / bucket_weights
+        self.weights_ = bucket_weights
+        self._set_quantile_table()
+
+    def _set_quantile_table(self):
+        """
+        Sets `quantiles_` and `references_`, which (as for `QuantileTransformer`) map input values to their
+        estimated quantiles by linear interpolation. Each centroid sits at the quantile of its mid-point, and
+        the observed minimum and maximum at the quantiles `0` and `1`.
+        """
+        cum_weights = np.cumsum(self.weights_)
+        mid_qs = (cum_weights - self.weights_ / 2) / cum_weights[-1]
+
+        self.quantiles_ = np.concatenate(([self.min_], self.means_, [self.max_]))[:, np.newaxis]
+        self.references_ = np.concatenate(([0.], mid_qs, [1.]))
+
+        # Centroid means are exact only up to floating point error, so we ensure they lie within the bounds.
+        np.clip(self.quantiles_, self.min_, self.max_, out=self.quantiles_)
+
+    @property
+    def count_(self) -> float:
+        """The number of values summarized by the sketch."""
+        return float(self.weights_.sum())
+
+    def partial_fit(self, X: np.ndarray) -> StreamingQuantileNormalizer:
+        """Adds the (non-null) values in `X` (in sklearn shape) to the sketch, in chunks of `chunk_size`."""
+        if not hasattr(self, 'means_'): self._reset()
+
+        X = self.validate_and_squeeze(X)
+        X = X[~np.isnan(X)].astype(float)
+
+        for st in range(0, len(X), self.chunk_size):
+            chunk = X[st:st+self.chunk_size]
+            self.min_ = min(self.min_, chunk.min())
+            self.max_ = max(self.max_, chunk.max())
+            self._compress(
+                np.concatenate((self.means_, chunk)), np.concatenate((self.weights_, np.ones(len(chunk))))
+            )
+
+        return self
+
+    def fit(self, X: np.ndarray) -> StreamingQuantileNormalizer:
+        """Fits the sketch from scratch on the values in `X` (in sklearn shape)."""
+        self._reset()
+        return self.partial_fit(X)
+
+    def merge(self, other: StreamingQuantileNormalizer) -> StreamingQuantileNormalizer:
+        """Merges the sketch of `other` into this one, as if this one had also been fit on its data."""
+        if not hasattr(self, 'means_'): self._reset()
+        if not hasattr(other, 'means_') or len(other.weights_) == 0: return self
+
+        self.min_ = min(self.min_, other.min_)
+        self.max_ = max(self.max_, other.max_)
+        self._compress(
+            np.concatenate((self.means_, other.means_)), np.concatenate((self.weights_, other.weights_))
+        )
+        return self
+
+    @classmethod
+    def merged(cls, sketches: Iterable[StreamingQuantileNormalizer]) -> StreamingQuantileNormalizer:
+        """Returns a new normalizer merging all of `sketches`, which must share their parameters."""
+        sketches = list(sketches)
+        assert sketches, "Must pass at least one sketch!"
+
+        out = cls(
+            compression=sketches[0].compression, output_distribution=sketches[0].output_distribution,
+            chunk_size=sketches[0].chunk_size,
+        )
+        for sketch in sketches: out.merge(sketch)
+        return out
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """
+        Maps the values in `X` (in sklearn shape) to their estimated quantiles, or to the corresponding
+        quantiles of the standard normal distribution, exactly as `QuantileTransformer.transform` does.
+        """
+        X = np.array(X, dtype=float)
+        X_col = self.validate_and_squeeze(X)
+        quantiles = self.quantiles_[:, 0]
+
+        with np.errstate(invalid='ignore'):
+            if self.output_distribution == 'normal':
+                lower_bounds_idx = X_col - BOUNDS_THRESHOLD < quantiles[0]
+                upper_bounds_idx = X_col + BOUNDS_THRESHOLD > quantiles[-1]
+            else:
+                lower_bounds_idx = X_col == quantiles[0]
+                upper_bounds_idx = X_col == quantiles[-1]
+
+        # As in `QuantileTransformer`, we average the interpolations in both directions to handle repeated
+        # quantiles.
+        isfinite_mask = ~np.isnan(X_col)
+        X_col_finite = X_col[isfinite_mask]
+        X_col[isfinite_mask] = 0.5 * (
+            np.interp(X_col_finite, quantiles, self.references_)
+            - np.interp(-X_col_finite, -quantiles[::-1], -self.references_[::-1])
+        )
+
+        X_col[upper_bounds_idx] = 1
+        X_col[lower_bounds_idx] = 0
+
+        if self.output_distribution == 'normal':
+            with np.errstate(invalid='ignore'):
+                clip_min = stats.norm.ppf(BOUNDS_THRESHOLD - np.spacing(1))
+                clip_max = stats.norm.ppf(1 - (BOUNDS_THRESHOLD - np.spacing(1)))
+                X_col = np.clip(stats.norm.ppf(X_col), clip_min, clip_max)
+
+        return X_col[:, np.newaxis]
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
-import dataclasses, enum, functools, numpy as np
+import bisect, dataclasses, functools, numpy as np
 
-from typing import Callable, Union
-from ..utils import StrEnum, PROPORTION
+from typing import Callable, Optional, Union
+from ..utils import PROPORTION
 
 @dataclasses.dataclass(frozen=True)
 class DataStats():
@@ -41,11 +41,6 @@ class DataStats():
         """Returns a stats object describing the array `X`"""
         return cls(N=len(X), sum_X=X.sum(), sum_X2=(X**2).sum())
 
-class ExtremeValSide(StrEnum):
-    """A simple enum to track which side is being examined; the minimum or maximum."""
-    MIN = enum.auto()
-    MAX = enum.auto()
-
 # This is a default that has proven to work reasonably well in practice, and is stored as a top level function
 # so the module can be easily pickled.
 def _default_std_delta_thresh(N: int) -> float: return 10*(1/N**0.6)
@@ -154,10 +149,8 @@ class VarianceImpactOutlierDetector():
         if abs(delta - 1) >= np.sqrt((N+1)/N): return float('inf')
         return (N+1) * np.sqrt(1/(N * (1 - delta)**2) - 1/(N+1))
 
-    def get_starting_bounds(self, X):
-        """Determines the input bounds for the dataset `X`."""
-        X = self.validate_and_squeeze(X)
-
+    def _set_starting_bounds(self, X: np.ndarray) -> DataStats:
+        """Sets the input bounds for the (squeezed) dataset `X` and returns its statistics."""
         curr_stats = DataStats.from_array(X)
 
         max_dev = self._max_deviation_factor(curr_stats.N)
@@ -165,55 +158,89 @@ class VarianceImpactOutlierDetector():
         self.thresh_large_ = curr_stats.mean + curr_stats.std * max_dev
         self.thresh_small_ = curr_stats.mean - curr_stats.std * max_dev
 
+        return curr_stats
+
+    def get_starting_bounds(self, X):
+        """Determines the input bounds for the dataset `X`."""
+        X = self.validate_and_squeeze(X)
+        curr_stats = self._set_starting_bounds(X)
         return np.sort(X), curr_stats
 
     @staticmethod
-    def _std_delta_for_side(
-        X: np.ndarray, side: ExtremeValSide, max_L: int, curr_stats: DataStats
-    ):
-        """Determines the standard deviation for the removing the most extreme value on the specified size"""
-        found_endpoint = False
-        is_min = side == ExtremeValSide.MIN
+    def _std(N: int, sum_X: float, sum_X2: float) -> float:
+        """Returns the standard deviation of running statistics, with the same arithmetic as `DataStats`."""
+        mean = sum_X/N
+        # Python floats, unlike numpy floats, raise on overflow in `**` and have complex rather than `nan` roots
+        # of negative numbers.
+        var = sum_X2/N - mean*mean
+        return var**0.5 if not var < 0 else float('nan')
 
-        # If there are too many values that sit in this extreme, we don't want to remove them.
-        for L in range(1, max_L):
-            if (is_min  and X[L] != X[L-1]) or (X[-L] != X[-L-1]):
-                found_endpoint = True
-                break
+    @staticmethod
+    def _std_delta(std: float, new_std: float) -> float:
+        """
+        Returns the relative change `abs(std - new_std)/std` with numpy's semantics for a zero `std`, which
+        Python floats would instead raise on: `nan` if the change is zero (or `nan`) and `inf` otherwise.
+        """
+        delta = abs(std - new_std)
+        if std != 0: return delta/std
+        return float('inf') if delta > 0 else float('nan')
 
-        if not found_endpoint: return 0, 0, curr_stats
+    def _fit_sorted(self, X: np.ndarray, curr_stats: DataStats):
+        """
+        Finds the thresholds that minimize standard deviation impacts on the sorted training set `X`, whose
+        statistics are `curr_stats`.
+
+        At each step, the most extreme value on each side is considered for removal alongside all of its tied
+        copies, and the side whose removal changes the standard deviation most is removed if that change
+        exceeds the threshold. The remaining data always form a contiguous window `X[lo:hi]` of the sorted
+        array, so the tied run at either end of the window is found via a binary search rather than a linear
+        scan, and the running statistics are plain scalars rather than new `DataStats` objects. The statistics
+        follow the same arithmetic as `DataStats.remove`, so thresholds are identical to those of the original
+        iterative peeling procedure.
+        """
+        # Python scalars make each step much cheaper than numpy scalars would, with identical arithmetic.
+        X = X.tolist()
+        lo, hi = 0, len(X)
+        N, sum_X, sum_X2 = curr_stats.N, float(curr_stats.sum_X), float(curr_stats.sum_X2)
+        std = self._std(N, sum_X, sum_X2)
 
-        extreme_val = X[L-1] if is_min else X[-L]
-        new_stats = curr_stats.remove(extreme_val, copies_to_remove=L)
+        while N > 1:
+            max_L = self._max_L(N)
 
-        std_delta = abs(curr_stats.std - new_stats.std)/curr_stats.std
+            # The number of tied copies of the window's maximum. Note that, as in the original procedure, the
+            # minimum side also stops at this point if its own run of tied copies is longer.
+            L_max = 1 if X[hi-1] != X[hi-2] else hi - bisect.bisect_left(X, X[hi-1], lo, hi)
+            L_min = min(1 if X[lo] != X[lo+1] else bisect.bisect_right(X, X[lo], lo, hi) - lo, L_max)
 
-        return std_delta, extreme_val, new_stats
+            candidates = []
+            for L, extreme_val in ((L_min, X[lo + L_min - 1]), (L_max, X[hi - L_max])):
+                # If there are too many values that sit in this extreme, we don't want to remove them.
+                if L >= max_L:
+                    candidates.append((0, extreme_val, None))
+                    continue
 
-    def fit(self, X):
-        """Finds the thresholds that minimize standard deviation impacts on the training set."""
-        X, curr_stats = self.get_starting_bounds(X)
+                new_stats = (N - L, sum_X - extreme_val * L, sum_X2 - (extreme_val*extreme_val) * L)
+                candidates.append((self._std_delta(std, self._std(*new_stats)), extreme_val, new_stats))
 
-        while curr_stats.N > 1:
-            any_removed = False
-            max_L = self._max_L(curr_stats.N)
+            min_more_extreme = candidates[0][0] > candidates[1][0]
+            std_delta, extreme_val, new_stats = candidates[0] if min_more_extreme else candidates[1]
 
-            min_side = self._std_delta_for_side(X, ExtremeValSide.MIN, max_L, curr_stats)
-            max_side = self._std_delta_for_side(X, ExtremeValSide.MAX, max_L, curr_stats)
+            if (new_stats is None) or not (std_delta > self._max_std_delta_thresh(N)): break
 
-            min_more_extreme = min_side[0] > max_side[0]
+            if min_more_extreme:
+                self.thresh_small_ = extreme_val
+                lo = hi - new_stats[0]
+            else:
+                self.thresh_large_ = extreme_val
+                hi = lo + new_stats[0]
 
-            std_delta, extreme_val, new_stats = (min_side if min_more_extreme else max_side)
+            N, sum_X, sum_X2 = new_stats
+            std = self._std(N, sum_X, sum_X2)
 
-            if std_delta > self._max_std_delta_thresh(curr_stats.N):
-                if min_more_extreme:
-                    self.thresh_small_ = extreme_val
-                    X = X[-new_stats.N:]
-                else:
-                    self.thresh_large_ = extreme_val
-                    X = X[:new_stats.N]
-                curr_stats = new_stats
-            else: break
+    def fit(self, X):
+        """Finds the thresholds that minimize standard deviation impacts on the training set."""
+        X, curr_stats = self.get_starting_bounds(X)
+        self._fit_sorted(X, curr_stats)
 
     def predict(self, X):
         """Identifies inliers as points within the bounds and outliers otherwise."""
@@ -0,0 +1,82 @@
+"""
+Benchmarks `EventStreamDataset.drop_oob_and_censor_outliers` against the prior row-wise path (joining the
+bounds onto every value then calling `EventStreamDataset.drop_or_censor` per row) on synthetic key/value data.
+
+Usage:
+    python benchmarks/benchmark_drop_or_censor.py --n_values 1000000 --n_keys 2000
+"""
+
+import argparse, sys, time, numpy as np, pandas as pd
+
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from EventStream.EventStreamData.event_stream_dataset import EventStreamDataset
+
+def synthetic_data(n_values: int, n_keys: int, seed: int = 1):
+    """Returns synthetic lab-like values keyed by measurement, and per-key bounds (some missing)."""
+    rng = np.random.default_rng(seed)
+    keys = np.array([f"lab_{i}" for i in range(n_keys)])
+
+    def with_nulls(x: np.ndarray, frac: float = 0.3) -> np.ndarray:
+        x = x.astype(object)
+        x[rng.random(len(x)) < frac] = None
+        return x
+
+    measurement_metadata = pd.DataFrame({
+        'drop_lower_bound': with_nulls(rng.normal(-3, 0.5, n_keys)),
+        'drop_lower_bound_inclusive': with_nulls(rng.random(n_keys) < 0.5),
+        'drop_upper_bound': with_nulls(rng.normal(3, 0.5, n_keys)),
+        'drop_upper_bound_inclusive': with_nulls(rng.random(n_keys) < 0.5),
+        'censor_lower_bound': with_nulls(rng.normal(-2, 0.5, n_keys)),
+        'censor_upper_bound': with_nulls(rng.normal(2, 0.5, n_keys)),
+    }, index=pd.Index(keys, name='lab'))
+
+    # Measurement frequencies are heavily skewed in practice, so we sample keys from a Zipf-like distribution.
+    key_p = 1 / np.arange(1, n_keys + 1)
+    vals = pd.Series(
+        rng.normal(0, 1.5, n_values), index=pd.Index(rng.choice(keys, n_values, p=key_p / key_p.sum())),
+        name='value'
+    )
+    return vals, measurement_metadata
+
+def rowwise_drop_oob_and_censor_outliers(vals: pd.Series, measurement_metadata: pd.DataFrame) -> pd.Series:
+    """The prior implementation of `EventStreamDataset.drop_oob_and_censor_outliers`."""
+    cols = [c for c in EventStreamDataset.DROP_OR_CENSOR_COLS if c in measurement_metadata.columns]
+    vals_df = pd.DataFrame({'vals': vals.values, 'key_col': vals.index})
+    processed_vals = vals_df.join(measurement_metadata[cols], on='key_col', how='left').apply(
+        lambda r: EventStreamDataset.drop_or_censor(r['vals'], r), axis='columns'
+    )
+    return pd.Series(processed_vals.values, index=vals.index, name=vals.name)
+
+def timeit(fn, *args, n_repeats: int = 1) -> float:
+    times = []
+    for _ in range(n_repeats):
+        st = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - st)
+    return min(times)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--n_values', type=int, default=200000)
+    parser.add_argument('--n_keys', type=int, default=2000)
+    parser.add_argument('--n_repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    vals, measurement_metadata = synthetic_data(args.n_values, args.n_keys)
+
+    want = rowwise_drop_oob_and_censor_outliers(vals, measurement_metadata)
+    got = EventStreamDataset.drop_oob_and_censor_outliers(vals, measurement_metadata)
+    pd.testing.assert_series_equal(want, got, check_dtype=False)
+
+    rowwise_time = timeit(rowwise_drop_oob_and_censor_outliers, vals, measurement_metadata)
+    vectorized_time = timeit(
+        EventStreamDataset.drop_oob_and_censor_outliers, vals, measurement_metadata, n_repeats=args.n_repeats
+    )
+
+    print(f"{args.n_values} values over {args.n_keys} keys (outputs match):")
+    print(f"  row-wise:   {rowwise_time:.3f}s")
+    print(f"  vectorized: {vectorized_time:.3f}s ({rowwise_time / vectorized_time:.0f}x faster)")
@@ -0,0 +1,130 @@
+import sys
+sys.path.append('../..')
+
+import torch, unittest, numpy as np, pandas as pd
+
+from ..mixins import MLTypeEqualityCheckableMixin
+from EventStream.EventStreamData.batch_sampler import LengthBucketedBatchSampler
+from EventStream.EventStreamData.config import EventStreamDatasetConfig, EventStreamPytorchDatasetConfig
+from EventStream.EventStreamData.event_stream_dataset import EventStreamDataset
+from EventStream.EventStreamData.event_stream_pytorch_dataset import EventStreamPytorchDataset
+from EventStream.EventStreamData.time_dependent_functor import TimeOfDayFunctor
+
+class TestLengthBucketedBatchSampler(MLTypeEqualityCheckableMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(1)
+
+        subject_ids, timestamps, keys, vals = [], [], [], []
+        for subject_id in range(40):
+            n_events = int(rng.integers(2, 12))
+            for j in range(n_events):
+                n_data = int(rng.integers(1, 6))
+                subject_ids.append(subject_id)
+                timestamps.append(pd.Timestamp('2022-12-01') + pd.Timedelta(hours=j))
+                keys.append(list(rng.choice(['a', 'b', 'c'], size=n_data)))
+                vals.append(list(rng.random(n_data)))
+
+        events_df = pd.DataFrame({
+            'subject_id': subject_ids, 'timestamp': timestamps, 'event_type': 'A', 'key': keys, 'val': vals,
+        })
+        config = EventStreamDatasetConfig.from_simple_args(
+            dynamic_measurement_columns=[('key', 'val')],
+            time_dependent_measurement_columns=[('time_of_day', TimeOfDayFunctor())],
+        )
+        E = EventStreamDataset(events_df=events_df, config=config, metadata_list_cols=['key', 'val'])
+        E.split_subjects = {'train': set(range(40))}
+        E.preprocess_metadata()
+
+        data_config = EventStreamPytorchDatasetConfig(do_normalize_log_inter_event_times=False, max_seq_len=8)
+        self.pyd = EventStreamPytorchDataset(E, data_config, split='train')
+
+    def test_item_sizes(self):
+        want_seq_lens, want_n_data = [], []
+        for i in range(len(self.pyd)):
+            item = self.pyd._seeded_getitem_from_range(subject_id=self.pyd.subject_ids[i], seed=1)
+            want_seq_lens.append(len(item['time']))
+            n_data = [len(v) for v in self.pyd._event_data_elements(
+                *self.pyd.data.subject_events_and_metadata(self.pyd.subject_ids[i])
+            )[0]]
+            want_n_data.append(max(n_data))
+
+        seq_lens, n_data = self.pyd.item_sizes()
+        self.assertEqual(want_seq_lens, list(seq_lens))
+        self.assertEqual(want_n_data, list(n_data))
+
+        self.pyd.compile()
+        seq_lens, n_data = self.pyd.item_sizes()
+        self.assertEqual(want_seq_lens, list(seq_lens))
+        self.assertEqual(want_n_data, list(n_data))
+
+    def test_fixed_batch_size(self):
+        sampler = LengthBucketedBatchSampler(self.pyd, batch_size=8, pool_size=20)
+        self.assertEqual(24, sampler.pool_size)
+
+        batches = list(sampler)
+        self.assertEqual(5, len(batches))
+        self.assertEqual(list(range(40)), sorted(i for b in batches for i in b))
+        self.assertEqual([8, 8, 8, 8, 8], [len(b) for b in batches])
+
+        # Batches within each pool should be sorted by length.
+        seq_lens, _ = self.pyd.item_sizes()
+        for b in batches: self.assertEqual(sorted(seq_lens[b]), list(seq_lens[b]))
+
+    def test_token_budget(self):
+        seq_lens, n_data = self.pyd.item_sizes()
+        budget = int(seq_lens.max() * n_data.max() * 3)
+
+        sampler = LengthBucketedBatchSampler(self.pyd, max_batch_data_elements=budget)
+        self.assertEqual(len(sampler), len(list(sampler)))
+
+        batches = list(sampler)
+        self.assertEqual(list(range(40)), sorted(i for b in batches for i in b))
+        for b in batches:
+            self.assertLessEqual(len(b) * seq_lens[b].max() * n_data[b].max(), budget)
+
+            batch = self.pyd.collate([self.pyd[i] for i in b])
+            self.assertLessEqual(batch.dynamic_indices.numel(), budget)
+
+        sampler = LengthBucketedBatchSampler(self.pyd, batch_size=2, max_batch_data_elements=budget)
+        self.assertTrue(all(len(b) <= 2 for b in sampler))
+
+    def test_token_budget_with_attention(self):
+        seq_lens, n_data = self.pyd.item_sizes()
+        budget = int(seq_lens.max() * (n_data.max() + 4 * seq_lens.max()) * 3)
+
+        sampler = LengthBucketedBatchSampler(self.pyd, max_batch_data_elements=budget, n_attention_heads=4)
+        self.assertEqual(
+            2 * 3 * (5 + 4 * 3), sampler.batch_footprint(batch_size=2, seq_len=3, n_data=5)
+        )
+
+        batches = list(sampler)
+        self.assertEqual(list(range(40)), sorted(i for b in batches for i in b))
+        for b in batches:
+            self.assertLessEqual(sampler.batch_footprint(len(b), seq_lens[b].max(), n_data[b].max()), budget)
+
+        # Accounting for attention should only ever produce more (smaller) batches.
+        no_attention_sampler = LengthBucketedBatchSampler(
+            self.pyd, max_batch_data_elements=budget, shuffle=False
+        )
+        attention_sampler = LengthBucketedBatchSampler(
+            self.pyd, max_batch_data_elements=budget, n_attention_heads=4, shuffle=False
+        )
+        self.assertGreater(len(attention_sampler), len(no_attention_sampler))
+
+    def test_shuffling(self):
+        sampler = LengthBucketedBatchSampler(self.pyd, batch_size=4, shuffle=False)
+        self.assertEqual(list(sampler), list(sampler))
+
+        sampler = LengthBucketedBatchSampler(
+            self.pyd, batch_size=4, pool_size=8, generator=torch.Generator().manual_seed(1)
+        )
+        epoch_1, epoch_2 = list(sampler), list(sampler)
+        self.assertNotEqual(epoch_1, epoch_2)
+
+        sampler = LengthBucketedBatchSampler(
+            self.pyd, batch_size=4, pool_size=8, generator=torch.Generator().manual_seed(1)
+        )
+        self.assertEqual(epoch_1, list(sampler))
+
+if __name__ == '__main__': unittest.main()
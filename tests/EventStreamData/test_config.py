@@ -388,6 +388,10 @@ class TestEventStreamDatasetConfig(ConfigComparisonsMixin, unittest.TestCase):
             max_numerical_value_frequency = None,
             outlier_detector_config = None,
             normalizer_config = None,
+            num_numerical_fit_workers = 1,
+            num_numerical_transform_workers = 1,
+            numerical_transform_chunk_size = 1000000,
+            do_encode_categorical_metadata = False,
         )
         nontrivial_measurement_configs = {
             'col_A': MeasurementConfig(
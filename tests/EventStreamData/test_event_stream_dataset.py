@@ -5,8 +5,9 @@ from .test_config import ConfigComparisonsMixin
 
 import copy, unittest, numpy as np, pandas as pd
 from pathlib import Path
+from sklearn.preprocessing import QuantileTransformer
 from tempfile import TemporaryDirectory
-from typing import Any
+from typing import Any, Set
 
 from EventStream.EventStreamData.config import EventStreamDatasetConfig, MeasurementConfig
 from EventStream.EventStreamData.event_stream_dataset import EventStreamDataset
@@ -20,6 +21,9 @@ from EventStream.EventStreamData.time_dependent_functor import (
     TimeOfDayFunctor,
 )
 from EventStream.EventStreamData.vocabulary import Vocabulary
+from EventStream.VarianceImpactOutlierDetector.variance_impact_outlier_detector import (
+    VarianceImpactOutlierDetector
+)
 
 class DummySklearn():
     """This is used to make fake model classes for testing outlier detection and such."""
@@ -104,6 +108,51 @@ class TestEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
         self.assertEqual(want_events_df, got_events_df)
         self.assertEqual(want_metadata_df, got_metadata_df)
 
+    def test_build_events_and_metadata(self):
+        df_A = pd.DataFrame({
+            'alt_subject_col': [1, 2],
+            'alt_time_col': ['12/1/22', '12/2/22'],
+            'metadata_col_1': ['foo', 'bar'],
+        })
+        df_B_chunks = (
+            pd.DataFrame({
+                'subj': [3, 1][i:i+1],
+                'time': ['12/3/22', '12/4/22'][i:i+1],
+                'metadata_col_1': ['baz', 'biz'][i:i+1],
+                'metadata_col_2': [1.0, 2.0][i:i+1],
+                'unused_col': ['x', 'y'][i:i+1],
+            }, index=[i]) for i in range(2)
+        )
+
+        want_events_df = pd.DataFrame({
+            'subject_id': [1, 2, 3, 1],
+            'timestamp': ['12/1/22', '12/2/22', '12/3/22', '12/4/22'],
+            'event_type': ['A', 'A', 'B', 'B'],
+        }, index = pd.Index([0, 1, 2, 3], name='event_id'))
+        want_metadata_df = pd.DataFrame({
+            'event_id': [0, 1, 2, 3],
+            'event_type': ['A', 'A', 'B', 'B'],
+            'subject_id': [1, 2, 3, 1],
+            'metadata_col_1': ['foo', 'bar', 'baz', 'biz'],
+            'metadata_col_2': [np.NaN, np.NaN, 1.0, 2.0],
+        }, index = pd.Index([0, 1, 2, 3], name='metadata_id'))
+
+        got_events_df, got_metadata_df = EventStreamDataset.build_events_and_metadata([
+            {
+                'df': df_A, 'event_type': 'A', 'subject_col': 'alt_subject_col',
+                'time_col': 'alt_time_col', 'metadata_cols': ['metadata_col_1'],
+            }, {
+                'df': df_B_chunks, 'event_type': 'B', 'subject_col': 'subj',
+                'time_col': 'time', 'metadata_cols': ['metadata_col_1', 'metadata_col_2'],
+            },
+        ])
+
+        self.assertEqual(want_events_df, got_events_df)
+        self.assertEqual(want_metadata_df, got_metadata_df)
+
+        with self.assertRaises(ValueError):
+            EventStreamDataset.build_events_and_metadata([])
+
     def test_infer_bounds_from_units_inplace(self):
         input_measurement_metadata = pd.DataFrame({
             'unit': ['%', 'foo', None, 'percent', 'PERCENT'],
@@ -159,12 +208,22 @@ class TestEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
                     pd.Series([None, None, None, None, None, None], index=series_index),
                     pd.Series([np.NaN, np.NaN, 10, True, np.NaN, 4], index=series_index),
                     pd.Series([-10, True, None, None, -3, None], index=series_index),
+
+                    # Inclusivity flags are interpreted by their truthiness, so `np.NaN` flags are inclusive
+                    # but `None` flags are not. These rows are dicts, as a numeric series would cast `None` to
+                    # `np.NaN`.
+                    pd.Series([0, np.NaN, 10, np.NaN, None, None], index=series_index),
+                    pd.Series([0, np.NaN, 10, np.NaN, None, None], index=series_index),
+                    dict(zip(series_index, [0, None, 10, None, None, None])),
+                    dict(zip(series_index, [0, None, 10, None, None, None])),
                 ], 'input_vals': [
                     -1, 0, 0, 0, 1, 1.5, 2, 10, 10, 11,
                     -1, -1, -1,
+                    0, 10, 0, 10,
                 ], 'want': [
                     np.NaN, np.NaN, np.NaN, 1, 1, 1.5, 2, 2, np.NaN, np.NaN,
                     -1, -1, -1,
+                    np.NaN, np.NaN, 0, 10,
                 ],
             },
         ]
@@ -173,11 +232,44 @@ class TestEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
             for i, (row, val, want) in enumerate(zip(C['input_rows'], C['input_vals'], C['want'])):
                 with self.subTest(f"{C['msg']} ({i})"):
                     got = EventStreamDataset.drop_or_censor(val, row)
+                    got_series = EventStreamDataset.drop_or_censor_series(pd.Series([val], name='v'), row)
+                    self.assertEqual(pd.Series([want], name='v', dtype=float), got_series)
                     if np.isnan(want): self.assertTrue(np.isnan(got))
                     else:
                         self.assertFalse(np.isnan(got))
                         self.assertEqual(want, got)
 
+    def test_drop_oob_and_censor_outliers_matches_drop_or_censor(self):
+        rng = np.random.default_rng(1)
+        keys = [f"key_{i}" for i in range(20)]
+
+        def maybe_null(x): return None if rng.random() < 0.3 else x
+        # Missing inclusivity flags may be either `None` (falsy) or `np.NaN` (truthy).
+        def maybe_null_flag(x): return rng.choice([None, np.NaN]) if rng.random() < 0.3 else x
+
+        measurement_metadata = pd.DataFrame({
+            'drop_lower_bound': [maybe_null(float(rng.integers(-5, 0))) for _ in keys],
+            'drop_lower_bound_inclusive': [maybe_null_flag(bool(rng.random() < 0.5)) for _ in keys],
+            'drop_upper_bound': [maybe_null(float(rng.integers(5, 10))) for _ in keys],
+            'drop_upper_bound_inclusive': [maybe_null_flag(bool(rng.random() < 0.5)) for _ in keys],
+            'censor_lower_bound': [maybe_null(float(rng.integers(-3, 1))) for _ in keys],
+            'censor_upper_bound': [maybe_null(float(rng.integers(4, 8))) for _ in keys],
+        }, index=keys)
+
+        vals = pd.Series(
+            rng.integers(-7, 12, size=500).astype(float),
+            index=rng.choice(keys + ['unbounded_key'], size=500), name='vals'
+        )
+        vals.iloc[::17] = np.NaN
+
+        want = pd.Series([
+            EventStreamDataset.drop_or_censor(
+                v, measurement_metadata.loc[k] if k in measurement_metadata.index else {}
+            ) for k, v in vals.items()
+        ], index=vals.index, name='vals', dtype=float)
+
+        self.assertEqual(want, EventStreamDataset.drop_oob_and_censor_outliers(vals, measurement_metadata))
+
     def test_drop_oob_and_censor_outliers(self):
         vals = pd.Series([
             -1, 0, 0.5, 1, 2,
@@ -324,6 +416,42 @@ class TestEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
             EventStreamDataset.transform_categorical_key_values_df(measurement_metadata, kv_df, 'key', 'val')
         )
 
+    def test_transform_categorical_matches_rowwise(self):
+        rng = np.random.default_rng(1)
+        measurement_metadata = pd.DataFrame({
+            'value_type': ['float', 'categorical_integer', 'categorical_float', 'categorical_integer'],
+        }, index=['k1', 'k2', 'k3', 'k4'])
+
+        vals = np.round(rng.normal(0, 3, size=500), int(rng.integers(0, 3)))
+        vals[:4] = [0.0, -0.0, 2.5, -2.5]
+        kv_df = pd.DataFrame({'key': rng.choice(['k1', 'k2', 'k3', 'k4'], size=500), 'val': vals})
+
+        want_kv_df = kv_df.copy()
+        for value_type, conversion_fn in (
+            ('categorical_integer', EventStreamDataset.int_key_value_to_categorical),
+            ('categorical_float', EventStreamDataset.float_key_value_to_categorical),
+        ):
+            idx = want_kv_df.key.isin(measurement_metadata[measurement_metadata.value_type == value_type].index)
+            want_kv_df.loc[idx, 'key'] = want_kv_df[idx].apply(
+                lambda r: conversion_fn(key=r['key'], val=r['val']), axis='columns'
+            )
+            want_kv_df.loc[idx, 'val'] = np.NaN
+
+        got_kv_df = EventStreamDataset.transform_categorical_key_values_df(
+            measurement_metadata, kv_df.copy(), 'key', 'val'
+        )
+        self.assertEqual(want_kv_df, got_kv_df)
+
+        for key in ('k2', 'k3'):
+            vals = pd.Series(kv_df.val.values, name=key, index=np.arange(500) * 2)
+            conversion_fn = (
+                EventStreamDataset.int_key_value_to_categorical if key == 'k2'
+                else EventStreamDataset.float_key_value_to_categorical
+            )
+            want = vals.apply(lambda v: conversion_fn(key=key, val=v))
+            got = EventStreamDataset.transform_categorical_values_series(measurement_metadata.loc[key], vals)
+            self.assertEqual(want, got)
+
     def test_fit_metadata_model(self):
         """Tests `EventStreamDataset._fit_metadata_model`"""
         class DumbMetadataModel():
@@ -406,9 +534,10 @@ class TestEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
             'A_col': [1, None, 3, 4, 5, None],
             'B_col': [None, 2, None, None, None, None],
             'C_col': [None, None, None, None, None, 'Z'],
-        }).iloc[[5, 1, 0, 2, 3, 4]] # sort by event_id
+        }).iloc[[1, 0, 5, 2, 3, 4]] # sort by subject_id, then event_id
 
-        want_metadata_df.index=pd.Index([0, 1, 2, 3, 4, 5], name='metadata_id')
+        # Metadata is (stably) sorted by subject, but retains the metadata_id assigned in event_id order.
+        want_metadata_df.index=pd.Index([1, 2, 0, 3, 4, 5], name='metadata_id')
         self.assertEqual(want_metadata_df, E.joint_metadata_df)
 
         # Unlike the input, the parsed df should have timestamps and be sorted.
@@ -494,6 +623,96 @@ class TestEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
         # Now it should recognize it has static measurements
         self.assertTrue(E.has_static_measurements)
 
+    def test_construction_from_metadata_list_cols(self):
+        """
+        `EventStreamDataset` should produce the same `joint_metadata_df` from list-valued metadata columns as
+        it does from `ExpandableDfDict` metadata.
+        """
+        events_df = pd.DataFrame({
+            'subject_id': [2, 1, 1, 2, 2],
+            'timestamp': ['12/3/22', '12/2/22', '12/1/22', '12/1/22', '12/1/22'],
+            'event_type': ['C', 'B', 'A', 'A', 'A'],
+            'A_col': [None, None, [1], [3], [4, 5]],
+            'B_col': [None, [2], None, None, None],
+            'C_col': [['Z'], None, None, None, None],
+        })
+
+        E = EventStreamDataset(
+            events_df=events_df, config=EventStreamDatasetConfig(),
+            metadata_list_cols=['C_col', 'A_col', 'B_col'],
+        )
+
+        want_events_df = pd.DataFrame({
+            'subject_id': [1, 1, 2, 2, 2],
+            'timestamp': [
+                pd.to_datetime('12/1/22'),
+                pd.to_datetime('12/2/22'),
+                pd.to_datetime('12/1/22'),
+                pd.to_datetime('12/1/22'),
+                pd.to_datetime('12/3/22'),
+            ],
+            'event_type': ['A', 'B', 'A', 'A', 'C'],
+        }, index=pd.Index([2, 1, 3, 4, 0], name='event_id'))
+        self.assertEqual(want_events_df, E.events_df)
+
+        want_metadata_df = pd.DataFrame({
+            'event_id': [1, 2, 0, 3, 4, 4],
+            'event_type': ['B', 'A', 'C', 'A', 'A', 'A'],
+            'subject_id': [1, 1, 2, 2, 2, 2],
+            'A_col': [None, 1, None, 3, 4, 5],
+            'B_col': [2, None, None, None, None, None],
+            'C_col': [None, None, 'Z', None, None, None],
+        }, index=pd.Index([1, 2, 0, 3, 4, 5], name='metadata_id'))
+        self.assertEqual(want_metadata_df, E.joint_metadata_df)
+
+        with self.assertRaises(ValueError):
+            EventStreamDataset.explode_metadata_list_columns(
+                pd.DataFrame(
+                    {'event_type': ['A'], 'subject_id': [1], 'a': [[1, 2]], 'b': [[1]]},
+                    index=pd.Index([0], name='event_id'),
+                ),
+                ['a', 'b'],
+            )
+
+    def test_subject_events_and_metadata(self):
+        events_df = pd.DataFrame({
+            'subject_id': [2, 1, 1, 2, 2],
+            'timestamp': ['12/3/22', '12/2/22', '12/1/22', '12/1/22', '12/1/22'],
+            'event_type': ['C', 'B', 'A', 'A', 'A'],
+            'A_col': [None, None, [1], [3], [4, 5]],
+            'B_col': [None, [2], None, None, None],
+            'C_col': [['Z'], None, None, None, None],
+        })
+        E = EventStreamDataset(
+            events_df=events_df, config=EventStreamDatasetConfig(), metadata_list_cols=['A_col', 'B_col', 'C_col']
+        )
+
+        for subject_id in (1, 2):
+            got_events, got_metadata = E.subject_events_and_metadata(subject_id)
+            self.assertEqual(E.events_df[E.events_df.subject_id == subject_id], got_events)
+            self.assertEqual(
+                E.joint_metadata_df[E.joint_metadata_df.subject_id == subject_id], got_metadata
+            )
+            self.assertTrue(
+                np.shares_memory(got_events.timestamp.values, E.events_df.timestamp.values)
+            )
+
+        got_events, got_metadata = E.subject_events_and_metadata(3)
+        self.assertEqual(0, len(got_events))
+        self.assertEqual(0, len(got_metadata))
+
+        self.assertEqual(
+            E.joint_metadata_df[E.joint_metadata_df.subject_id == 2].dropna(axis=1, how='all'),
+            E.metadata_df(subject_id=2)
+        )
+
+        # The offsets should be maintained through aggregation.
+        E.agg_by_time_type()
+        got_events, got_metadata = E.subject_events_and_metadata(2)
+        self.assertEqual(E.events_df[E.events_df.subject_id == 2], got_events)
+        self.assertEqual(E.joint_metadata_df[E.joint_metadata_df.subject_id == 2], got_metadata)
+        self.assertEqual(set(got_events.index), set(got_metadata.event_id))
+
     def test_agg_by_time_type(self):
         """
         `EventStreamDataset` should be able to aggregate the `events_df` to be unique by subject, event_type,
@@ -545,6 +764,38 @@ class TestEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
         }, index=pd.Index([0, 1, 2, 3], name='event_id'))
         self.assertEqual(want_events_df_with_metadata, E.events_df_with_metadata)
 
+    def test_agg_by_time_type_remaps_sparse_event_ids(self):
+        """Aggregation should remap metadata for arbitrary (non-contiguous, unsorted) input event IDs."""
+        events_df = pd.DataFrame({
+            'subject_id': [2, 1, 1, 2],
+            'timestamp': pd.to_datetime(['12/1/22', '12/2/22', '12/2/22', '12/1/22']),
+            'event_type': ['A', 'B', 'B', 'A'],
+        }, index=pd.Index([40, 7, 1000, 3], name='event_id'))
+        metadata_df = pd.DataFrame({
+            'event_id': [3, 40, 1000, 7, 40],
+            'subject_id': [2, 2, 1, 1, 2],
+            'event_type': ['A', 'A', 'B', 'B', 'A'],
+            'col': [1, 2, 3, 4, 5],
+        })
+
+        E = EventStreamDataset(
+            events_df=events_df, metadata_df=metadata_df, config=EventStreamDatasetConfig()
+        )
+        E.agg_by_time_type()
+
+        want_events_df = pd.DataFrame({
+            'subject_id': [1, 2],
+            'timestamp': pd.to_datetime(['12/2/22', '12/1/22']),
+            'event_type': ['B', 'A'],
+        }, index=pd.Index([0, 1], name='event_id'))
+        self.assertEqual(want_events_df, E.events_df)
+
+        got_event_ids = E.joint_metadata_df.set_index('col').event_id.sort_index()
+        self.assertEqual([1, 1, 0, 0, 1], list(got_event_ids.values))
+
+        E.joint_metadata_df.loc[E.joint_metadata_df.col == 1, 'event_id'] = 100
+        with self.assertRaises(KeyError): E.agg_by_time_type()
+
     def test_split(self):
         """`EventStreamDataset` should be able to split the `events_df` into splits by `subject_id`."""
         events_df = pd.DataFrame({
@@ -664,6 +915,126 @@ class TestEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
             if sp == 'tuning': self.assertEqual(want, E.tuning_events_df)
             if sp == 'held_out': self.assertEqual(want, E.held_out_events_df)
 
+    def test_split_accessors_track_split_changes(self):
+        """Split-restricted accessors should reflect splits however they are changed."""
+        events_df = pd.DataFrame({
+            'subject_id': [1, 1, 2, 3, 3],
+            'timestamp': pd.to_datetime(['12/1/22', '12/2/22', '12/1/22', '12/3/22', '12/4/22']),
+            'event_type': ['A', 'B', 'A', 'C', 'D'],
+            'metadata': [
+                ExpandableDfDict({'A_col': [1]}),
+                ExpandableDfDict({'B_col': [2]}),
+                ExpandableDfDict({'A_col': [3, 4, 5]}),
+                ExpandableDfDict({'C_col': ['Z']}),
+                ExpandableDfDict({'D_col': [0.4]}),
+            ],
+        })
+        subjects_df = pd.DataFrame({'age': [30, 40, 50]}, index=pd.Index([1, 2, 3], name='subject_id'))
+
+        E = EventStreamDataset(
+            events_df=events_df, subjects_df=subjects_df, config=EventStreamDatasetConfig()
+        )
+
+        def check(train_subjects: Set[int], held_out_subjects: Set[int]):
+            events_df, metadata_df = E.events_df, E.joint_metadata_df
+            self.assertEqual(events_df[events_df.subject_id.isin(train_subjects)], E.train_events_df)
+            self.assertEqual(events_df[events_df.subject_id.isin(held_out_subjects)], E.held_out_events_df)
+            self.assertEqual(
+                events_df[events_df.subject_id.isin(train_subjects | held_out_subjects)],
+                E._events_for_split(splits=['train', 'held_out']),
+            )
+            self.assertEqual(E.subjects_df.loc[sorted(train_subjects)], E.train_subjects_df)
+            self.assertEqual(train_subjects, E.train_subject_ids)
+            self.assertEqual(
+                train_subjects | held_out_subjects, E.subject_ids_for_split(splits=['train', 'held_out'])
+            )
+            self.assertEqual(
+                metadata_df[metadata_df.subject_id.isin(train_subjects)].dropna(axis=1, how='all'),
+                E.metadata_df(split='train'),
+            )
+            self.assertEqual(
+                metadata_df[
+                    metadata_df.subject_id.isin(held_out_subjects) & (metadata_df.event_type == 'A')
+                ].dropna(axis=1, how='all'),
+                E.metadata_df(split='held_out', event_type='A'),
+            )
+
+        E.split_subjects = {'train': {1, 2}, 'held_out': {3}}
+        check({1, 2}, {3})
+
+        # Projected columns are restricted, and all-nan columns dropped, over the requested columns alone.
+        metadata_df = E.joint_metadata_df
+        self.assertEqual(
+            metadata_df[metadata_df.subject_id.isin({1, 2})][['B_col', 'A_col']],
+            E.metadata_df(split='train', columns=['B_col', 'C_col', 'A_col', 'missing']),
+        )
+
+        # Splits can be reassigned or overlap, but are immutable so can't be modified in place.
+        E.split_subjects = {'train': {2}, 'held_out': {1, 2}}
+        check({2}, {1, 2})
+        with self.assertRaises(AttributeError): E.split_subjects['train'].update({3})
+        E.split_subjects = {**E.split_subjects, 'train': E.split_subjects['train'] | {3}}
+        check({2, 3}, {1, 2})
+        # Including reassignments which preserve the sizes of the splits.
+        E.split_subjects = {**E.split_subjects, 'train': {1, 3}}
+        check({1, 3}, {1, 2})
+        E.split_subjects = {**E.split_subjects, 'train': {2, 3}}
+
+        # Events can also change underneath the splits.
+        E.agg_by_time_type()
+        check({2, 3}, {1, 2})
+
+        # Split caches are not saved, but are rebuilt on loaded datasets.
+        with TemporaryDirectory() as d:
+            E._save(Path(d) / 'E.pkl')
+            got_E = EventStreamDataset._load(Path(d) / 'E.pkl')
+            self.assertFalse(hasattr(got_E, '_split_membership_cache'))
+            self.assertEqual(E.train_events_df, got_E.train_events_df)
+
+        with self.assertRaises(AssertionError): E._events_for_split('tuning')
+
+    def test_metadata_df_by_event_type(self):
+        """Event type restricted metadata should follow the metadata as its rows change."""
+        events_df = pd.DataFrame({
+            'subject_id': [2, 1, 1, 2, 3],
+            'timestamp': pd.to_datetime(['12/1/22', '12/2/22', '12/1/22', '12/3/22', '12/4/22']),
+            'event_type': ['A', 'B', 'A', 'C', 'A'],
+            'metadata': [
+                ExpandableDfDict({'A_col': [1, 2]}),
+                ExpandableDfDict({'B_col': [3]}),
+                ExpandableDfDict({'A_col': [4]}),
+                ExpandableDfDict({'C_col': [5]}),
+                ExpandableDfDict({'A_col': [6]}),
+            ],
+        })
+
+        E = EventStreamDataset(events_df=events_df, config=EventStreamDatasetConfig())
+
+        def check():
+            metadata_df = E.joint_metadata_df
+            for event_types in (['A'], ['C', 'A'], ['B', 'missing'], []):
+                with self.subTest(event_types=event_types):
+                    self.assertEqual(
+                        metadata_df[metadata_df.event_type.isin(event_types)].dropna(axis=1, how='all'),
+                        E.metadata_df(event_types=event_types),
+                    )
+                    self.assertEqual(
+                        metadata_df[
+                            metadata_df.event_type.isin(event_types) & metadata_df.subject_id.isin([2, 3])
+                        ].dropna(axis=1, how='all'),
+                        E.metadata_df(event_types=event_types, subject_ids=[3, 2]),
+                    )
+
+        check()
+
+        # Reversing the metadata keeps each subject's rows contiguous, so only the offsets need rebuilding.
+        E.joint_metadata_df = E.joint_metadata_df.iloc[::-1]
+        E._build_subject_offsets()
+        check()
+
+        E.split_subjects = {'train': {1, 3}}
+        self.assertEqual([6, 4], list(E.metadata_df(event_type='A', split='train').A_col))
+
     def test_TTE_functions(self):
         """`EventStreamDataset` should be able to provide the inter-event-times and associated stats."""
         events_df = pd.DataFrame({
@@ -848,6 +1219,32 @@ class TestEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
         }, index = pd.Index([0, 1, 2, 3, 4], name='event_id'))
         self.assertEqual(want_events_df, E.events_df)
 
+        # Function values are cached, but re-added unmodified even if their columns were changed in place.
+        cached_vals = {k: v[1] for k, v in E._time_dependent_cache.items()}
+        E.events_df['age1'] *= 2
+        E.add_time_dependent_columns()
+        self.assertEqual(want_events_df, E.events_df)
+        for k, v in E._time_dependent_cache.items(): self.assertTrue(v[1] is cached_vals[k])
+
+        # Re-set events are recomputed.
+        E.events_df = E.events_df.iloc[::-1]
+        E.add_time_dependent_columns()
+        self.assertEqual(want_events_df, E.events_df.sort_index())
+        for k, v in E._time_dependent_cache.items(): self.assertFalse(v[1] is cached_vals[k])
+
+        # As are events whose subjects change.
+        new_subjects_df = subjects_df.copy()
+        new_subjects_df['dob1'] = new_subjects_df['dob2']
+        E.subjects_df = new_subjects_df
+        E.add_time_dependent_columns()
+        want_events_df['age1'] = want_age2
+        self.assertEqual(want_events_df, E.events_df)
+
+        # The cache is not saved.
+        with TemporaryDirectory() as d:
+            E._save(Path(d) / 'E.pkl')
+            self.assertFalse(hasattr(EventStreamDataset._load(Path(d) / 'E.pkl'), '_time_dependent_cache'))
+
     def test_measurement_configs(self):
         events_df = pd.DataFrame({
             'subject_id': [1], 'timestamp': ['12/1/22'], 'event_type': ['A'],
@@ -1189,7 +1586,7 @@ class TestEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
                     C['want_type'], E._infer_val_type(vals.dropna(), C['total_col_obs'], len(vals))
                 )
 
-    def test_fit_dynamic_numerical_metadata_column_vals(self):
+    def test_fit_dynamic_numerical_metadata_column_vals_serial(self):
         # This function doesn't actually need to reference events_df at all.
         events_df = pd.DataFrame({
             'subject_id': [1], 'timestamp': ['12/1/22'], 'event_type': ['A'],
@@ -1328,7 +1725,9 @@ class TestEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
                 E.inferred_measurement_configs = copy.deepcopy(config.measurement_configs)
 
                 vals = pd.Series(C['vals'], name=obs_key)
-                got = E._fit_dynamic_numerical_metadata_column_vals(vals, key_col, C['total_col_obs'])
+                got = E._fit_dynamic_numerical_metadata_column_vals_serial(
+                    [(obs_key, vals)], np.array([0]), key_col, C['total_col_obs']
+                )
 
                 self.assertTrue(got is None)
 
@@ -1338,6 +1737,43 @@ class TestEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
 
                 self.assertEqual(want_metadata, E.inferred_measurement_configs[key_col].measurement_metadata)
 
+    def test_fit_numerical_metadata_parallel_matches_serial(self):
+        rng = np.random.default_rng(1)
+        n_events = 300
+        events_df = pd.DataFrame({
+            'subject_id': rng.integers(0, 10, size=n_events),
+            'timestamp': pd.Timestamp('2022-12-01') + pd.to_timedelta(np.arange(n_events), unit='h'),
+            'event_type': 'A',
+            'lab': [[f"k{i}"] for i in rng.integers(0, 6, size=n_events)],
+            'lab_val': [[v] for v in np.round(rng.normal(0, 1, size=n_events), 3)],
+        })
+        events_df.loc[:10, 'lab_val'] = events_df.loc[:10, 'lab_val'].apply(lambda v: [v[0] + 25])
+
+        fit_metadata = {}
+        for num_workers in (1, 2):
+            config = EventStreamDatasetConfig.from_simple_args(
+                dynamic_measurement_columns=[('lab', 'lab_val')],
+                outlier_detector_config={'cls': 'variance_impact_outlier_detector'},
+                # A small `subsample` makes the normalizer fit depend on the random state.
+                normalizer_config={'cls': 'quantile_transformer', 'n_quantiles': 5, 'subsample': 10},
+                num_numerical_fit_workers=num_workers,
+            )
+            E = EventStreamDataset(events_df=events_df, config=config, metadata_list_cols=['lab', 'lab_val'])
+            E.split_subjects = {'train': set(range(10))}
+
+            np.random.seed(1)
+            E._fit_numerical_metadata()
+            fit_metadata[num_workers] = E.inferred_measurement_configs['lab'].measurement_metadata
+
+        serial, parallel = fit_metadata[1], fit_metadata[2]
+        self.assertEqual(list(serial.index), list(parallel.index))
+        self.assertEqual(serial['value_type'], parallel['value_type'])
+        for col in ('outlier_model', 'normalizer'):
+            for key in serial.index:
+                want, got = serial.loc[key, col], parallel.loc[key, col]
+                self.assertEqual(type(want), type(got))
+                self.assertNestedDictEqual(vars(want), vars(got), msg=f"{col} for {key} differs!")
+
     def test_fit_numerical_metadata_only_dynamic(self):
         # DummySklearn is defined at the top of the file, and just memorizes the mean, min, max, and count of
         # the input, and asserts that it is a secretly 1D array of reshaped to a 2D array per sklearn
@@ -1976,6 +2412,213 @@ class TestEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
         # E.subjects_df should not update.
         self.assertEqual(subjects_df, E.subjects_df)
 
+    def test_transform_metadata_chunked_and_parallel_match_serial(self):
+        rng = np.random.default_rng(1)
+        n_events = 300
+        events_df = pd.DataFrame({
+            'subject_id': rng.integers(0, 10, size=n_events),
+            'timestamp': pd.Timestamp('2022-12-01') + pd.to_timedelta(np.arange(n_events), unit='h'),
+            'event_type': 'A',
+            'lab': [[f"k{i}"] for i in rng.integers(0, 6, size=n_events)],
+            'lab_val': [[v] for v in np.round(rng.normal(0, 1, size=n_events), 3)],
+        })
+        events_df.loc[:10, 'lab_val'] = events_df.loc[:10, 'lab_val'].apply(lambda v: [v[0] + 25])
+
+        metadata_dfs = {}
+        for num_workers, chunk_size in ((1, 1000000), (1, 17), (2, 17)):
+            config = EventStreamDatasetConfig.from_simple_args(
+                dynamic_measurement_columns=[('lab', 'lab_val')],
+                outlier_detector_config={'cls': 'variance_impact_outlier_detector'},
+                normalizer_config={'cls': 'quantile_transformer', 'n_quantiles': 5},
+                num_numerical_transform_workers=num_workers,
+                numerical_transform_chunk_size=chunk_size,
+            )
+            E = EventStreamDataset(events_df=events_df, config=config, metadata_list_cols=['lab', 'lab_val'])
+            E.split_subjects = {'train': set(range(10))}
+
+            np.random.seed(1)
+            E.preprocess_metadata()
+            metadata_dfs[(num_workers, chunk_size)] = E.joint_metadata_df
+
+        want = metadata_dfs[(1, 1000000)]
+        self.assertEqual(want, metadata_dfs[(1, 17)])
+        self.assertEqual(want, metadata_dfs[(2, 17)])
+
+    def test_merged_sort_order(self):
+        """Merging two sorted runs should match a stable sort, with existing rows first among ties."""
+        df = pd.DataFrame({
+            'subject_id': ['a', 'a', 'b', 'd'],
+            'timestamp': pd.to_datetime(['12/1/22', None, '12/2/22', '12/1/22']),
+        })
+        new_df = pd.DataFrame({
+            'subject_id': ['a', 'a', 'b', 'c', 'e'],
+            'timestamp': pd.to_datetime(['12/1/22', '12/3/22', '12/1/22', '12/1/22', None]),
+        })
+
+        got = EventStreamDataset._merged_sort_order(df, new_df, by=['subject_id', 'timestamp'])
+        self.assertEqual([0, 4, 5, 1, 6, 2, 7, 3, 8], list(got))
+
+        got = EventStreamDataset._merged_sort_order(df, new_df, by=['subject_id'])
+        self.assertEqual([0, 1, 4, 5, 2, 6, 7, 3, 8], list(got))
+
+    @staticmethod
+    def append_events_test_data(n_events: int, seed: int, val_shift: float = 0) -> pd.DataFrame:
+        rng = np.random.default_rng(seed)
+        return pd.DataFrame({
+            'subject_id': rng.integers(0, 10, size=n_events),
+            'timestamp': (
+                pd.Timestamp('2022-12-01') + pd.to_timedelta(rng.permutation(10**5)[:n_events], unit='m')
+            ),
+            'event_type': rng.choice(['A', 'B'], size=n_events),
+            'cat': [[c] for c in rng.choice(['a', 'b', 'c'], size=n_events)],
+            'lab': [[f"k{i}"] for i in rng.integers(0, 4, size=n_events)],
+            'lab_val': [[v] for v in np.round(rng.normal(val_shift, 1, size=n_events), 3)],
+        })
+
+    def test_append_events(self):
+        old_events_df = self.append_events_test_data(200, seed=1)
+        new_events_df = self.append_events_test_data(50, seed=2)
+        all_events_df = pd.concat((old_events_df, new_events_df), ignore_index=True)
+
+        list_cols = ['cat', 'lab', 'lab_val']
+        config = EventStreamDatasetConfig.from_simple_args(
+            dynamic_measurement_columns=['cat', ('lab', 'lab_val')],
+            outlier_detector_config={'cls': 'variance_impact_outlier_detector'},
+            normalizer_config={'cls': 'streaming_quantile_normalizer'},
+        )
+        split_subjects = {'train': set(range(7)), 'held_out': {7, 8, 9}}
+
+        want_E = EventStreamDataset(events_df=all_events_df, config=config, metadata_list_cols=list_cols)
+
+        E = EventStreamDataset(events_df=old_events_df, config=config, metadata_list_cols=list_cols)
+        self.assertIsNone(E.append_events(new_events_df, metadata_list_cols=list_cols))
+
+        self.assertEqual(want_E.events_df, E.events_df)
+        self.assertEqual(want_E.joint_metadata_df, E.joint_metadata_df)
+        self.assertEqual(want_E.n_events_per_subject, E.n_events_per_subject)
+        self.assertEqual(want_E.subject_ids, E.subject_ids)
+        self.assertEqual(set(want_E.event_types), set(E.event_types))
+        for subject_id in want_E.subject_ids:
+            _, want_metadata = want_E.subject_events_and_metadata(subject_id)
+            _, got_metadata = E.subject_events_and_metadata(subject_id)
+            self.assertEqual(want_metadata, got_metadata)
+
+        # With fit metadata, new rows should be transformed with the existing models, which are then updated.
+        E = EventStreamDataset(events_df=old_events_df, config=config, metadata_list_cols=list_cols)
+        E.split_subjects = copy.deepcopy(split_subjects)
+        np.random.seed(1)
+        E.preprocess_metadata()
+
+        want_E.split_subjects = copy.deepcopy(split_subjects)
+        want_E.inferred_measurement_configs = copy.deepcopy(E.inferred_measurement_configs)
+        want_E.metadata_is_fit = True
+        want_E.transform_metadata()
+
+        old_normalizer = E.inferred_measurement_configs['lab'].measurement_metadata.loc['k0', 'normalizer']
+        old_count = old_normalizer.count_
+        n_old_metadata = len(E.joint_metadata_df)
+
+        drift = E.append_events(new_events_df, metadata_list_cols=list_cols)
+        self.assertTrue(0 < drift < 1)
+
+        self.assertEqual(want_E.events_df, E.events_df)
+        self.assertEqual(want_E.joint_metadata_df, E.joint_metadata_df[want_E.joint_metadata_df.columns])
+
+        want_cat_counts = all_events_df[all_events_df.subject_id.isin(split_subjects['train'])].cat.apply(
+            lambda c: c[0]
+        ).value_counts(normalize=True)
+        got_cat_vocab = E.inferred_measurement_configs['cat'].vocabulary
+        for c, freq in want_cat_counts.items():
+            self.assertAlmostEqual(freq, got_cat_vocab.obs_frequencies[got_cat_vocab.idxmap[c]])
+        self.assertAlmostEqual(0, got_cat_vocab.obs_frequencies[0])
+
+        new_train_k0_inliers = E.joint_metadata_df[
+            (E.joint_metadata_df.index >= n_old_metadata) &
+            E.joint_metadata_df.subject_id.isin(split_subjects['train']) & (E.joint_metadata_df.lab == 'k0') &
+            (E.joint_metadata_df.lab_val_is_inlier == True)
+        ]
+        self.assertEqual(old_count + len(new_train_k0_inliers), old_normalizer.count_)
+
+        # New subjects can be added to a split, and metadata re-fit when drift exceeds the threshold.
+        shifted_events_df = self.append_events_test_data(200, seed=3, val_shift=3)
+        shifted_events_df['subject_id'] += 10
+        all_events_df = pd.concat((old_events_df, shifted_events_df), ignore_index=True)
+
+        want_E = EventStreamDataset(events_df=all_events_df, config=config, metadata_list_cols=list_cols)
+        want_E.split_subjects = {**split_subjects, 'train': split_subjects['train'] | set(range(10, 20))}
+        np.random.seed(1)
+        want_E.preprocess_metadata()
+
+        E = EventStreamDataset(events_df=old_events_df, config=config, metadata_list_cols=list_cols)
+        E.split_subjects = copy.deepcopy(split_subjects)
+        np.random.seed(1)
+        E.preprocess_metadata()
+
+        np.random.seed(1)
+        drift = E.append_events(
+            shifted_events_df, metadata_list_cols=list_cols, new_subjects_split='train',
+            refit_drift_threshold=0.5,
+        )
+        self.assertGreater(drift, 0.5)
+
+        self.assertEqual(want_E.split_subjects, E.split_subjects)
+        self.assertEqual(want_E.events_df, E.events_df)
+        self.assertEqual(
+            want_E.joint_metadata_df, E.joint_metadata_df[want_E.joint_metadata_df.columns]
+        )
+        self.assertEqual(
+            want_E.inferred_measurement_configs['cat'].vocabulary,
+            E.inferred_measurement_configs['cat'].vocabulary,
+        )
+
+    def test_encode_categorical_metadata(self):
+        events_df = self.append_events_test_data(200, seed=1)
+        events_df['cat'] = [['rare']] * 4 + list(events_df['cat'].values[4:])
+
+        list_cols = ['cat', 'lab', 'lab_val']
+        datasets = {}
+        for do_encode in (False, True):
+            config = EventStreamDatasetConfig.from_simple_args(
+                dynamic_measurement_columns=['cat', ('lab', 'lab_val')],
+                time_dependent_measurement_columns=[('tod', TimeOfDayFunctor())],
+                min_valid_vocab_element_observations=5,
+                do_encode_categorical_metadata=do_encode,
+            )
+            E = EventStreamDataset(events_df=events_df, config=config, metadata_list_cols=list_cols)
+            E.split_subjects = {'train': set(range(7)), 'held_out': {7, 8, 9}}
+            E.preprocess_metadata()
+            datasets[do_encode] = E
+
+        want_E, E = datasets[False], datasets[True]
+        self.assertNotIn('rare', E.measurement_vocabs['cat'])
+
+        for col, df in (('cat', 'joint_metadata_df'), ('lab', 'joint_metadata_df'), ('tod', 'events_df')):
+            with self.subTest(col=col):
+                want_vals, got_vals = getattr(want_E, df)[col], getattr(E, df)[col]
+                self.assertTrue(isinstance(got_vals.dtype, pd.CategoricalDtype))
+                self.assertEqual(want_vals, got_vals.astype(object))
+
+                vocab = E.measurement_configs[col].vocabulary
+                want_codes = np.array([-1 if pd.isnull(v) else vocab.idxmap.get(v, 0) for v in want_vals])
+                self.assertEqual(want_codes, E.vocab_codes(got_vals, vocab))
+                self.assertEqual(want_codes, E.vocab_codes(want_vals, vocab))
+
+        with TemporaryDirectory() as d:
+            E.save_to_dir(Path(d) / 'save_dir')
+            got_E = EventStreamDataset.load_from_dir(Path(d) / 'save_dir')
+            self.assertEqual(E.joint_metadata_df, got_E.joint_metadata_df)
+
+        # Appended data should keep the encoding, and the codes of the existing data.
+        old_codes = E.joint_metadata_df['cat'].cat.codes.values.copy()
+        new_events_df = self.append_events_test_data(20, seed=2)
+        new_events_df['cat'] = [['new']] * 2 + list(new_events_df['cat'].values[2:])
+        E.append_events(new_events_df, metadata_list_cols=list_cols)
+
+        got_vals = E.joint_metadata_df['cat']
+        self.assertTrue(isinstance(got_vals.dtype, pd.CategoricalDtype))
+        self.assertEqual(old_codes, got_vals.loc[want_E.joint_metadata_df.index].cat.codes.values)
+        self.assertEqual(2, (got_vals == 'new').sum())
+
     def test_save_and_load(self):
         # DummySklearn is defined at the top of the file, and just memorizes the mean, min, max, and count of
         # the input, and asserts that it is a secretly 1D array of reshaped to a 2D array per sklearn
@@ -2202,4 +2845,103 @@ class TestEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
             self.assertEqual(want_no_fn_arg, got_no_fn_arg)
             self.assertEqual([got_fn_arg(n) for n in (-2, -1, 3, 4, 0)], [4, 1, 9, 16, 0])
 
+    def test_save_to_and_load_from_dir(self):
+        normalizer = QuantileTransformer(n_quantiles=3).fit(np.array([[0.], [1.], [2.]]))
+        outlier_model = VarianceImpactOutlierDetector()
+        outlier_model.fit(np.concatenate((np.arange(20.), [100.])).reshape(-1, 1))
+
+        config = EventStreamDatasetConfig(
+            measurement_configs={
+                'cat': MeasurementConfig(
+                    temporality = TemporalityType.DYNAMIC,
+                    modality = DataModality.SINGLE_LABEL_CLASSIFICATION,
+                ),
+                'num_key': MeasurementConfig(
+                    temporality = TemporalityType.DYNAMIC,
+                    modality = DataModality.MULTIVARIATE_REGRESSION,
+                    present_in_event_types = {'A'},
+                    values_column = 'num_val',
+                ),
+                'tod': MeasurementConfig(
+                    temporality = TemporalityType.FUNCTIONAL_TIME_DEPENDENT,
+                    functor = TimeOfDayFunctor(),
+                ),
+            },
+            min_valid_column_observations = 2,
+            normalizer_config = {'cls': 'quantile_transformer', 'n_quantiles': 3},
+        )
+
+        events_df = pd.DataFrame({
+            'subject_id': [1, 1, 2],
+            'timestamp': ['12/1/22 10:00', '12/2/22 23:00', '12/1/22 8:00'],
+            'event_type': ['A', 'B', 'A'],
+            'cat': [['a', 'b'], ['a'], None],
+            'num_key': [['k1', 'k2'], None, ['k1']],
+            'num_val': [[1.0, 2.0], None, [3.0]],
+        })
+        E = EventStreamDataset(
+            events_df=events_df, config=config, metadata_list_cols=['cat', 'num_key', 'num_val']
+        )
+        E.split_subjects = {'train': {1}, 'held_out': {2}}
+
+        inferred_measurement_configs = copy.deepcopy(config.measurement_configs)
+        inferred_measurement_configs['cat'].vocabulary = Vocabulary(['UNK', 'a', 'b'], [0, 2/3, 1/3])
+        inferred_measurement_configs['num_key'].vocabulary = Vocabulary(['UNK', 'k1', 'k2'], [0, 2/3, 1/3])
+        inferred_measurement_configs['num_key'].measurement_metadata = pd.DataFrame({
+            'value_type': ['float', 'float'],
+            'outlier_model': [outlier_model, None],
+            'normalizer': [normalizer, None],
+        }, index=pd.Index(['k1', 'k2'], name='num_key'))
+        E.inferred_measurement_configs = inferred_measurement_configs
+        E.metadata_is_fit = True
+
+        with TemporaryDirectory() as d:
+            save_dir = Path(d) / 'save_dir'
+            E.save_to_dir(save_dir)
+
+            with self.assertRaises(FileExistsError): E.save_to_dir(save_dir)
+
+            got_E = EventStreamDataset.load_from_dir(save_dir)
+
+            self.assertEqual(E.events_df, got_E.events_df)
+            self.assertEqual(E.joint_metadata_df, got_E.joint_metadata_df)
+            self.assertEqual(E.split_subjects, got_E.split_subjects)
+            self.assertEqual(E.n_events_per_subject, got_E.n_events_per_subject)
+            self.assertEqual(E.config, got_E.config)
+            self.assertTrue(got_E.metadata_is_fit)
+
+            got_inferred_configs = got_E.inferred_measurement_configs
+            self.assertEqual(inferred_measurement_configs['cat'], got_inferred_configs['cat'])
+            self.assertEqual(inferred_measurement_configs['tod'], got_inferred_configs['tod'])
+
+            want_num_cfg = inferred_measurement_configs['num_key']
+            got_num_cfg = got_inferred_configs['num_key']
+            self.assertEqual(want_num_cfg.vocabulary, got_num_cfg.vocabulary)
+            self.assertEqual(want_num_cfg.present_in_event_types, got_num_cfg.present_in_event_types)
+            self.assertEqual(
+                want_num_cfg.measurement_metadata[['value_type']],
+                got_num_cfg.measurement_metadata[['value_type']],
+            )
+
+            got_normalizer = got_num_cfg.measurement_metadata.loc['k1', 'normalizer']
+            got_outlier_model = got_num_cfg.measurement_metadata.loc['k1', 'outlier_model']
+            self.assertIsNone(got_num_cfg.measurement_metadata.loc['k2', 'normalizer'])
+
+            X = np.array([[-1.], [0.5], [1.5], [5.]])
+            self.assertEqual(normalizer.transform(X).tolist(), got_normalizer.transform(X).tolist())
+
+            X = np.array([[-100.], [5.], [100.]])
+            self.assertEqual(outlier_model.predict(X).tolist(), got_outlier_model.predict(X).tolist())
+
+            got_E = EventStreamDataset.load_from_dir(save_dir, split='held_out')
+            self.assertEqual(E.held_out_events_df, got_E.events_df)
+            self.assertEqual(E.metadata_df(split='held_out'), got_E.metadata_df())
+            self.assertEqual({2}, got_E.subject_ids)
+            self.assertEqual(E.split_subjects, got_E.split_subjects)
+
+            got_E = EventStreamDataset.load_from_dir(save_dir, do_load_data=False)
+            self.assertEqual(E.events_df.iloc[:0], got_E.events_df)
+            self.assertEqual(E.joint_metadata_df.iloc[:0], got_E.joint_metadata_df)
+            self.assertEqual(E.measurement_vocabs, got_E.measurement_vocabs)
+
 if __name__ == '__main__': unittest.main()
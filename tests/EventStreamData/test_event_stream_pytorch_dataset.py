@@ -2,7 +2,9 @@ import sys
 sys.path.append('../..')
 
 import torch, unittest, numpy as np, pandas as pd
-from dataclasses import asdict
+from dataclasses import asdict, replace
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from typing import Optional
 
 from ..mixins import MLTypeEqualityCheckableMixin
@@ -1018,4 +1020,164 @@ class TestEventStreamPytorchDataset(MLTypeEqualityCheckableMixin, unittest.TestC
 
         self.assertNestedDictEqual(asdict(want_out), asdict(out))
 
+    def test_compile(self):
+        """Compiled datasets should produce the same items and batches as uncompiled ones."""
+        subjects_df = pd.DataFrame(
+            {'buzz': ['foo', 'bar'], 'dob': [pd.to_datetime('12/1/21'), pd.to_datetime('12/1/20')]},
+            index=pd.Index([1, 2], name='subject_id')
+        )
+        events_df = pd.DataFrame({
+            'subject_id': [1, 1, 1, 1, 2, 2],
+            'timestamp': [
+                '12/1/22 12:00 a.m.', '12/2/22 2:00 p.m.', '12/3/22 10:00 a.m.', '12/4/22 11:00 p.m.',
+                '12/1/22 15:00', '12/2/22 2:00',
+            ],
+            'event_type': ['A', 'B', 'A', 'A', 'A', 'B'],
+            'metadata': [
+                ExpandableDfDict({'A_col': ['foo']}),
+                ExpandableDfDict({'B_key': ['a', 'a', 'a', 'b', 'b'], 'B_val': [1, 2, 3, 4, 5]}),
+                ExpandableDfDict({'A_col': ['bar']}),
+                ExpandableDfDict({'A_col': ['foo']}),
+                ExpandableDfDict({'A_col': ['foo']}),
+                ExpandableDfDict({'B_key': ['a', 'b'], 'B_val': [1, 5]}),
+            ],
+        })
+        config = EventStreamDatasetConfig.from_simple_args(
+            dynamic_measurement_columns=['A_col', ('B_key', 'B_val')],
+            static_measurement_columns=['buzz'],
+            time_dependent_measurement_columns=[
+                ('time_of_day', TimeOfDayFunctor()), ('age', AgeFunctor('dob'))
+            ],
+        )
+        E = EventStreamDataset(events_df=events_df, subjects_df=subjects_df, config=config)
+        E.split_subjects = {'train': {1, 2}}
+        E.preprocess_metadata()
+
+        task_df = pd.DataFrame({
+            'subject_id': [1, 1, 2],
+            'start_time': pd.to_datetime(['12/2/22 1:00 am', '11/1/22', '11/1/22']),
+            'end_time': pd.to_datetime(['12/5/22', '12/2/22 1:00 am', '12/5/22']),
+            'label': [True, False, True],
+        })
+
+        # Compiled values are stored as `float32`, so we compare at lower precision.
+        def normalize(item: dict) -> dict:
+            out = {}
+            for k, v in item.items():
+                if k in ('dynamic_indices', 'dynamic_measurement_indices'):
+                    out[k] = [list(map(int, l)) for l in v]
+                elif k == 'dynamic_values':
+                    out[k] = [[None if np.isnan(x) else round(float(x), 4) for x in l] for l in v]
+                elif k in ('static_indices', 'static_measurement_indices', 'time'): out[k] = list(v)
+                else: out[k] = v
+            return out
+
+        for max_seq_len, kwargs in ((4, {}), (2, {}), (4, {'task_df': task_df})):
+            data_config = EventStreamPytorchDatasetConfig(
+                do_normalize_log_inter_event_times = False,
+                max_seq_len = max_seq_len,
+            )
+            pyd = EventStreamPytorchDataset(E, data_config, split='train', **kwargs)
+            want_items = [
+                pyd._seeded_getitem_from_range(**self._item_range(pyd, i), seed=1) for i in range(len(pyd))
+            ]
+            want_batch = pyd.collate([pyd[i] for i in range(len(pyd))])
+
+            with TemporaryDirectory() as d:
+                for save_dir in (None, Path(d) / 'compiled', Path(d) / 'compiled'):
+                    compiled_pyd = EventStreamPytorchDataset(E, data_config, split='train', **kwargs)
+                    compiled_pyd.compile(save_dir=save_dir)
+                    if save_dir is not None:
+                        self.assertIsInstance(compiled_pyd.compiled['dynamic_indices'], np.memmap)
+
+                    for i, want in enumerate(want_items):
+                        got = compiled_pyd._seeded_getitem_from_range(
+                            **self._item_range(compiled_pyd, i), seed=1
+                        )
+                        self.assertEqual(normalize(want), normalize(got))
+
+                    got_batch = compiled_pyd.collate([compiled_pyd[i] for i in range(len(compiled_pyd))])
+                    self.assertEqual(want_batch.dynamic_indices, got_batch.dynamic_indices)
+                    self.assertEqual(want_batch.dynamic_values_mask, got_batch.dynamic_values_mask)
+                    self.assertTrue(torch.allclose(want_batch.dynamic_values, got_batch.dynamic_values))
+
+        data_config = EventStreamPytorchDatasetConfig(do_normalize_log_inter_event_times=False, min_seq_len=3)
+        with TemporaryDirectory() as d:
+            pyd.compile(save_dir=Path(d))
+            # Integer subject IDs are saved without pickling.
+            self.assertEqual([1, 2], list(np.load(Path(d) / 'subject_ids.npy', allow_pickle=False)))
+            with self.assertRaises(ValueError):
+                EventStreamPytorchDataset(E, data_config, split='train').compile(save_dir=Path(d))
+
+        # Arrays compiled for the same subjects but a different config or dataset are also rejected.
+        data_config = EventStreamPytorchDatasetConfig(do_normalize_log_inter_event_times=False, max_seq_len=4)
+        with TemporaryDirectory() as d:
+            EventStreamPytorchDataset(E, data_config, split='train').compile(save_dir=Path(d))
+
+            other_config = replace(data_config, do_normalize_log_inter_event_times=True)
+            with self.assertRaises(ValueError):
+                EventStreamPytorchDataset(E, other_config, split='train').compile(save_dir=Path(d))
+
+            E_other = EventStreamDataset(
+                events_df=events_df.iloc[:-1], subjects_df=subjects_df, config=config
+            )
+            E_other.split_subjects = {'train': {1, 2}}
+            E_other.preprocess_metadata()
+            with self.assertRaises(ValueError):
+                EventStreamPytorchDataset(E_other, data_config, split='train').compile(save_dir=Path(d))
+
+            pyd = EventStreamPytorchDataset(E_other, data_config, split='train')
+            pyd.compile(save_dir=Path(d), do_overwrite=True)
+            # Subject 2 now has too few events, so only subject 1's 4 events are compiled.
+            self.assertEqual([1], pyd.subject_ids)
+            self.assertEqual(4, len(pyd.compiled['event_timestamps']))
+
+    def test_compile_nested_metadata(self):
+        """Compiled datasets should flatten list- or tuple-valued metadata exactly as uncompiled ones do."""
+        events_df = pd.DataFrame({
+            'subject_id': [1, 1, 1, 1, 2, 2],
+            'timestamp': [
+                '12/1/22 12:00 a.m.', '12/2/22 2:00 p.m.', '12/3/22 10:00 a.m.', '12/4/22 11:00 p.m.',
+                '12/1/22 15:00', '12/2/22 2:00',
+            ],
+            'event_type': ['A', 'B', 'A', 'A', 'A', 'B'],
+            'metadata': [
+                ExpandableDfDict({'A_col': [['foo', 'bar']]}),
+                ExpandableDfDict({'B_key': ['a', 'a', 'a', 'b', 'b'], 'B_val': [1, 2, 3, 4, 5]}),
+                ExpandableDfDict({'A_col': [('bar',)]}),
+                ExpandableDfDict({'A_col': [['foo']]}),
+                ExpandableDfDict({'A_col': [['foo', 'baz', 'bar']]}),
+                ExpandableDfDict({'B_key': ['a', 'b'], 'B_val': [1, 5]}),
+            ],
+        })
+        config = EventStreamDatasetConfig.from_simple_args(
+            dynamic_measurement_columns=['A_col', ('B_key', 'B_val')],
+        )
+        E = EventStreamDataset(events_df=events_df, config=config)
+        E.split_subjects = {'train': {1, 2}}
+        E.preprocess_metadata()
+
+        data_config = EventStreamPytorchDatasetConfig(do_normalize_log_inter_event_times=False, max_seq_len=4)
+        pyd = EventStreamPytorchDataset(E, data_config, split='train')
+        want_items = [
+            pyd._seeded_getitem_from_range(**self._item_range(pyd, i), seed=1) for i in range(len(pyd))
+        ]
+
+        compiled_pyd = EventStreamPytorchDataset(E, data_config, split='train')
+        compiled_pyd.compile()
+        for i, want in enumerate(want_items):
+            got = compiled_pyd._seeded_getitem_from_range(**self._item_range(compiled_pyd, i), seed=1)
+            for k in ('dynamic_indices', 'dynamic_measurement_indices'):
+                self.assertEqual([list(map(int, l)) for l in want[k]], [list(map(int, l)) for l in got[k]])
+            self.assertEqual(
+                [[None if np.isnan(x) else float(x) for x in l] for l in want['dynamic_values']],
+                [[None if np.isnan(x) else float(x) for x in l] for l in got['dynamic_values']],
+            )
+
+    @staticmethod
+    def _item_range(pyd: EventStreamPytorchDataset, i: int) -> dict:
+        if not pyd.has_task: return {'subject_id': pyd.subject_ids[i]}
+        row = pyd.task_df.iloc[i]
+        return {'subject_id': row.subject_id, 'start_time': row.start_time, 'end_time': row.end_time}
+
 if __name__ == '__main__': unittest.main()
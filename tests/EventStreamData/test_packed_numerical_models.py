@@ -0,0 +1,86 @@
+import sys
+sys.path.append('../..')
+
+import unittest, numpy as np, pandas as pd
+
+from sklearn.preprocessing import QuantileTransformer
+
+from ..mixins import MLTypeEqualityCheckableMixin
+from EventStream.EventStreamData.packed_numerical_models import PackedNumericalModels
+from EventStream.StreamingQuantileNormalizer.streaming_quantile_normalizer import (
+    StreamingQuantileNormalizer
+)
+from EventStream.VarianceImpactOutlierDetector.variance_impact_outlier_detector import (
+    VarianceImpactOutlierDetector
+)
+
+class TestPackedNumericalModels(MLTypeEqualityCheckableMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(1)
+
+        keys, outlier_models, normalizers, self.train_vals = [], [], [], []
+        for i in range(8):
+            # Rounding induces repeated values, and hence repeated quantiles.
+            X = np.round(rng.normal(0, 1, size=int(rng.integers(1, 60))), 1)
+            if i % 3 == 0: X[:3] = X[0]
+
+            outlier_model = VarianceImpactOutlierDetector()
+            outlier_model.fit(X.reshape(-1, 1))
+            output_distribution = 'normal' if i % 2 else 'uniform'
+            if i % 4 == 1:
+                normalizer = StreamingQuantileNormalizer(
+                    compression=10, output_distribution=output_distribution
+                ).fit(X.reshape(-1, 1))
+            else:
+                normalizer = QuantileTransformer(
+                    n_quantiles=min(int(rng.integers(2, 20)), len(X)), output_distribution=output_distribution,
+                ).fit(X.reshape(-1, 1))
+
+            keys.append(f"key_{i}")
+            outlier_models.append(None if i == 5 else outlier_model)
+            normalizers.append(np.NaN if i == 6 else normalizer)
+            self.train_vals.append(X)
+
+        self.measurement_metadata = pd.DataFrame(
+            {'value_type': 'float', 'outlier_model': outlier_models, 'normalizer': normalizers},
+            index=pd.Index(keys, name='key'),
+        )
+
+        self.keys = rng.choice(keys, size=3000)
+        self.vals = np.concatenate((
+            np.round(rng.normal(0, 1.5, size=2000), 1),
+            rng.choice(np.concatenate(self.train_vals), size=1000),
+        ))
+
+    def test_matches_models(self):
+        packed = PackedNumericalModels.from_measurement_metadata(self.measurement_metadata)
+        key_ids = packed.key_ids(self.keys)
+
+        got_is_inlier = packed.is_inlier(key_ids, self.vals)
+        got_normalized = packed.normalize(key_ids, self.vals)
+
+        for key, row in self.measurement_metadata.iterrows():
+            with self.subTest(key=key):
+                key_vals = self.vals[self.keys == key].reshape(-1, 1)
+
+                if pd.isnull(row['outlier_model']): want_is_inlier = np.ones(len(key_vals), dtype=bool)
+                else: want_is_inlier = row['outlier_model'].predict(key_vals) == 1
+                self.assertEqual(want_is_inlier, got_is_inlier[self.keys == key])
+
+                if pd.isnull(row['normalizer']): want_normalized = key_vals.reshape(-1)
+                else: want_normalized = row['normalizer'].transform(key_vals).reshape(-1)
+                np.testing.assert_array_equal(want_normalized, got_normalized[self.keys == key])
+
+    def test_unpackable(self):
+        class CustomNormalizer():
+            def transform(self, X): return X
+
+        self.measurement_metadata.loc['key_6', 'normalizer'] = CustomNormalizer()
+        self.assertIsNone(PackedNumericalModels.from_measurement_metadata(self.measurement_metadata))
+
+    def test_missing_keys(self):
+        packed = PackedNumericalModels.from_measurement_metadata(self.measurement_metadata)
+        with self.assertRaises(KeyError): packed.key_ids(np.array(['key_0', 'missing']))
+
+if __name__ == '__main__': unittest.main()
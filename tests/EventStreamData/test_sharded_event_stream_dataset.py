@@ -0,0 +1,177 @@
+import sys
+sys.path.append('../..')
+
+from ..mixins import ConfigComparisonsMixin, MLTypeEqualityCheckableMixin
+
+import unittest, numpy as np, pandas as pd
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from EventStream.EventStreamData.columnar_io import load_df, save_df
+from EventStream.EventStreamData.config import EventStreamDatasetConfig, MeasurementConfig
+from EventStream.EventStreamData.event_stream_dataset import EventStreamDataset
+from EventStream.EventStreamData.sharded_event_stream_dataset import ShardedEventStreamDataset
+from EventStream.EventStreamData.time_dependent_functor import TimeOfDayFunctor
+from EventStream.EventStreamData.types import DataModality, TemporalityType
+
+class TestColumnarIO(MLTypeEqualityCheckableMixin, unittest.TestCase):
+    def test_save_and_load_df(self):
+        df = pd.DataFrame({
+            'int': [1, 2, 3],
+            'float': [1.0, np.NaN, 3.0],
+            'str': ['a', None, 'c'],
+            'timestamp': pd.to_datetime(['12/1/22', '12/2/22', '12/3/22']),
+            'cat': pd.Categorical(['x', 'y', 'x']),
+        }, index=pd.Index([5, 3, 4], name='event_id'))
+
+        with TemporaryDirectory() as d:
+            save_dir = Path(d) / 'df'
+            save_df(df, save_dir)
+
+            self.assertEqual(df, load_df(save_dir))
+            self.assertEqual(df, load_df(save_dir, mmap=False))
+            self.assertEqual(df[['str', 'int']], load_df(save_dir, columns=['str', 'int']))
+
+            # Memory-mapped columns are copy-on-write, so in-memory edits don't reach the disk.
+            got = load_df(save_dir)
+            got.loc[5, 'int'] = -1
+            self.assertEqual(df, load_df(save_dir))
+
+            with self.assertRaises(KeyError): load_df(save_dir, columns=['missing'])
+            with self.assertRaises(FileExistsError): save_df(df, save_dir)
+
+class TestShardedEventStreamDataset(ConfigComparisonsMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        events_df = pd.DataFrame({
+            'subject_id': [1, 1, 2, 3, 3, 4, 4],
+            'timestamp': [
+                '12/1/22 10:00', '12/2/22 23:00', '12/1/22 8:00', '12/3/22 14:00', '12/4/22 2:00',
+                '12/1/22 10:00', '12/5/22 18:00',
+            ],
+            'event_type': ['A', 'B', 'A', 'A', 'B', 'A', 'B'],
+            'cat': [['a'], ['b', 'a'], ['a'], ['b'], None, ['c'], ['a']],
+            'num_key': [['k1'], ['k1', 'k2'], ['k1'], ['k2'], ['k1'], ['k1'], ['k2']],
+            'num_val': [[1.0], [2.0, 0.5], [3.0], [0.25], [4.0], [5.0], [0.75]],
+        })
+        self.config = EventStreamDatasetConfig(measurement_configs={
+            'cat': MeasurementConfig(
+                temporality = TemporalityType.DYNAMIC,
+                modality = DataModality.MULTI_LABEL_CLASSIFICATION,
+            ),
+            'num_key': MeasurementConfig(
+                temporality = TemporalityType.DYNAMIC,
+                modality = DataModality.MULTIVARIATE_REGRESSION,
+                values_column = 'num_val',
+            ),
+            'tod': MeasurementConfig(
+                temporality = TemporalityType.FUNCTIONAL_TIME_DEPENDENT,
+                functor = TimeOfDayFunctor(),
+            ),
+        })
+
+        self.raw_events_df = events_df
+        self.E = EventStreamDataset(
+            events_df=events_df, config=self.config, metadata_list_cols=['cat', 'num_key', 'num_val']
+        )
+        self.E.split_subjects = {'train': {1, 2, 3}, 'held_out': {4}}
+
+        self.dir = TemporaryDirectory()
+        self.save_dir = Path(self.dir.name) / 'sharded'
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_from_event_stream_dataset(self):
+        S = ShardedEventStreamDataset.from_event_stream_dataset(self.E, self.save_dir, n_shards=2)
+
+        self.assertEqual(2, S.n_shards)
+        self.assertEqual({1, 2, 3, 4}, S.subject_ids)
+        self.assertEqual(self.E.n_events_per_subject, S.n_events_per_subject)
+        self.assertEqual(self.E.splits, S.splits)
+        self.assertEqual({4}, S.subject_ids_for_split('held_out'))
+        self.assertEqual([0], S.shards_for_subjects([1, 2]))
+        self.assertEqual([1], S.shards_for_subjects([4]))
+        self.assertEqual([0], S.shards_for_subjects([-1]))
+
+        self.assertEqual(self.E.events_df, S.events_df)
+        self.assertEqual(self.E.train_events_df, S.train_events_df)
+        self.assertEqual(self.E.held_out_events_df, S.held_out_events_df)
+
+        want = self.E.metadata_df(split='held_out')
+        self.assertEqual(want, S.metadata_df(split='held_out')[want.columns])
+
+        want = self.E.metadata_df(event_type='B', subject_ids=[1, 3])
+        self.assertEqual(want, S.metadata_df(event_type='B', subject_ids=[1, 3])[want.columns])
+
+        want = self.E.metadata_df(split='train', columns=['num_val', 'num_key', 'missing'])
+        self.assertEqual(['num_val', 'num_key'], list(want.columns))
+        self.assertEqual(want, S.metadata_df(split='train', columns=['num_val', 'num_key', 'missing']))
+
+        with self.assertRaises(FileExistsError):
+            ShardedEventStreamDataset.from_event_stream_dataset(self.E, self.save_dir, n_shards=2)
+
+    def test_write_shards_offsets_ids(self):
+        shards = [
+            EventStreamDataset(
+                self.config,
+                events_df=self.raw_events_df[self.raw_events_df.subject_id.isin(subjects)],
+                metadata_list_cols=['cat', 'num_key', 'num_val'],
+            ) for subjects in ([1, 2], [3, 4])
+        ]
+        # The above datasets will have overlapping event ids, as they were built independently.
+        S = ShardedEventStreamDataset.write_shards(self.save_dir, iter(shards), self.config)
+
+        self.assertTrue(S.events_df.index.is_unique)
+        self.assertTrue(S.joint_metadata_df.index.is_unique)
+        self.assertEqual(
+            set(S.events_df.index.values), set(S.joint_metadata_df.event_id.values)
+        )
+
+        with self.assertRaises(ValueError):
+            ShardedEventStreamDataset.write_shards(
+                Path(self.dir.name) / 'overlapping', [shards[0], shards[0]], self.config
+            )
+
+    def test_preprocess_metadata(self):
+        S = ShardedEventStreamDataset.from_event_stream_dataset(self.E, self.save_dir, n_shards=3)
+
+        self.E.preprocess_metadata()
+        S.preprocess_metadata()
+
+        self.assertTrue(S.metadata_is_fit)
+        self.assertNestedDictEqual(self.E.inferred_measurement_configs, S.inferred_measurement_configs)
+        self.assertEqual(self.E.events_df, S.events_df)
+
+        want = self.E.metadata_df()
+        self.assertEqual(want, S.metadata_df()[want.columns])
+
+        # The fit state should be persisted on disk.
+        reloaded = ShardedEventStreamDataset(self.save_dir)
+        self.assertTrue(reloaded.metadata_is_fit)
+        self.assertNestedDictEqual(self.E.inferred_measurement_configs, reloaded.inferred_measurement_configs)
+
+    def test_fit_metadata_loads_only_measurement_columns(self):
+        S = ShardedEventStreamDataset.from_event_stream_dataset(self.E, self.save_dir, n_shards=3)
+
+        loads = []
+        load_shard = S.load_shard
+        def recording_load_shard(shard, **kwargs):
+            loads.append(kwargs)
+            return load_shard(shard, **kwargs)
+        S.load_shard = recording_load_shard
+
+        self.E.add_time_dependent_columns()
+        S.add_time_dependent_columns()
+        loads.clear()
+
+        self.E.fit_metadata()
+        S.fit_metadata()
+
+        self.assertNestedDictEqual(self.E.inferred_measurement_configs, S.inferred_measurement_configs)
+
+        self.assertTrue(len(loads) > 0)
+        for kwargs in loads:
+            self.assertTrue(kwargs['events_columns'] is not None)
+            self.assertTrue(kwargs['metadata_columns'] is not None)
+            self.assertTrue(len(kwargs['events_columns']) + len(kwargs['metadata_columns']) <= 2)
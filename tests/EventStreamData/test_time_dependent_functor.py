@@ -0,0 +1,79 @@
+import sys
+sys.path.append('../..')
+
+from ..mixins import MLTypeEqualityCheckableMixin
+
+import unittest, numpy as np, pandas as pd
+
+from EventStream.EventStreamData.time_dependent_functor import (
+    AgeFunctor,
+    TimeOfDayFunctor,
+    TimeDependentFunctor,
+    to_epoch_ns,
+)
+
+class TestTimeDependentFunctors(MLTypeEqualityCheckableMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(1)
+
+        n_events = 1000
+        subject_ids = np.sort(rng.integers(0, 20, size=n_events))
+        minute_offsets = rng.integers(-10**6, 10**6, n_events)
+        timestamps = pd.to_datetime('1/1/2000') + pd.to_timedelta(minute_offsets, 'min')
+        timestamps = timestamps.where(rng.random(n_events) > 0.05)
+
+        self.time = pd.Series(
+            timestamps,
+            index=pd.MultiIndex.from_arrays(
+                [np.arange(n_events), subject_ids], names=['event_id', 'subject_id']
+            ),
+        )
+
+        dob = pd.to_datetime('1/1/1950') + pd.to_timedelta(rng.integers(0, 365*40, 20), 'days')
+        self.subjects_df = pd.DataFrame(
+            {'dob': dob.where(np.arange(20) != 3)}, index=pd.Index(np.arange(20), name='subject_id')
+        )
+
+    def test_age_functor(self):
+        F = AgeFunctor('dob')
+        self.assertTrue(F.is_vectorized)
+
+        want = (
+            (self.time - self.subjects_df.loc[self.time.index.get_level_values('subject_id'), 'dob'].values) /
+            pd.to_timedelta(365, 'days')
+        )
+        self.assertEqual(want, F(self.time, self.subjects_df))
+
+    def test_time_of_day_functor(self):
+        F = TimeOfDayFunctor()
+        self.assertTrue(F.is_vectorized)
+
+        want = self.time.apply(
+            lambda dt: (
+                'EARLY_AM' if dt.hour < 6 else
+                'AM' if dt.hour < 12 else
+                'PM' if dt.hour < 21 else
+                'LATE_PM'
+            )
+        )
+        self.assertEqual(want, F(self.time, self.subjects_df))
+
+        # Wall-clock times are used for timezone-aware timestamps.
+        tz_time = self.time.dt.tz_localize('US/Eastern', ambiguous='NaT', nonexistent='NaT')
+        self.assertEqual(want[tz_time.notna()], F(tz_time, self.subjects_df)[tz_time.notna()])
+
+    def test_to_epoch_ns(self):
+        got = to_epoch_ns(pd.Series(pd.to_datetime(['1/1/1970 01:00', None])))
+        self.assertEqual(np.array([3600 * 10**9, np.iinfo(np.int64).min]), got)
+
+    def test_unvectorized_functor(self):
+        class ConstantFunctor(TimeDependentFunctor):
+            def __init__(self): pass
+            def __call__(self, time, _): return pd.Series(1., index=time.index)
+
+        F = ConstantFunctor()
+        self.assertFalse(F.is_vectorized)
+        with self.assertRaises(NotImplementedError): F.vectorized_call(np.zeros(1, dtype=np.int64), {})
+
+if __name__ == '__main__': unittest.main()
@@ -3,9 +3,10 @@ sys.path.append('../..')
 
 from ..mixins import MLTypeEqualityCheckableMixin
 
-import unittest, numpy as np
+import unittest, numpy as np, pandas as pd
 
 from EventStream.EventStreamData.vocabulary import Vocabulary
+from EventStream.utils import is_monotonically_nonincreasing
 
 class TestVocabulary(MLTypeEqualityCheckableMixin, unittest.TestCase):
     """Tests the `Vocabulary` class."""
@@ -66,3 +67,87 @@ class TestVocabulary(MLTypeEqualityCheckableMixin, unittest.TestCase):
         got_vocab = Vocabulary.build_vocab(['foo', 'foo', 'foo', 'bar', 'bar'])
         want_vocab = Vocabulary(['foo', 'bar'], [3/5, 2/5])
         self.assertEqual(want_vocab, got_vocab)
+
+    def test_build_vocab_fast_path_matches_recursive(self):
+        rng = np.random.default_rng(1)
+        # Many tied frequencies stress the ordering of ties in the `__post_init__` sort.
+        strs = rng.choice([f"code_{i}" for i in range(40)], size=500).astype(object)
+        strs[rng.choice(500, size=50)] = np.NaN
+        floats = np.round(rng.normal(size=500), 1)
+        floats[:20] = np.NaN
+
+        cases = {
+            'series': pd.Series(strs),
+            'float_series': pd.Series(floats),
+            'array': strs,
+            'float_array': floats,
+            'nested_series': pd.Series([list(strs[i:i+3]) for i in range(0, 200, 3)] + [[], np.NaN, 'a']),
+            'doubly_nested_series': pd.Series([[['a', 'b'], 'c'], [], [('b',), np.array(['c', 'c'])]]),
+        }
+
+        for name, observations in cases.items():
+            with self.subTest(name):
+                got = Vocabulary.build_vocab(observations)
+                want = Vocabulary.build_vocab(list(observations))
+                self.assertEqual(want.vocabulary, got.vocabulary)
+                self.assertEqual([type(v) for v in want.vocabulary], [type(v) for v in got.vocabulary])
+                np.testing.assert_array_equal(want.obs_frequencies, got.obs_frequencies)
+
+        # Nulls other than float `NaN`s are counted as elements by the recursive path, so are left to it.
+        got = Vocabulary.build_vocab(pd.Series(['a', None, 'a']))
+        self.assertEqual(got.vocabulary, ['UNK', 'a', None])
+
+    def test_count_observations(self):
+        rng = np.random.default_rng(3)
+        strs = rng.choice([f"code_{i}" for i in range(40)], size=500).astype(object)
+        strs[rng.choice(500, size=50)] = np.NaN
+        observations = pd.Series([list(strs[i:i+3]) for i in range(0, 500, 3)])
+
+        want = Vocabulary.count_observations(observations)
+        self.assertEqual(list(want.keys()), list(Vocabulary.count_observations(list(observations)).keys()))
+
+        # Counts over consecutive chunks sum to those over all observations, in the same order.
+        got = {}
+        for chunk in np.array_split(observations, [10, 70, 120]):
+            for v, c in Vocabulary.count_observations(chunk).items(): got[v] = got.get(v, 0) + c
+        self.assertEqual(list(want.items()), list(got.items()))
+
+        built = Vocabulary.build_vocab(observations)
+        self.assertEqual(built.vocabulary, Vocabulary(
+            vocabulary=list(got.keys()), obs_counts=list(got.values()), total_observations=len(observations)
+        ).vocabulary)
+
+    def test_merge(self):
+        rng = np.random.default_rng(2)
+        codes = [f"code_{i}" for i in range(30)]
+        observations = pd.Series(rng.choice(codes, size=1000, p=np.arange(1, 31)/465))
+        shards = np.array_split(observations, [100, 450, 700])
+
+        want = Vocabulary.build_vocab(observations)
+        got = Vocabulary.merged([Vocabulary.build_vocab(shard) for shard in shards])
+
+        self.assertEqual(want.total_observations, got.total_observations)
+        self.assertEqual(
+            dict(zip(want.vocabulary, want.obs_counts)), dict(zip(got.vocabulary, got.obs_counts))
+        )
+        self.assertEqual(
+            dict(zip(want.vocabulary, want.obs_frequencies)), dict(zip(got.vocabulary, got.obs_frequencies))
+        )
+        self.assertTrue(is_monotonically_nonincreasing(got.obs_frequencies[1:]))
+
+        want.filter(total_observations=1000, min_valid_element_freq=40)
+        got.filter(total_observations=1000, min_valid_element_freq=40)
+        self.assertEqual(set(want.vocabulary), set(got.vocabulary))
+        self.assertEqual(want.obs_frequencies[0], got.obs_frequencies[0])
+        self.assertEqual(want.obs_counts[0], got.obs_counts[0])
+        self.assertEqual(got.obs_counts.sum(), 1000)
+
+        vocab = Vocabulary(['UNK', 'a', 'b'], obs_counts=[0, 3, 1], total_observations=4)
+        vocab.merge(Vocabulary(['UNK', 'b', 'c'], obs_counts=[1, 5, 2], total_observations=8))
+        self.assertEqual(vocab.vocabulary, ['UNK', 'b', 'a', 'c'])
+        self.assertEqual(vocab.obs_counts, np.array([1, 6, 3, 2]))
+        self.assertEqual(vocab.obs_frequencies, np.array([1, 6, 3, 2]) / 12)
+        self.assertEqual(vocab['c'], 3)
+
+        with self.assertRaises(AssertionError, msg="Can't merge vocabularies without raw counts."):
+            vocab.merge(Vocabulary(['a', 'b'], [0.5, 0.5]))
@@ -0,0 +1,93 @@
+import sys
+sys.path.append('../..')
+
+from ..mixins import MLTypeEqualityCheckableMixin
+import json, unittest, numpy as np
+
+from sklearn.preprocessing import QuantileTransformer
+
+from EventStream.EventStreamData.event_stream_dataset import EventStreamDataset
+from EventStream.StreamingQuantileNormalizer.streaming_quantile_normalizer import (
+    StreamingQuantileNormalizer
+)
+
+def empirical_quantiles(train_X: np.ndarray, X: np.ndarray) -> np.ndarray:
+    """Returns the mid-rank empirical quantiles of `X` among `train_X`."""
+    train_X = np.sort(train_X)
+    n_lt = np.searchsorted(train_X, X, side='left')
+    n_le = np.searchsorted(train_X, X, side='right')
+    return (n_lt + n_le) / 2 / len(train_X)
+
+class TestStreamingQuantileNormalizer(MLTypeEqualityCheckableMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(1)
+        self.X = rng.lognormal(0, 1.5, size=200000)
+        self.test_X = rng.choice(self.X, size=5000)
+        self.want = empirical_quantiles(self.X, self.test_X)
+
+    def max_err(self, M: StreamingQuantileNormalizer) -> float:
+        return np.abs(M.transform(self.test_X.reshape(-1, 1))[:, 0] - self.want).max()
+
+    def test_fit_accuracy(self):
+        M = StreamingQuantileNormalizer(compression=200).fit(self.X.reshape(-1, 1))
+
+        self.assertEqual(M.count_, len(self.X))
+        self.assertLessEqual(len(M.means_), 100)
+        self.assertEqual(M.min_, self.X.min())
+        self.assertEqual(M.max_, self.X.max())
+        self.assertLess(self.max_err(M), 0.005)
+
+        got = M.transform(np.array([[self.X.min()], [self.X.max()], [-1.], [np.inf], [np.NaN]]))[:, 0]
+        self.assertEqual(got[:4].tolist(), [0., 1., 0., 1.])
+        self.assertTrue(np.isnan(got[4]))
+
+    def test_partial_fit_and_merge(self):
+        chunked = StreamingQuantileNormalizer(chunk_size=7919).fit(self.X.reshape(-1, 1))
+        self.assertEqual(chunked.count_, len(self.X))
+        self.assertLess(self.max_err(chunked), 0.005)
+
+        streamed = StreamingQuantileNormalizer()
+        for shard in np.array_split(self.X, 10): streamed.partial_fit(shard.reshape(-1, 1))
+        self.assertEqual(streamed.count_, len(self.X))
+        self.assertLess(self.max_err(streamed), 0.005)
+
+        shards = [StreamingQuantileNormalizer().fit(self.X[i::4].reshape(-1, 1)) for i in range(4)]
+        merged = StreamingQuantileNormalizer.merged(shards)
+        self.assertEqual(merged.count_, len(self.X))
+        self.assertEqual(merged.min_, self.X.min())
+        self.assertEqual(merged.max_, self.X.max())
+        self.assertLess(self.max_err(merged), 0.005)
+
+    def test_drops_nulls(self):
+        X = np.array([1., np.NaN, 2., 3., np.NaN]).reshape(-1, 1)
+        M = StreamingQuantileNormalizer().fit(X)
+        self.assertEqual(M.count_, 3)
+        self.assertEqual(M.means_, np.array([1., 2., 3.]))
+
+    def test_transform_matches_quantile_transformer(self):
+        for output_distribution in ('uniform', 'normal'):
+            with self.subTest(output_distribution=output_distribution):
+                M = StreamingQuantileNormalizer(output_distribution=output_distribution)
+                M.fit(np.round(self.X, 1).reshape(-1, 1))
+
+                # Given the same quantile table, a `QuantileTransformer` should transform identically.
+                Q = QuantileTransformer(output_distribution=output_distribution, n_quantiles=10)
+                Q.fit(self.X.reshape(-1, 1))
+                Q.quantiles_, Q.references_ = M.quantiles_, M.references_
+
+                X = np.concatenate((self.test_X, [-1., 0., 1e6])).reshape(-1, 1)
+                np.testing.assert_array_equal(Q.transform(X), M.transform(X))
+
+    def test_save_and_load_state(self):
+        M = StreamingQuantileNormalizer(output_distribution='normal').fit(self.X.reshape(-1, 1))
+
+        arrays = {}
+        state = json.loads(json.dumps(EventStreamDataset._model_to_state(M, 'M', arrays)))
+        got = EventStreamDataset._model_from_state(state, 'M', arrays)
+
+        self.assertEqual(type(got), StreamingQuantileNormalizer)
+        X = self.test_X.reshape(-1, 1)
+        np.testing.assert_array_equal(M.transform(X), got.transform(X))
+
+if __name__ == '__main__': unittest.main()
@@ -5,9 +5,44 @@ from ..mixins import MLTypeEqualityCheckableMixin
 import unittest, numpy as np
 
 from EventStream.VarianceImpactOutlierDetector.variance_impact_outlier_detector import (
-    VarianceImpactOutlierDetector
+    DataStats, VarianceImpactOutlierDetector
 )
 
+def reference_fit(M: VarianceImpactOutlierDetector, X: np.ndarray):
+    """The original procedure for `VarianceImpactOutlierDetector.fit`, which peels one extreme at a time."""
+    def std_delta_for_side(X, is_min, max_L, curr_stats):
+        found_endpoint = False
+        for L in range(1, max_L):
+            if (is_min and X[L] != X[L-1]) or (X[-L] != X[-L-1]):
+                found_endpoint = True
+                break
+
+        if not found_endpoint: return 0, 0, curr_stats
+
+        extreme_val = X[L-1] if is_min else X[-L]
+        new_stats = curr_stats.remove(extreme_val, copies_to_remove=L)
+        return abs(curr_stats.std - new_stats.std)/curr_stats.std, extreme_val, new_stats
+
+    X, curr_stats = M.get_starting_bounds(X)
+    while curr_stats.N > 1:
+        max_L = M._max_L(curr_stats.N)
+
+        min_side = std_delta_for_side(X, True, max_L, curr_stats)
+        max_side = std_delta_for_side(X, False, max_L, curr_stats)
+
+        min_more_extreme = min_side[0] > max_side[0]
+        std_delta, extreme_val, new_stats = (min_side if min_more_extreme else max_side)
+
+        if std_delta > M._max_std_delta_thresh(curr_stats.N):
+            if min_more_extreme:
+                M.thresh_small_ = extreme_val
+                X = X[-new_stats.N:]
+            else:
+                M.thresh_large_ = extreme_val
+                X = X[:new_stats.N]
+            curr_stats = new_stats
+        else: break
+
 class TestEventStreamDataset(MLTypeEqualityCheckableMixin, unittest.TestCase):
     def test_flags_no_normal_outliers(self):
         for N in (10, 100, 1000, 10000, 1000000):
@@ -112,3 +147,43 @@ class TestEventStreamDataset(MLTypeEqualityCheckableMixin, unittest.TestCase):
 
                 inliers = M.predict(X)
                 self.assertTrue((inliers == 1).all())
+
+    def test_matches_reference_fit(self):
+        rng = np.random.default_rng(1)
+        Xs = []
+        for i in range(200):
+            N = int(rng.integers(2, 300))
+            match i % 4:
+                case 0: X = rng.standard_cauchy(size=N)
+                case 1: X = np.round(rng.lognormal(0, 2, size=N))
+                case 2:
+                    X = rng.integers(0, 4, size=N).astype(float)
+                    X[:2] = 1e4
+                case 3: X = np.concatenate((rng.normal(size=N), rng.normal(50, 1, size=1 + N//50)))
+            Xs.append(X.reshape((-1, 1)))
+
+        # Near-constant datasets whose standard deviation cancels to exactly zero or goes negative, and datasets
+        # whose squares overflow; the reference procedure yields `inf` or `nan` deltas here rather than raising.
+        for X in (
+            [1e8]*20 + [1e8+2e-8]*2,
+            [1e8]*6 + [1e8+1e-8]*6,
+            [5.0]*10,
+            [1e200, 1.0, 2.0, 3.0]*5,
+            [1e300]*3 + [1.0]*30,
+        ):
+            Xs.append(np.array(X).reshape((-1, 1)))
+
+        for max_std_delta_thresh in (0.01, 0.1):
+            for i, X in enumerate(Xs):
+                with self.subTest(f"Dataset {i} with max_std_delta_thresh {max_std_delta_thresh}"):
+                    with np.errstate(all='ignore'):
+                        want = VarianceImpactOutlierDetector(max_std_delta_thresh=max_std_delta_thresh)
+                        reference_fit(want, X)
+
+                        got = VarianceImpactOutlierDetector(max_std_delta_thresh=max_std_delta_thresh)
+                        got.fit(X)
+
+                    # `assert_equal` treats `nan` thresholds as equal to one another.
+                    np.testing.assert_equal(got.thresh_small_, want.thresh_small_)
+                    np.testing.assert_equal(got.thresh_large_, want.thresh_large_)
+